@@ -1,5 +1,6 @@
 import datetime
-from main import AdamAI
+from main import AdamAI, configure_logging
+from core.utils.model_registry import registry
 from flask import Flask, Response, request, jsonify, send_from_directory, abort
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -34,7 +35,9 @@ CORS(app, resources={
 })
 
 load_dotenv('.env')
+configure_logging()
 
+# Bind immediately and load the heavy components in the background
 adam = AdamAI()
 
 @app.route('/api/chat', methods=['POST','OPTION'])
@@ -120,6 +123,9 @@ def system_status():
         "status": "operational",
         "version": "1.0",
         "service": "AdamAI",
+        "models": registry.loaded(),
+        "caches": adam.cache_stats(),
+        "inference": adam.inference_stats(),
         "timestamp": datetime.datetime.now().isoformat()
     }), 200
 
@@ -176,6 +182,12 @@ def status():
         "conversations": len(adam.active_conversations)
     })
 
+@app.route('/api/status/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 once the full pipeline is loaded, 503 before"""
+    state = adam.readiness()
+    return jsonify(state), 200 if state["ready"] else 503
+
 @app.route('/api/debug', methods=['GET'])
 def debug():
     test_response = adam.respond('test_user', 'test question')
@@ -0,0 +1,136 @@
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .vector_index import ExactVectorIndex, normalize_rows, top_k
+
+logger = logging.getLogger(__name__)
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 15,
+                     seed: int = 0, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Cluster unit vectors by cosine similarity.
+
+    Returns an (n_clusters, dim) matrix of unit-length centroids.
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = max(1, min(n_clusters, len(vectors)))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = assign_clusters(vectors, centroids, chunk_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+
+        # Reseed empty clusters with random points so no list goes unused
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            sums[empty] = vectors[rng.choice(len(vectors), empty.size, replace=False)]
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+def assign_clusters(vectors: np.ndarray, centroids: np.ndarray,
+                    chunk_size: int = 65536) -> np.ndarray:
+    """Nearest centroid for every vector, computed in bounded-memory chunks"""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        block = vectors[start:start + chunk_size] @ centroids.T
+        assignments[start:start + chunk_size] = np.argmax(block, axis=1)
+    return assignments
+
+
+class IVFIndex(ExactVectorIndex):
+    """
+    Inverted-file approximate nearest-neighbour index.
+
+    A k-means coarse quantizer splits the corpus into `nlist` cells whose
+    rows are stored contiguously. A query only scores the members of the
+    `nprobe` closest cells, so raising nprobe trades latency for recall.
+    """
+
+    def __init__(self, dim: int = 384, nlist: Optional[int] = None, nprobe: int = 8,
+                 train_size: int = 100000, n_iter: int = 15):
+        super().__init__(dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.n_iter = n_iter
+        self.centroids = np.empty((0, dim), dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+    def build(self, ids: Sequence, vectors: np.ndarray,
+              payloads: Optional[Sequence[Dict]] = None,
+              attributes: Optional[Sequence[Dict]] = None):
+        """Train the coarse quantizer and bucket every vector into its cell"""
+        super().build(ids, vectors, payloads, attributes)
+        if not len(self):
+            return
+
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(self))))
+        rng = np.random.default_rng(0)
+        sample = self.matrix
+        if len(sample) > self.train_size:
+            sample = sample[rng.choice(len(sample), self.train_size, replace=False)]
+        self.centroids = spherical_kmeans(sample, nlist, self.n_iter)
+
+        # Reorder rows so every cell is one contiguous slice of the matrix
+        assignments = assign_clusters(self.matrix, self.centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=len(self.centroids))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        # Rows are now grouped by cell, so source partitions no longer apply
+        self._apply_order(order)
+
+    def search(self, query: np.ndarray, k: int = 5, filters: Optional[Dict] = None,
+               nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Return (row, cosine score) pairs from the nprobe closest cells"""
+        if not len(self):
+            return []
+        q = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        return self._probe(q, self.centroids @ q, k, filters, nprobe)
+
+    def search_batch(self, queries: np.ndarray, k: int = 5, filters: Optional[Dict] = None,
+                     nprobe: Optional[int] = None) -> List[List[Tuple[int, float]]]:
+        """Probe cells for each query; the coarse step is one matrix product"""
+        queries = normalize_rows(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        if not len(self):
+            return [[] for _ in range(len(queries))]
+        cell_scores = queries @ self.centroids.T
+        return [self._probe(q, scores, k, filters, nprobe) for q, scores in zip(queries, cell_scores)]
+
+    def _probe(self, q: np.ndarray, cell_scores: np.ndarray, k: int,
+               filters: Optional[Dict], nprobe: Optional[int]) -> List[Tuple[int, float]]:
+        cells = top_k(cell_scores, nprobe or self.nprobe)
+        rows = np.concatenate([
+            np.arange(self.offsets[cell], self.offsets[cell + 1]) for cell in cells
+        ])
+
+        if filters:
+            mask, allowed = self.filter_bitmap(filters)
+            rows = rows[mask[rows]]
+            # A selective filter can leave the probed cells short of k hits;
+            # its matching rows are then few enough to scan exactly
+            if len(rows) < min(k, len(allowed)) or len(allowed) <= len(rows):
+                rows = allowed
+
+        scores = self.matrix[rows] @ q
+        return [(int(rows[i]), float(scores[i])) for i in top_k(scores, k)]
+
+    def _options(self) -> Dict:
+        return {"nlist": self.nlist, "nprobe": self.nprobe,
+                "train_size": self.train_size, "n_iter": self.n_iter}
+
+    def _state(self) -> Dict[str, np.ndarray]:
+        state = super()._state()
+        state.update({"centroids": self.centroids, "offsets": self.offsets})
+        return state
+
+    def _restore(self, state: Dict[str, np.ndarray], meta: Dict):
+        super()._restore(state, meta)
+        self.centroids = np.ascontiguousarray(state["centroids"], dtype=np.float32)
+        self.offsets = state["offsets"].astype(np.int64)
@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from nltk.stem.porter import PorterStemmer
+
+from core.utils.cache import LRUCache
+from .filters import FilterColumns, filter_key
+from .vector_index import PAYLOAD_FIELDS, decode_ids, encode_ids, top_k
+
+logger = logging.getLogger(__name__)
+
+# Lucene's default English stop set, as used by the lucene.english analyzer
+STOP_WORDS = frozenset("""
+a an and are as at be but by for if in into is it no not of on or such
+that the their then there these they this to was will with
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_stemmer = PorterStemmer(mode=PorterStemmer.ORIGINAL_ALGORITHM)
+
+
+@lru_cache(maxsize=100000)
+def stem(token: str) -> str:
+    return _stemmer.stem(token)
+
+
+def analyze(text: str) -> List[str]:
+    """Lowercase, split, drop possessives and stop words, Porter-stem"""
+    terms = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        if token.endswith("'s"):
+            token = token[:-2]
+        token = token.replace("'", "")
+        if token and token not in STOP_WORDS:
+            terms.append(stem(token))
+    return terms
+
+
+class BM25Index:
+    """
+    In-process BM25 keyword index over entry content.
+
+    Postings are stored CSR-style: term i owns postings
+    [term_offsets[i], term_offsets[i + 1]) of the doc and weight arrays.
+    Each posting weight already folds in the BM25 term-frequency and
+    length normalization, so a query is one idf-scaled scatter-add per
+    query term.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List = []
+        self.payloads: List[Dict] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.term_offsets = np.zeros(1, dtype=np.int64)
+        self.postings_docs = np.empty(0, dtype=np.int32)
+        self.postings_weights = np.empty(0, dtype=np.float32)
+        self.idf = np.empty(0, dtype=np.float32)
+        self.columns = FilterColumns()
+        self._masks = LRUCache(maxsize=64)
+        # Corpus version the postings were built at, compared by the retriever before each use
+        self.corpus_version: Optional[str] = None
+
+    @classmethod
+    def from_collection(cls, collection, batch_size: int = 2000, **options) -> "BM25Index":
+        """Build the index from the `content` field of every entry"""
+        ids, payloads = [], []
+        projection = {field: 1 for field in PAYLOAD_FIELDS}
+        for doc in collection.find({"content": {"$exists": True}}, projection, batch_size=batch_size):
+            ids.append(doc["_id"])
+            payloads.append({field: doc.get(field) for field in PAYLOAD_FIELDS})
+        index = cls(**options)
+        index.build(ids, payloads)
+        logger.info(f"Built BM25 index with {len(index)} entries and {len(index.vocabulary)} terms")
+        return index
+
+    def build(self, ids: Sequence, payloads: Sequence[Dict]):
+        """Tokenize every payload's content and lay out the postings arrays"""
+        self.ids = list(ids)
+        self.payloads = list(payloads)
+        self.columns = FilterColumns.from_attributes(self.payloads)
+        self._masks.clear()
+
+        term_ids, doc_ids, freqs = [], [], []
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        vocabulary: Dict[str, int] = {}
+        for row, payload in enumerate(self.payloads):
+            terms = analyze(payload.get("content", ""))
+            lengths[row] = len(terms)
+            counts: Dict[int, int] = {}
+            for term in terms:
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            term_ids.extend(counts.keys())
+            doc_ids.extend([row] * len(counts))
+            freqs.extend(counts.values())
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)[order]
+        tf = np.asarray(freqs, dtype=np.float32)[order]
+        df = np.bincount(term_ids, minlength=len(vocabulary))
+
+        avgdl = float(lengths.mean()) if len(lengths) else 0.0
+        norm = self.k1 * (1 - self.b + self.b * lengths[doc_ids] / (avgdl or 1.0))
+        n_docs = len(self.ids)
+
+        self.vocabulary = vocabulary
+        self.term_offsets = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+        self.postings_docs = doc_ids
+        self.postings_weights = (tf * (self.k1 + 1) / (tf + norm)).astype(np.float32)
+        self.idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int = 5,
+               filters: Optional[Dict] = None) -> List[Tuple[int, float]]:
+        """Return (row, BM25 score) pairs for the k best matching entries"""
+        term_ids = {self.vocabulary[t] for t in analyze(query) if t in self.vocabulary}
+        if not term_ids:
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, stop = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            scores[self.postings_docs[start:stop]] += self.idf[term_id] * self.postings_weights[start:stop]
+
+        if filters:
+            scores[~self._mask(filters)] = 0
+        hits = np.flatnonzero(scores)
+        return [(int(hits[i]), float(scores[hits[i]])) for i in top_k(scores[hits], k)]
+
+    def _mask(self, filters: Dict) -> np.ndarray:
+        key = filter_key(filters)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self.columns.mask(filters)
+            self._masks.set(key, mask)
+        return mask
+
+    def document(self, row: int, score: Optional[float] = None) -> Dict:
+        """Build a result dict for a row in the retriever's output shape"""
+        doc = {"_id": self.ids[row], **self.payloads[row]}
+        if score is not None:
+            doc["score"] = score
+        return doc
+
+    def save(self, path: str):
+        """Persist the index to a single .npz file, swapped in once complete"""
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        columns = self.columns.to_state()
+        meta = {
+            "k1": self.k1,
+            "b": self.b,
+            "ids": encode_ids(self.ids),
+            "payloads": self.payloads,
+            "vocabulary": vocabulary,
+            "columns": columns["meta"],
+            "corpus_version": self.corpus_version,
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                term_offsets=self.term_offsets,
+                postings_docs=self.postings_docs,
+                postings_weights=self.postings_weights,
+                idf=self.idf,
+                meta=np.array(json.dumps(meta, default=str)),
+                **{f"col:{key}": column for key, column in columns["arrays"].items()}
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load an index written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            state = {key: data[key] for key in data.files}
+        meta = json.loads(str(state["meta"]))
+        index = cls(k1=meta["k1"], b=meta["b"])
+        index.ids = decode_ids(meta["ids"])
+        index.payloads = meta["payloads"]
+        index.vocabulary = {term: i for i, term in enumerate(meta["vocabulary"])}
+        index.term_offsets = state["term_offsets"]
+        index.postings_docs = state["postings_docs"]
+        index.postings_weights = state["postings_weights"]
+        index.idf = state["idf"]
+        arrays = {key[4:]: column for key, column in state.items() if key.startswith("col:")}
+        index.columns = FilterColumns.from_state(arrays, meta["columns"])
+        index.corpus_version = meta.get("corpus_version")
+        logger.info(f"Loaded BM25 index with {len(index)} entries from {path}")
+        return index
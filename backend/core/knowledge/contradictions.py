@@ -0,0 +1,152 @@
+"""
+Contradiction filter used by SacredScanner to drop wisdom that clashes with
+the Quranic themes of a result set.
+
+Rules map a theme to words that contradict it and are loaded from
+data/contradiction_rules.json (or CONTRADICTION_RULES_PATH). A theme is
+active when it appears among the tags or keywords of the Quran verses; an
+item is dropped when its text contains any contradicting word of an active
+theme as a substring. The words of each active theme set are compiled into
+one regex, so every candidate is checked in a single pass.
+
+    python -m core.knowledge.contradictions
+
+benchmarks the compiled filter against the original nested loops on the
+verses in data/quran.db.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DEFAULT_RULES_PATH = os.path.join(DATA_DIR, "contradiction_rules.json")
+
+
+def extract_keywords(text: str) -> List[str]:
+    """Lowercased alphabetic words longer than three letters"""
+    if not text:
+        return []
+    return [word.lower() for word in text.split() if len(word) > 3 and word.isalpha()]
+
+
+def entry_keywords(entry: Dict) -> List[str]:
+    """Keywords stored on an enriched entry, extracted from its content otherwise"""
+    keywords = entry.get('keywords')
+    if keywords is None:
+        return extract_keywords(entry.get('content', ''))
+    return keywords
+
+
+class ContradictionFilter:
+    """Precompiled matcher for theme -> contradicting-word rules"""
+
+    def __init__(self, rules: Dict[str, List[str]]):
+        self.rules = {theme: [word.lower() for word in words] for theme, words in rules.items()}
+        self._patterns: Dict[FrozenSet[str], Optional[Pattern]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "ContradictionFilter":
+        path = path or os.getenv("CONTRADICTION_RULES_PATH") or DEFAULT_RULES_PATH
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def active_themes(self, quran_verses: Iterable[Dict]) -> FrozenSet[str]:
+        """Rule themes present in the tags or keywords of the given verses"""
+        found = set()
+        for verse in quran_verses:
+            found.update(verse.get('tags') or [])
+            found.update(entry_keywords(verse))
+        return frozenset(theme for theme in self.rules if theme in found)
+
+    def pattern(self, themes: FrozenSet[str]) -> Optional[Pattern]:
+        """One alternation of every contradicting word of the themes, compiled once"""
+        compiled = self._patterns.get(themes, False)
+        if compiled is False:
+            words = sorted({word for theme in themes for word in self.rules[theme]},
+                           key=len, reverse=True)
+            compiled = re.compile("|".join(map(re.escape, words))) if words else None
+            with self._lock:
+                self._patterns[themes] = compiled
+        return compiled
+
+    def filter(self, items: List[Dict], quran_verses: List[Dict]) -> List[Dict]:
+        """Items whose content contains no word contradicting the verses' themes"""
+        if not quran_verses:
+            return items
+        pattern = self.pattern(self.active_themes(quran_verses))
+        if pattern is None:
+            return list(items)
+        return [item for item in items if not pattern.search(item.get('content', '').lower())]
+
+
+def filter_contradictions_reference(items: List[Dict], quran_verses: List[Dict],
+                                    contradiction_map: Dict[str, List[str]]) -> List[Dict]:
+    """The original nested-loop implementation, kept as the benchmark baseline"""
+    if not quran_verses:
+        return items
+    quran_themes = set()
+    for verse in quran_verses:
+        quran_themes.update(verse.get('tags', []))
+        quran_themes.update(extract_keywords(verse.get('content', '')))
+
+    filtered = []
+    for item in items:
+        item_text = item.get('content', '').lower()
+        should_include = True
+        for theme in quran_themes:
+            for bad_word in contradiction_map.get(theme, []):
+                if bad_word in item_text:
+                    should_include = False
+                    break
+            if not should_include:
+                break
+        if should_include:
+            filtered.append(item)
+    return filtered
+
+
+def benchmark(items: List[Dict], quran_verses: List[Dict], repeats: int = 5) -> Dict:
+    engine = ContradictionFilter.from_file()
+
+    def best_of(fn):
+        best = float("inf")
+        for _ in range(repeats):
+            started = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - started)
+        return best, result
+
+    reference_seconds, expected = best_of(
+        lambda: filter_contradictions_reference(items, quran_verses, engine.rules))
+    compiled_seconds, actual = best_of(lambda: engine.filter(items, quran_verses))
+    assert [id(i) for i in actual] == [id(i) for i in expected], "filters disagree"
+    return {
+        "items": len(items),
+        "verses": len(quran_verses),
+        "kept": len(actual),
+        "reference_ms": round(1000 * reference_seconds, 3),
+        "compiled_ms": round(1000 * compiled_seconds, 3),
+        "speedup": round(reference_seconds / compiled_seconds, 1),
+    }
+
+
+def main():
+    with sqlite3.connect(os.path.join(DATA_DIR, "quran.db")) as db:
+        verses = [{"content": text, "tags": []}
+                  for (text,) in db.execute("SELECT text FROM verses ORDER BY id")]
+    # Verses that activate at least one rule, as the Quran side of a scan
+    rules = ContradictionFilter.from_file().rules
+    themed = [verse for verse in verses
+              if set(extract_keywords(verse["content"])) & set(rules)]
+    # A scan compares its top Quran verses against the wisdom results
+    for n_items, n_verses in ((20, 5), (200, 5), (200, 50), (len(verses), 50)):
+        print(json.dumps(benchmark(verses[:n_items], themed[:n_verses])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+# Document in the `meta` collection whose counter changes on every corpus write
+CORPUS_META_ID = "corpus"
+
+
+def bump_corpus_version(db) -> int:
+    """Record that the entries collection changed; returns the new version"""
+    doc = db.meta.find_one_and_update(
+        {"_id": CORPUS_META_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+
+def record_vector_storage(db, storage: str) -> int:
+    """
+    Record how `vector` is stored ("array" or "binary"); counts as a corpus
+    write so readers re-check it with the corpus version. Returns the new version.
+    """
+    doc = db.meta.find_one_and_update(
+        {"_id": CORPUS_META_ID},
+        {"$inc": {"version": 1}, "$set": {"vector_storage": storage, "updated_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+
+def read_vector_storage(db) -> str:
+    """Recorded `vector` storage, "array" when nothing has been recorded"""
+    doc = db.meta.find_one({"_id": CORPUS_META_ID}, {"vector_storage": 1})
+    return (doc or {}).get("vector_storage", "array")
+
+
+def read_corpus_version(db) -> int:
+    """Current corpus write counter (0 before the first recorded write)"""
+    doc = db.meta.find_one({"_id": CORPUS_META_ID}, {"version": 1})
+    return doc["version"] if doc else 0
+
+
+def corpus_fingerprint(db, collection) -> str:
+    """Write counter, document count and newest _id of the entries collection"""
+    newest = collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return (f"{read_corpus_version(db)}:{collection.estimated_document_count()}:"
+            f"{newest['_id'] if newest else ''}")
@@ -0,0 +1,142 @@
+"""
+Corpus-wide TF-IDF model used by UniversalSynthesizer for theme detection.
+
+The vocabulary and IDF weights are fitted once over the content of every
+entry and persisted to TFIDF_MODEL_PATH, so a blend only transforms its
+handful of retrieved texts into a sparse matrix and ranks the terms that
+actually occur in them.
+
+    python -m core.knowledge.corpus_tfidf [--path cache/tfidf.npz]
+
+refits the model from the entries collection; the importer refits it after
+every import. Each model is stamped with the corpus_meta write counter it
+was fitted at, so readers can tell when it no longer describes the corpus.
+"""
+import argparse
+import json
+import logging
+import os
+from typing import Iterable, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .corpus_meta import read_corpus_version
+
+logger = logging.getLogger(__name__)
+
+
+def corpus_version_of(collection) -> str:
+    """Version stamp for a model fitted over collection: its database's corpus write counter"""
+    return str(read_corpus_version(collection.database))
+
+
+class CorpusTfidf:
+    """TfidfVectorizer whose vocabulary and IDF come from the whole corpus"""
+
+    def __init__(self, max_features: int = 5000):
+        self.max_features = max_features
+        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=max_features)
+        self.terms = np.empty(0, dtype=object)
+        self.corpus_version: Optional[str] = None
+        # Corpus version the IDF was fitted at; unlike corpus_version it is never re-stamped
+        self.fit_version: Optional[str] = None
+        self.documents = 0
+
+    @classmethod
+    def from_collection(cls, collection, corpus_version: Optional[str] = None,
+                        batch_size: int = 2000, **options) -> "CorpusTfidf":
+        """Fit over the `content` field of every entry, stamped with the current corpus version"""
+        if corpus_version is None:
+            corpus_version = corpus_version_of(collection)
+        cursor = collection.find({"content": {"$exists": True}}, {"content": 1}, batch_size=batch_size)
+        model = cls(**options)
+        model.fit(doc.get("content") or "" for doc in cursor)
+        model.corpus_version = model.fit_version = corpus_version
+        logger.info(f"Fitted corpus TF-IDF over {model.documents} entries "
+                    f"with {len(model.terms)} terms")
+        return model
+
+    def fit(self, texts: Iterable[str]) -> "CorpusTfidf":
+        texts = list(texts)
+        self.vectorizer.fit(texts)
+        self.terms = self.vectorizer.get_feature_names_out()
+        self.documents = len(texts)
+        return self
+
+    @property
+    def fitted(self) -> bool:
+        return len(self.terms) > 0
+
+    def top_terms(self, texts: List[str], k: int = 5) -> List[str]:
+        """The k terms with the highest TF-IDF summed over texts, ties broken alphabetically"""
+        if not texts or not self.fitted:
+            return []
+        matrix = self.vectorizer.transform(texts)
+        columns, inverse = np.unique(matrix.indices, return_inverse=True)
+        scores = np.bincount(inverse, weights=matrix.data)
+        # Vocabulary columns are in alphabetical order, so lexsort on them is a stable tie-break
+        order = np.lexsort((columns, -scores))[:k]
+        return [str(self.terms[columns[i]]) for i in order]
+
+    def document_terms(self, texts: List[str], k: int = 5) -> List[List[str]]:
+        """The k best terms of each text on its own"""
+        if not texts or not self.fitted:
+            return [[] for _ in texts]
+        matrix = self.vectorizer.transform(texts)
+        result = []
+        for row in range(matrix.shape[0]):
+            start, stop = matrix.indptr[row], matrix.indptr[row + 1]
+            columns, scores = matrix.indices[start:stop], matrix.data[start:stop]
+            order = np.lexsort((columns, -scores))[:k]
+            result.append([str(self.terms[columns[i]]) for i in order])
+        return result
+
+    def save(self, path: str):
+        """Persist vocabulary and IDF to a single .npz file"""
+        meta = {
+            "max_features": self.max_features,
+            "corpus_version": self.corpus_version,
+            "fit_version": self.fit_version,
+            "documents": self.documents,
+            "terms": [str(term) for term in self.terms],
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, idf=self.vectorizer.idf_, meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CorpusTfidf":
+        """Load a model written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            idf = data["idf"]
+            meta = json.loads(str(data["meta"]))
+        model = cls(max_features=meta["max_features"])
+        model.vectorizer = TfidfVectorizer(stop_words='english', vocabulary=meta["terms"])
+        model.vectorizer.idf_ = idf
+        model.terms = np.asarray(meta["terms"], dtype=object)
+        model.corpus_version = meta["corpus_version"]
+        model.fit_version = meta.get("fit_version", meta["corpus_version"])
+        model.documents = meta["documents"]
+        logger.info(f"Loaded corpus TF-IDF with {len(model.terms)} terms from {path}")
+        return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refit the corpus TF-IDF model")
+    parser.add_argument("--path", default=os.getenv("TFIDF_MODEL_PATH") or "cache/tfidf.npz")
+    args = parser.parse_args()
+
+    from .knowledge_db import KnowledgeRetriever
+
+    db = KnowledgeRetriever()
+    model = CorpusTfidf.from_collection(db.collection)
+    model.save(args.path)
+    logger.info(f"Saved corpus TF-IDF to {args.path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,111 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from core.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Cache key for a query: lowercased with whitespace collapsed"""
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of query embeddings.
+
+    An in-memory LRU (with optional TTL) sits in front of an optional
+    SQLite file so repeated questions survive a restart. Keys are the
+    normalized text; the model name, inference backend and weights
+    revision are stored with every row so switching encoders never serves
+    vectors computed by another one.
+    """
+
+    def __init__(self, model_name: str, maxsize: int = 1024,
+                 ttl: Optional[float] = None, path: Optional[str] = None,
+                 backend: str = "torch", revision: Optional[str] = None):
+        self.model_name = f"{model_name}@{revision or 'unknown'}/{backend}"
+        self.ttl = ttl
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.disk_hits = 0
+        self._db = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._open_disk_tier(path)
+
+    def _open_disk_tier(self, path: str):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT, key TEXT, vector BLOB, created_at REAL, "
+                "PRIMARY KEY (model, key))"
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache disabled: {str(e)}")
+            self._db = None
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = normalize_text(text)
+        vector = self.memory.get(key)
+        if vector is None and self._db is not None:
+            vector = self._disk_get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self.memory.set(key, vector)
+        return vector
+
+    def set(self, text: str, vector: np.ndarray):
+        key = normalize_text(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        self.memory.set(key, vector)
+        if self._db is not None:
+            self._disk_set(key, vector)
+
+    def get_or_encode(self, text: str, encode: Callable[[str], np.ndarray]) -> np.ndarray:
+        """Return the cached embedding or encode the normalized text once"""
+        vector = self.get(text)
+        if vector is None:
+            vector = np.asarray(encode(normalize_text(text)), dtype=np.float32)
+            self.set(text, vector)
+        return vector
+
+    def _disk_get(self, key: str) -> Optional[np.ndarray]:
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT vector, created_at FROM embeddings WHERE model = ? AND key = ?",
+                    (self.model_name, key)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache read failed: {str(e)}")
+            return None
+        if not row or (self.ttl and row[1] + self.ttl < time.time()):
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def _disk_set(self, key: str, vector: np.ndarray):
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                    (self.model_name, key, vector.tobytes(), time.time())
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache write failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_enabled"] = self._db is not None
+        return stats
@@ -0,0 +1,215 @@
+"""
+Per-entry fields derived from content once, at ingest, instead of per request.
+
+    keywords    distinct words SacredScanner matches against themes
+    themes      synthesizer theme labels from the entry's top terms and tags
+    mood_delta  the entry's contribution to UniversalSynthesizer's mood score
+    top_terms   best terms of the entry under the corpus TF-IDF model
+
+VerseImporter enriches new entries before inserting them when the saved
+TF-IDF model is current, and refits the model and enriches the rest once an
+import finishes. Each entry records the fit its top_terms came from, so a
+refit re-enriches entries enriched under the previous model. Entries
+written before this existed, by an older ENRICHMENT_VERSION or under
+another TF-IDF fit, are filled in by
+
+    python -m core.knowledge.enrichment [--batch-size 500] [--limit N]
+
+which, like migrate_vectors, pages by _id and can be re-run at any time.
+"""
+import argparse
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+from .contradictions import extract_keywords
+from .corpus_meta import bump_corpus_version
+from .corpus_tfidf import CorpusTfidf, corpus_version_of
+
+logger = logging.getLogger(__name__)
+
+# Bump when the definition of any enriched field changes
+ENRICHMENT_VERSION = 1
+
+THEME_HIERARCHY = {
+    'comfort': ['lonely', 'sad', 'ease', 'peace', 'solace', 'heal'],
+    'mercy': ['forgive', 'compassion', 'kind', 'merciful', 'pardon', 'grace'],
+    'wisdom': ['knowledge', 'understanding', 'insight', 'learn', 'teach'],
+    'prayer': ['supplication', 'dua', 'worship', 'invocation', 'pray'],
+    'prophets': ['muhammad', 'isa', 'musa', 'abraham', 'david', 'solomon']
+}
+
+POSITIVE_WORDS = ['hope', 'love', 'peace', 'joy', 'mercy']
+NEGATIVE_WORDS = ['lonely', 'suffering', 'pain', 'fear', 'anger']
+MOOD_STEP = 0.02
+
+def stale_filter(tfidf: CorpusTfidf) -> Dict:
+    """Entries enriched by another ENRICHMENT_VERSION or TF-IDF fit than tfidf's, or never"""
+    return {"$or": [{"enrichment_version": {"$ne": ENRICHMENT_VERSION}},
+                    {"tfidf_version": {"$ne": tfidf.fit_version}}]}
+
+
+def distinct_keywords(text: str) -> List[str]:
+    """extract_keywords without repeats, in order of first appearance"""
+    return list(dict.fromkeys(extract_keywords(text)))
+
+
+def mood_delta(text: str) -> float:
+    """Shift of the 0..1 mood score: +MOOD_STEP per positive word present, - per negative"""
+    text = (text or "").lower()
+    positive = sum(1 for word in POSITIVE_WORDS if word in text)
+    negative = sum(1 for word in NEGATIVE_WORDS if word in text)
+    return round(MOOD_STEP * (positive - negative), 4)
+
+
+def theme_labels(terms: Iterable[str]) -> List[str]:
+    """THEME_HIERARCHY themes whose keywords include any term, in term order"""
+    detected = []
+    for term in terms:
+        for theme, keywords in THEME_HIERARCHY.items():
+            if term in keywords and theme not in detected:
+                detected.append(theme)
+    return detected
+
+
+class DocumentEnricher:
+    """Computes the enriched fields for batches of entries"""
+
+    def __init__(self, tfidf: CorpusTfidf, top_k: int = 5):
+        self.tfidf = tfidf
+        self.top_k = top_k
+
+    def enrich(self, docs: List[Dict]) -> List[Dict]:
+        """Enriched fields for each doc, row-aligned with docs"""
+        texts = [doc.get("content") or "" for doc in docs]
+        top_terms = self.tfidf.document_terms(texts, k=self.top_k)
+        return [
+            {
+                "keywords": distinct_keywords(text),
+                "themes": theme_labels(terms + list(doc.get("tags") or [])),
+                "mood_delta": mood_delta(text),
+                "top_terms": terms,
+                "enrichment_version": ENRICHMENT_VERSION,
+                "tfidf_version": self.tfidf.fit_version,
+            }
+            for doc, text, terms in zip(docs, texts, top_terms)
+        ]
+
+    def enrich_in_place(self, docs: List[Dict]) -> List[Dict]:
+        for doc, fields in zip(docs, self.enrich(docs)):
+            doc.update(fields)
+        return docs
+
+
+def load_corpus_tfidf(collection, path: Optional[str] = None, refit: bool = False,
+                      fit_missing: bool = True) -> CorpusTfidf:
+    """
+    The persisted corpus TF-IDF model.
+
+    A model missing from `path`, or fitted at another corpus version, is
+    refitted over the collection and saved when `fit_missing` is set.
+    Without it, a stale model is returned with a warning and a missing one
+    as an empty model, so request-serving processes never fit the corpus.
+    """
+    path = path if path is not None else os.getenv("TFIDF_MODEL_PATH", "cache/tfidf.npz")
+    model = None
+    if path and os.path.exists(path) and not refit:
+        model = CorpusTfidf.load(path)
+        version = corpus_version_of(collection)
+        if model.corpus_version == version:
+            return model
+        logger.warning(f"Corpus TF-IDF at {path} was fitted at corpus version "
+                       f"{model.corpus_version}, the corpus is at {version}")
+    if not (refit or fit_missing):
+        if model is None:
+            logger.warning(f"No corpus TF-IDF at {path}; run python -m core.knowledge.corpus_tfidf")
+        return model or CorpusTfidf()
+    model = CorpusTfidf.from_collection(collection)
+    if path:
+        model.save(path)
+    return model
+
+
+def mark_enriched(db, tfidf: CorpusTfidf, path: Optional[str] = None) -> int:
+    """
+    Bump the corpus version after enrichment rewrote search payloads.
+
+    Content is unchanged, so the TF-IDF model used is re-stamped with the
+    new version rather than left looking stale.
+    """
+    version = bump_corpus_version(db)
+    path = path if path is not None else os.getenv("TFIDF_MODEL_PATH", "cache/tfidf.npz")
+    if tfidf.fitted and path:
+        tfidf.corpus_version = str(version)
+        tfidf.save(path)
+    return version
+
+
+def backfill_enrichment(collection, enricher: DocumentEnricher, batch_size: int = 500,
+                        limit: Optional[int] = None) -> Dict[str, int]:
+    """Enrich every entry not enriched by this enricher's version and fit; returns progress counters"""
+    stale = stale_filter(enricher.tfidf)
+    stats = {"scanned": 0, "enriched": 0}
+    remaining = collection.count_documents(stale)
+    logger.info(f"{remaining} entries need enrichment")
+    started = time.time()
+    last_id = None
+
+    while limit is None or stats["scanned"] < limit:
+        query = dict(stale)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        size = batch_size if limit is None else min(batch_size, limit - stats["scanned"])
+        batch = list(collection.find(query, {"content": 1, "tags": 1}).sort("_id", 1).limit(size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        operations = [
+            UpdateOne({"_id": doc["_id"], **stale}, {"$set": fields})
+            for doc, fields in zip(batch, enricher.enrich(batch))
+        ]
+        result = collection.bulk_write(operations, ordered=False)
+        stats["scanned"] += len(batch)
+        stats["enriched"] += result.modified_count
+
+        rate = stats["scanned"] / max(time.time() - started, 1e-9)
+        logger.info(f"Enriched {stats['enriched']}/{remaining} entries "
+                    f"({rate:.0f} docs/s, last _id {last_id})")
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill enriched fields on entries")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many documents")
+    parser.add_argument("--refit", action="store_true", help="refit the corpus TF-IDF model first")
+    args = parser.parse_args()
+
+    load_dotenv('.env')
+    atlas_uri = os.getenv("MONGODB_URI")
+    if not atlas_uri:
+        raise ValueError("MONGODB_URI environment variable not set")
+
+    client = MongoClient(atlas_uri)
+    try:
+        db = client["AdamAI-KnowledgeDB"]
+        enricher = DocumentEnricher(load_corpus_tfidf(db.entries, refit=args.refit))
+        stats = backfill_enrichment(db.entries, enricher, batch_size=args.batch_size,
+                                    limit=args.limit)
+        if stats["enriched"]:
+            # Search payloads changed, so cached results and snapshots are stale
+            mark_enriched(db, enricher.tfidf)
+        logger.info(f"Enrichment finished: {stats}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,192 @@
+import json
+import numbers
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Document fields that can be used to filter local vector searches
+FILTER_FIELDS = (
+    "source",
+    "tags",
+    "metadata.revelation_type",
+    "metadata.surah_number",
+    "metadata.book",
+    "metadata.chapter",
+)
+
+_RANGE_OPS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+def get_field(doc: Dict, field: str) -> Any:
+    """Read a dotted field path such as 'metadata.book' from a document"""
+    value = doc
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def filter_key(filters: Optional[Dict]) -> str:
+    """Canonical string for a filter dict, used to cache its mask"""
+    return json.dumps(filters or {}, sort_keys=True, default=str)
+
+
+def source_filter(source: Optional[str], filters: Optional[Dict] = None) -> Dict:
+    """Merge the legacy `source` argument into a filter dict"""
+    merged = dict(filters or {})
+    if source:
+        merged["source"] = source
+    return merged
+
+
+def matches(doc: Dict, filters: Optional[Dict]) -> bool:
+    """Evaluate a filter dict against a single document in Python"""
+    for field, condition in (filters or {}).items():
+        value = get_field(doc, field)
+        values = value if isinstance(value, list) else [value]
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$in":
+                    ok = any(v in operand for v in values)
+                elif op == "$nin":
+                    ok = not any(v in operand for v in values)
+                elif op == "$ne":
+                    ok = operand not in values
+                elif op in _RANGE_OPS:
+                    ok = any(isinstance(v, numbers.Number) and bool(_RANGE_OPS[op](v, operand))
+                             for v in values)
+                else:
+                    raise ValueError(f"Unsupported filter operator '{op}'")
+                if not ok:
+                    return False
+        elif condition not in values:
+            return False
+    return True
+
+
+class FilterColumns:
+    """
+    Columnar copy of the filterable fields of every indexed row.
+
+    Strings are dictionary-encoded to int32 codes (-1 when missing),
+    numbers are stored as float64 (NaN when missing) and list fields such
+    as tags as one boolean column per distinct value. Filters compile to
+    boolean masks with a handful of vectorized comparisons.
+    """
+
+    def __init__(self, size: int = 0):
+        self.size = size
+        self.codes: Dict[str, np.ndarray] = {}
+        self.vocab: Dict[str, List[str]] = {}
+        self.numbers: Dict[str, np.ndarray] = {}
+        self.lists: Dict[str, Dict[str, np.ndarray]] = {}
+
+    @classmethod
+    def from_attributes(cls, attributes: Sequence[Dict]) -> "FilterColumns":
+        columns = cls(len(attributes))
+        for field in FILTER_FIELDS:
+            values = [get_field(attrs, field) for attrs in attributes]
+            present = [v for v in values if v is not None]
+            if present and all(isinstance(v, list) for v in present):
+                flags = {}
+                for row, items in enumerate(values):
+                    for item in items or []:
+                        flags.setdefault(str(item), np.zeros(len(values), dtype=bool))[row] = True
+                columns.lists[field] = flags
+            elif present and all(isinstance(v, numbers.Number) and not isinstance(v, bool)
+                                 for v in present):
+                columns.numbers[field] = np.array(
+                    [np.nan if v is None else v for v in values], dtype=np.float64)
+            else:
+                vocab = sorted({str(v) for v in present})
+                lookup = {v: i for i, v in enumerate(vocab)}
+                columns.vocab[field] = vocab
+                columns.codes[field] = np.array(
+                    [-1 if v is None else lookup[str(v)] for v in values], dtype=np.int32)
+        return columns
+
+    def take(self, order: np.ndarray) -> "FilterColumns":
+        """Reorder every column to follow a row permutation"""
+        columns = FilterColumns(len(order))
+        columns.vocab = self.vocab
+        columns.codes = {f: c[order] for f, c in self.codes.items()}
+        columns.numbers = {f: c[order] for f, c in self.numbers.items()}
+        columns.lists = {f: {v: c[order] for v, c in flags.items()} for f, flags in self.lists.items()}
+        return columns
+
+    def mask(self, filters: Dict) -> np.ndarray:
+        """Boolean row mask for a Mongo-style filter dict"""
+        result = np.ones(self.size, dtype=bool)
+        for field, condition in filters.items():
+            conditions = condition if isinstance(condition, dict) else {"$eq": condition}
+            for op, operand in conditions.items():
+                result &= self._condition_mask(field, op, operand)
+        return result
+
+    def _condition_mask(self, field: str, op: str, operand: Any) -> np.ndarray:
+        if op in ("$eq", "$in", "$ne", "$nin"):
+            wanted = operand if op in ("$in", "$nin") else [operand]
+            hit = self._membership(field, wanted)
+            return ~hit if op in ("$ne", "$nin") else hit
+        if op in _RANGE_OPS and field in self.numbers:
+            column = self.numbers[field]
+            with np.errstate(invalid="ignore"):
+                return _RANGE_OPS[op](column, operand) & ~np.isnan(column)
+        if field not in self.codes and field not in self.numbers and field not in self.lists:
+            raise ValueError(f"Field '{field}' is not filterable in the local index")
+        if op in _RANGE_OPS and not self.vocab.get(field):
+            # Field never appears in the corpus, so nothing can match
+            return np.zeros(self.size, dtype=bool)
+        raise ValueError(f"Unsupported filter operator '{op}' for field '{field}'")
+
+    def _membership(self, field: str, wanted: Sequence) -> np.ndarray:
+        if field in self.codes:
+            lookup = {v: i for i, v in enumerate(self.vocab[field])}
+            codes = [lookup[str(v)] for v in wanted if str(v) in lookup]
+            return np.isin(self.codes[field], codes)
+        if field in self.numbers:
+            return np.isin(self.numbers[field], [float(v) for v in wanted])
+        if field in self.lists:
+            hit = np.zeros(self.size, dtype=bool)
+            for value in wanted:
+                flags = self.lists[field].get(str(value))
+                if flags is not None:
+                    hit |= flags
+            return hit
+        if field in FILTER_FIELDS:
+            # Field never appears in the corpus, so nothing can match
+            return np.zeros(self.size, dtype=bool)
+        raise ValueError(f"Field '{field}' is not filterable in the local index")
+
+    def to_state(self) -> Dict:
+        """Arrays and JSON metadata for persisting the columns"""
+        arrays = {}
+        for field, column in self.codes.items():
+            arrays[f"codes:{field}"] = column
+        for field, column in self.numbers.items():
+            arrays[f"numbers:{field}"] = column
+        for field, flags in self.lists.items():
+            for value, column in flags.items():
+                arrays[f"list:{field}:{value}"] = column
+        return {"arrays": arrays, "meta": {"size": self.size, "vocab": self.vocab}}
+
+    @classmethod
+    def from_state(cls, arrays: Dict[str, np.ndarray], meta: Dict) -> "FilterColumns":
+        columns = cls(meta["size"])
+        columns.vocab = meta["vocab"]
+        for key, column in arrays.items():
+            kind, _, rest = key.partition(":")
+            if kind == "codes":
+                columns.codes[rest] = column
+            elif kind == "numbers":
+                columns.numbers[rest] = column
+            elif kind == "list":
+                field, _, value = rest.partition(":")
+                columns.lists.setdefault(field, {})[value] = column
+        return columns
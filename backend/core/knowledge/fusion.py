@@ -0,0 +1,82 @@
+from typing import Callable, Dict, List
+
+# Relative weight of the vector and text legs in weighted fusion
+VECTOR_WEIGHT = 0.6
+TEXT_WEIGHT = 0.4
+
+# Damping constant from the original reciprocal-rank fusion paper
+RRF_K = 60
+
+
+def _merge(vector_results: List[Dict], text_results: List[Dict]) -> Dict[str, Dict]:
+    """Deduplicate both legs by _id, keeping the first (vector) copy of a doc"""
+    combined = {}
+    for doc in vector_results + text_results:
+        combined.setdefault(str(doc['_id']), doc)
+    return combined
+
+
+def _normalized_scores(results: List[Dict]) -> Dict[str, float]:
+    """Map _id to score divided by the leg's best score"""
+    max_score = max((doc.get('score') or 0 for doc in results), default=0) or 1
+    scores = {}
+    for doc in results:
+        scores.setdefault(str(doc['_id']), (doc.get('score') or 0) / max_score)
+    return scores
+
+
+def _rank(combined: Dict[str, Dict], scores: Dict[str, float], limit: int) -> List[Dict]:
+    for doc_id, doc in combined.items():
+        doc['combined_score'] = scores.get(doc_id, 0)
+    return sorted(combined.values(), key=lambda x: x['combined_score'], reverse=True)[:limit]
+
+
+def weighted_fusion(vector_results: List[Dict], text_results: List[Dict], limit: int) -> List[Dict]:
+    """0.6 * normalized vector score + 0.4 * normalized text score"""
+    combined = _merge(vector_results, text_results)
+    vector_scores = _normalized_scores(vector_results)
+    text_scores = _normalized_scores(text_results)
+    scores = {
+        doc_id: VECTOR_WEIGHT * vector_scores.get(doc_id, 0) + TEXT_WEIGHT * text_scores.get(doc_id, 0)
+        for doc_id in combined
+    }
+    return _rank(combined, scores, limit)
+
+
+def reciprocal_rank_fusion(vector_results: List[Dict], text_results: List[Dict], limit: int) -> List[Dict]:
+    """Sum of 1 / (RRF_K + rank) over both legs; ignores raw score scales"""
+    combined = _merge(vector_results, text_results)
+    scores: Dict[str, float] = {}
+    for results in (vector_results, text_results):
+        seen = set()
+        for rank, doc in enumerate(results, start=1):
+            doc_id = str(doc['_id'])
+            if doc_id not in seen:
+                seen.add(doc_id)
+                scores[doc_id] = scores.get(doc_id, 0) + 1.0 / (RRF_K + rank)
+    return _rank(combined, scores, limit)
+
+
+def max_score_fusion(vector_results: List[Dict], text_results: List[Dict], limit: int) -> List[Dict]:
+    """Best normalized score from either leg"""
+    combined = _merge(vector_results, text_results)
+    vector_scores = _normalized_scores(vector_results)
+    text_scores = _normalized_scores(text_results)
+    scores = {
+        doc_id: max(vector_scores.get(doc_id, 0), text_scores.get(doc_id, 0))
+        for doc_id in combined
+    }
+    return _rank(combined, scores, limit)
+
+
+FUSION_STRATEGIES: Dict[str, Callable[[List[Dict], List[Dict], int], List[Dict]]] = {
+    'weighted': weighted_fusion,
+    'rrf': reciprocal_rank_fusion,
+    'max': max_score_fusion
+}
+
+
+def get_fusion(name: str) -> Callable[[List[Dict], List[Dict], int], List[Dict]]:
+    if name not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy '{name}', expected one of {sorted(FUSION_STRATEGIES)}")
+    return FUSION_STRATEGIES[name]
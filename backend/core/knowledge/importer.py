@@ -1,15 +1,19 @@
 import os
 import requests
 from pymongo import MongoClient
-from sentence_transformers import SentenceTransformer
 from datetime import datetime
 import logging
 from enum import Enum
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from tqdm import tqdm
 import json
 import time
+from .vector_codec import encode_for_storage
+from .corpus_meta import bump_corpus_version, record_vector_storage
+from .corpus_tfidf import corpus_version_of
+from .enrichment import DocumentEnricher, backfill_enrichment, load_corpus_tfidf, mark_enriched
+from core.utils.model_registry import registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,8 +36,14 @@ class VerseImporter:
         )
         self.db = self.client["AdamAI-KnowledgeDB"]
         self.entries = self.db.entries
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        # Stored vectors are the reference the optimized backends are checked against, so always torch
+        self.embedder = registry.sentence_transformer('all-MiniLM-L6-v2')
+        # "array" (BSON doubles) or "binary" (packed float32 BinData)
+        self.vector_storage = os.getenv("VECTOR_STORAGE", "array").lower()
         self._initialize_database()
+        # Loaded on the first inserted batch, see _load_enricher
+        self.enricher = None
+        self._enricher_loaded = False
 
     def _initialize_database(self):
         """Initialize database with proper indexes and search configuration"""
@@ -72,6 +82,7 @@ class VerseImporter:
                             "type": "string",
                             "analyzer": "lucene.keyword"
                         },
+                        # Legacy knnVector mapping: indexes array vectors only, not VECTOR_STORAGE=binary
                         "vector": {
                             "type": "knnVector",
                             "dimensions": 384,
@@ -126,6 +137,46 @@ class VerseImporter:
         else:
             logger.info("Using existing search index")
 
+    def _load_enricher(self) -> Optional[DocumentEnricher]:
+        """
+        Enricher over the saved TF-IDF model when it matches the corpus. A
+        missing or stale model is not refitted mid-import; enrich_entries()
+        refits it once the import is done and enriches the skipped entries,
+        along with those enriched here under the previous fit.
+        """
+        tfidf = load_corpus_tfidf(self.entries, fit_missing=False)
+        if not tfidf.fitted or tfidf.corpus_version != corpus_version_of(self.entries):
+            logger.info("Entries will be enriched after import")
+            return None
+        return DocumentEnricher(tfidf)
+
+    def enrich_entries(self, refit: bool = False) -> Dict[str, int]:
+        """Backfill enriched fields on every entry, refitting TF-IDF first if asked or stale"""
+        self.enricher = DocumentEnricher(load_corpus_tfidf(self.entries, refit=refit))
+        self._enricher_loaded = True
+        stats = backfill_enrichment(self.entries, self.enricher)
+        if stats["enriched"]:
+            mark_enriched(self.db, self.enricher.tfidf)
+        return stats
+
+    def _insert_batch(self, operations: List[Dict]):
+        """Insert new entries and bump the corpus version so readers drop stale caches"""
+        if not self._enricher_loaded:
+            self.enricher = self._load_enricher()
+            self._enricher_loaded = True
+        if self.enricher:
+            self.enricher.enrich_in_place(operations)
+        self.entries.insert_many(operations)
+        if self.vector_storage == "binary":
+            # Also bumps the version; aggregation readers then switch to a local index
+            record_vector_storage(self.db, "binary")
+        else:
+            bump_corpus_version(self.db)
+
+    def _embed(self, text: str):
+        """Embedding of text in the configured storage format"""
+        return encode_for_storage(self.embedder.encode(text), self.vector_storage)
+
     def _generate_tags(self, text: str) -> List[str]:
         """Generate thematic tags using NLP"""
         themes = {
@@ -153,7 +204,7 @@ class VerseImporter:
                         "source": KnowledgeSource.QURAN.value,
                         "content": ayah['text'],
                         "tags": self._generate_tags(ayah['text']),
-                        "vector": self.embedder.encode(ayah['text']).tolist(),
+                        "vector": self._embed(ayah['text']),
                         "metadata": {
                             "reference": f"{surah['number']}:{ayah['numberInSurah']}",
                             "surah_number": surah['number'],
@@ -167,12 +218,12 @@ class VerseImporter:
                     
                     # Batch insert for better performance
                     if len(operations) >= 100:
-                        self.entries.insert_many(operations)
+                        self._insert_batch(operations)
                         operations = []
             
             # Insert remaining documents
             if operations:
-                self.entries.insert_many(operations)
+                self._insert_batch(operations)
                 
             count = self.entries.count_documents({"source": "quran"})
             logger.info(f"✅ Quran import complete: {count} verses")
@@ -215,7 +266,7 @@ class VerseImporter:
                                 "source": KnowledgeSource.BIBLE.value,
                                 "content": data["text"],
                                 "tags": self._generate_tags(data["text"]),
-                                "vector": self.embedder.encode(data["text"]).tolist(),
+                                "vector": self._embed(data["text"]),
                                 "metadata": {
                                     "reference": f"{book['name']} {chapter}:{verse}",
                                     "book": book["name"],
@@ -229,7 +280,7 @@ class VerseImporter:
                         
                             # Batch insert
                             if len(operations) >= 50:
-                                self.entries.insert_many(operations)
+                                self._insert_batch(operations)
                                 operations = []
                             
                             verse += 1
@@ -243,7 +294,7 @@ class VerseImporter:
         
             # Insert remaining documents
             if operations:
-                self.entries.insert_many(operations)
+                self._insert_batch(operations)
             
             count = self.entries.count_documents({"source": "bible"})
             logger.info(f"✅ Bible import complete: {count} verses")
@@ -264,10 +315,14 @@ def main():
         # Clear existing data for fresh import
         logger.info("Clearing existing data...")
         importer.entries.delete_many({})
+        bump_corpus_version(importer.db)
         
+
         # Run imports
         importer.import_quran_verses()
         importer.import_bible_verses()
+        # One refit over the imported corpus, then enrich everything
+        importer.enrich_entries(refit=True)
         
         # Print summary
         stats = {
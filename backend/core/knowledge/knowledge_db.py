@@ -1,56 +1,28 @@
-from logging.handlers import RotatingFileHandler
 import os
 import logging
 from typing import Dict, List, Optional
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
-from sentence_transformers import SentenceTransformer
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 from dotenv import load_dotenv
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import threading
+import time
 import numpy as np
+from .vector_index import PAYLOAD_FIELDS, ExactVectorIndex, snapshot_version, write_snapshot
+from .ann_index import IVFIndex
+from .quantized_index import QuantizedVectorIndex
+from .bm25_index import BM25Index
+from .embedding_cache import EmbeddingCache, normalize_text
+from .fusion import get_fusion
+from .filters import filter_key, matches, source_filter
+from .vector_codec import unpack_vector
+from .corpus_meta import corpus_fingerprint, read_vector_storage
+from core.utils.encoders import cosine_agreement, encoder_revision
+from core.utils.model_registry import registry
 
-def configure_logging():
-    """Configure dual logging - file and console"""
-    # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
-    # Main logger configuration
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
-    # File handler (for all logs)
-    file_handler = RotatingFileHandler(
-        'logs/adam_system.log',
-        maxBytes=5*1024*1024,  # 5MB
-        backupCount=3
-    )
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    ))
-    
-    # Console handler (only ERROR and above)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.ERROR)  # Only show errors in console
-    
-    # Add handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    # Special ready logger for console
-    ready_logger = logging.getLogger('adam_ready')
-    ready_logger.propagate = False
-    ready_handler = logging.StreamHandler()
-    ready_handler.setLevel(logging.INFO)
-    ready_handler.setFormatter(logging.Formatter('%(message)s'))
-    ready_logger.addHandler(ready_handler)
-
-    # Suppress sentence_transformers logs
-    logging.getLogger('sentence_transformers').setLevel(logging.WARNING)
-    logging.getLogger('transformers').setLevel(logging.WARNING)
-
-# Call this at the start of your application
-configure_logging()
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -62,6 +34,22 @@ class KnowledgeSource(Enum):
     ARTICLE = "article"
     WIKIPEDIA = "wikipedia"
 
+class _Leg:
+    """One hybrid search leg on the search pool, timed from when it starts running"""
+
+    def __init__(self, pool: ThreadPoolExecutor, name: str, query: str, fn, *args):
+        self.name = name
+        self.query = query
+        self.started = threading.Event()
+        self.started_at = None
+        self.future = pool.submit(self._run, fn, args)
+
+    def _run(self, fn, args):
+        self.started_at = time.monotonic()
+        self.started.set()
+        return fn(*args)
+
+
 class KnowledgeRetriever:
     def __init__(self, db_uri: str = None, db_name: str = "AdamAI-KnowledgeDB"):
         """
@@ -73,9 +61,47 @@ class KnowledgeRetriever:
             raise ValueError("MongoDB URI not provided and MONGODB_URI not found in .env")
             
         self.db_name = db_name
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # ENCODER_BACKEND picks torch, torch-int8, onnx or onnx-int8 inference
+        self.encoder_backend = os.getenv("ENCODER_BACKEND", "torch").lower()
+        try:
+            self.embedding_model = registry.encoder('all-MiniLM-L6-v2', self.encoder_backend)
+        except Exception as e:
+            logger.warning(f"Encoder backend {self.encoder_backend} unavailable, using torch: {str(e)}")
+            self.encoder_backend = "torch"
+            self.embedding_model = registry.encoder('all-MiniLM-L6-v2', "torch")
+        self.embedding_cache = self._new_embedding_cache()
+        # Local index mode used when Atlas vector search is off: "exact", "ivf",
+        # or "none" to keep the server-side $dotProduct aggregation
+        self.vector_index_mode = os.getenv("VECTOR_INDEX", "none").lower()
+        if self.vector_index_mode == "none" and os.getenv("VECTOR_STORAGE", "array").lower() == "binary":
+            # $dotProduct cannot read packed BinData vectors, so score them locally
+            self.vector_index_mode = "exact"
+        # Corpus version at which the recorded vector storage was last read
+        self._storage_checked_version = None
+        # Compact codes for the exact index: "none", "float16" or "int8"
+        self.vector_quantization = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+        self.vector_index = None
+        self._vector_index_lock = threading.Lock()
+        # Keyword search backend: "mongo" ($text index) or "bm25" (in-process)
+        self.text_index_mode = os.getenv("TEXT_INDEX", "mongo").lower()
+        self.text_index = None
+        self._text_index_lock = threading.Lock()
+        # Seconds a corpus_version() fingerprint is reused before MongoDB is asked again
+        self.corpus_version_ttl = float(os.getenv("CORPUS_VERSION_TTL", "30"))
+        self._corpus_version = None
+        self._corpus_version_at = 0.0
+        # Hybrid search runs its vector and text legs side by side, two legs per
+        # request, so requests served at once never queue behind each other
+        self.fusion = os.getenv("HYBRID_FUSION", "weighted").lower()
+        self.leg_timeout = float(os.getenv("HYBRID_LEG_TIMEOUT", "2.0"))
+        self._search_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("HYBRID_WORKERS", "0")) or 2 * int(os.getenv("SERVING_CONCURRENCY", "8")),
+            thread_name_prefix="adam-search"
+        )
         self._connect()
         self._ensure_indexes()
+        if self.encoder_backend != "torch":
+            self._check_encoder_agreement()
 
     @retry(stop=stop_after_attempt(3),
            wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -104,9 +130,9 @@ class KnowledgeRetriever:
     def _ensure_indexes(self):
         """Internal method to create all required indexes"""
         try:
-            # Text index
+            # Text index (not needed when keyword search runs in-process)
             existing = self.collection.index_information()
-            if not any(idx.get('text') for idx in existing.values()):
+            if self.text_index_mode != "bm25" and not any(idx.get('text') for idx in existing.values()):
                 self.collection.create_index([("content", "text")])
                 logging.getLogger("Created text index on content field")
             
@@ -147,45 +173,343 @@ class KnowledgeRetriever:
             logging.getLogger(f"Text index creation failed: {str(e)}")
             raise RuntimeError("Failed to create text index") from e
 
+    def verify_encoder(self, sample_size: int = 32) -> Dict[str, float]:
+        """Cosine agreement between the active encoder and a sample of stored vectors"""
+        docs = list(self.collection.aggregate([
+            {"$match": {"content": {"$exists": True}, "vector": {"$exists": True}}},
+            {"$sample": {"size": sample_size}},
+            {"$project": {"content": 1, "vector": 1}}
+        ]))
+        if not docs:
+            return {"mean": 1.0, "min": 1.0, "samples": 0}
+        stored = np.vstack([unpack_vector(doc["vector"]) for doc in docs])
+        encoded = self.embedding_model.encode([doc["content"] for doc in docs])
+        return {**cosine_agreement(encoded, stored), "samples": len(docs)}
+
+    def _check_encoder_agreement(self):
+        """Fall back to the torch encoder if the optimized one drifts from stored vectors"""
+        try:
+            agreement = self.verify_encoder()
+        except Exception as e:
+            logger.warning(f"Encoder agreement check skipped: {str(e)}")
+            return
+        threshold = float(os.getenv("ENCODER_MIN_AGREEMENT", "0.99"))
+        logger.info(f"Encoder backend {self.encoder_backend} agreement: {agreement}")
+        if agreement["mean"] < threshold:
+            logger.warning(f"Encoder backend {self.encoder_backend} agrees only "
+                           f"{agreement['mean']:.4f} with stored vectors; using torch")
+            self.encoder_backend = "torch"
+            self.embedding_model = registry.encoder('all-MiniLM-L6-v2', "torch")
+            self.embedding_cache = self._new_embedding_cache()
+
+    def _new_embedding_cache(self) -> EmbeddingCache:
+        """Query embedding cache keyed on the active encoder backend and weights revision"""
+        return EmbeddingCache(
+            'all-MiniLM-L6-v2',
+            maxsize=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("EMBEDDING_CACHE_TTL", "0")) or None,
+            path=os.getenv("EMBEDDING_CACHE_PATH"),
+            backend=self.encoder_backend,
+            revision=encoder_revision(self.embedding_model)
+        )
+
     def _generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for text using the configured model"""
-        return self.embedding_model.encode(text).tolist()
+        return self._encode_query(text).tolist()
+
+    def _encode_query(self, text: str) -> np.ndarray:
+        """Generate embedding for text as a float32 array, reusing cached vectors"""
+        return self.embedding_cache.get_or_encode(text, self.embedding_model.encode)
+
+    def encode_query(self, text: str) -> np.ndarray:
+        """Query embedding shared with the search methods through the embedding cache"""
+        return self._encode_query(text)
+
+    def _encode_queries(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts, encoding every cache miss in a single batch"""
+        vectors = [self.embedding_cache.get(text) for text in texts]
+        missing = sorted({normalize_text(text) for text, vector in zip(texts, vectors) if vector is None})
+        if missing:
+            encoded = dict(zip(missing, np.asarray(
+                self.embedding_model.encode(missing), dtype=np.float32)))
+            for text in missing:
+                self.embedding_cache.set(text, encoded[text])
+            vectors = [vector if vector is not None else encoded[normalize_text(text)]
+                       for text, vector in zip(texts, vectors)]
+        return np.vstack(vectors) if vectors else np.empty((0, 384), dtype=np.float32)
+
+    def _get_vector_index(self) -> ExactVectorIndex:
+        """Load the local vector index on first use and again when the corpus version moves"""
+        if self.vector_index is None:
+            with self._vector_index_lock:
+                if self.vector_index is None:
+                    self.vector_index = self._build_vector_index()
+        elif self.vector_index.corpus_version != self.corpus_version():
+            # One thread reloads while the others keep serving the old index
+            if self._vector_index_lock.acquire(blocking=False):
+                try:
+                    if self.vector_index.corpus_version != self.corpus_version():
+                        self.vector_index = self._build_vector_index()
+                except Exception as e:
+                    logger.error(f"Vector index reload failed: {str(e)}")
+                finally:
+                    self._vector_index_lock.release()
+        return self.vector_index
+
+    def _build_vector_index(self, rebuild: bool = False) -> ExactVectorIndex:
+        """
+        Create the index selected by VECTOR_INDEX, stamped with corpus_version().
+        A saved IVF index at VECTOR_INDEX_PATH, or an embedding snapshot at
+        VECTOR_SNAPSHOT_PATH for the exact index, is reused unless rebuild is
+        set or it was written at another corpus version.
+        With VECTOR_QUANTIZATION the exact index scans float16/int8 codes and
+        re-ranks against the snapshot's memory-mapped float32 rows, so it
+        needs VECTOR_SNAPSHOT_PATH. VECTOR_QUANTIZATION_REPORT=true logs its
+        recall and memory use after loading.
+        """
+        version = self.corpus_version()
+        if self.vector_index_mode != "ivf":
+            snapshot_path = os.getenv("VECTOR_SNAPSHOT_PATH")
+            index_cls, options = ExactVectorIndex, {}
+            if self.vector_quantization != "none" and not snapshot_path:
+                # Re-ranking would need the float32 matrix in memory next to the codes
+                logger.warning("VECTOR_QUANTIZATION needs VECTOR_SNAPSHOT_PATH, using the float32 index")
+            elif self.vector_quantization != "none":
+                index_cls = QuantizedVectorIndex
+                options = {
+                    "precision": self.vector_quantization,
+                    "rerank_factor": int(os.getenv("VECTOR_RERANK_FACTOR", "4"))
+                }
+            if not snapshot_path:
+                index = index_cls.from_collection(self.collection, **options)
+                index.corpus_version = version
+                return index
+            if rebuild or snapshot_version(snapshot_path) != version:
+                # Another worker may have written this version already; then it is only reopened
+                write_snapshot(self.collection, snapshot_path, corpus_version=version)
+            try:
+                index = index_cls.from_snapshot(snapshot_path, **options)
+            except FileNotFoundError:
+                # A concurrent writer replaced the snapshot between the manifest read and the open
+                index = index_cls.from_snapshot(snapshot_path, **options)
+            if (isinstance(index, QuantizedVectorIndex)
+                    and os.getenv("VECTOR_QUANTIZATION_REPORT", "false").lower() == "true"):
+                index.report()
+            return index
+
+        path = os.getenv("VECTOR_INDEX_PATH")
+        if path and os.path.exists(path) and not rebuild:
+            index = IVFIndex.load(path)
+            if index.corpus_version == version:
+                return index
+            logger.info(f"Saved IVF index is from corpus version {index.corpus_version}, rebuilding")
+        index = IVFIndex.from_collection(
+            self.collection,
+            nlist=int(os.getenv("IVF_NLIST", "0")) or None,
+            nprobe=int(os.getenv("IVF_NPROBE", "8"))
+        )
+        index.corpus_version = version
+        if path:
+            index.save(path)
+        return index
+
+    def refresh_vector_index(self):
+        """Rebuild the local vector index from the entries collection"""
+        index = self._build_vector_index(rebuild=True)
+        with self._vector_index_lock:
+            self.vector_index = index
+        return len(index)
+
+    def _get_text_index(self) -> BM25Index:
+        """Load the BM25 index on first use and again when the corpus version moves"""
+        if self.text_index is None:
+            with self._text_index_lock:
+                if self.text_index is None:
+                    self.text_index = self._build_text_index()
+        elif self.text_index.corpus_version != self.corpus_version():
+            # One thread reloads while the others keep serving the old postings
+            if self._text_index_lock.acquire(blocking=False):
+                try:
+                    if self.text_index.corpus_version != self.corpus_version():
+                        self.text_index = self._build_text_index()
+                except Exception as e:
+                    logger.error(f"BM25 index reload failed: {str(e)}")
+                finally:
+                    self._text_index_lock.release()
+        return self.text_index
+
+    def _build_text_index(self, rebuild: bool = False) -> BM25Index:
+        """BM25 index stamped with corpus_version(), reusing BM25_INDEX_PATH when it matches"""
+        version = self.corpus_version()
+        path = os.getenv("BM25_INDEX_PATH")
+        if path and os.path.exists(path) and not rebuild:
+            index = BM25Index.load(path)
+            if index.corpus_version == version:
+                return index
+            logger.info(f"Saved BM25 index is from corpus version {index.corpus_version}, rebuilding")
+        index = BM25Index.from_collection(self.collection)
+        index.corpus_version = version
+        if path:
+            index.save(path)
+        return index
+
+    def refresh_text_index(self):
+        """Rebuild the BM25 index from the entries collection"""
+        index = self._build_text_index(rebuild=True)
+        with self._text_index_lock:
+            self.text_index = index
+        return len(index)
+
+    def _local_vector_search(self, query: str, limit: int, filters: Dict) -> List[Dict]:
+        """Score the query against the in-process vector index"""
+        index = self._get_vector_index()
+        hits = index.search(self._encode_query(query), limit, filters=filters)
+        return self._hydrate([index.document(row, score) for row, score in hits])
+
+    def _hydrate(self, docs: List[Dict]) -> List[Dict]:
+        """Fill in payload fields for index hits that only carry _id and score"""
+        missing = [doc['_id'] for doc in docs if 'content' not in doc]
+        if not missing:
+            return docs
+
+        found = {
+            str(entry['_id']): entry
+            for entry in self.collection.find(
+                {"_id": {"$in": missing}},
+                {"_id": 1, **{field: 1 for field in PAYLOAD_FIELDS}}
+            )
+        }
+        hydrated = []
+        for doc in docs:
+            entry = found.get(str(doc['_id']))
+            if 'content' in doc:
+                hydrated.append(doc)
+            elif entry:
+                hydrated.append({**entry, "score": doc.get("score")})
+        return hydrated
+
+    def fetch_entries(self, refs: List[Dict]) -> List[Dict]:
+        """Full entries for {"_id", "score"} references, in order, in one query"""
+        return self._hydrate(refs)
+
+    def corpus_version(self) -> str:
+        """
+        Fingerprint of the entries collection: the importer's write counter,
+        document count and newest _id. Re-read from MongoDB at most every
+        CORPUS_VERSION_TTL seconds so cache lookups stay off the database.
+        """
+        now = time.monotonic()
+        if self._corpus_version is None or now - self._corpus_version_at >= self.corpus_version_ttl:
+            self._corpus_version = corpus_fingerprint(self.db, self.collection)
+            self._corpus_version_at = now
+        return self._corpus_version
+
+    def batch_vector_search(self, queries: List[str], limit: int = 5,
+                            sources: Optional[List[Optional[str]]] = None,
+                            filters: Optional[Dict] = None) -> List[List[Dict]]:
+        """
+        Vector search for many queries at once.
+
+        All queries are embedded in one encode() call and, with a local
+        index, every group of queries sharing a filter is scored with one
+        matrix-matrix product. `sources` optionally gives a source filter
+        per query; `filters` applies to all of them. Returns one result
+        list per query.
+        """
+        sources = sources or [None] * len(queries)
+        if len(sources) != len(queries):
+            raise ValueError("sources must have one entry per query")
+        if not queries:
+            return []
+
+        try:
+            query_vectors = self._encode_queries(queries)
+            if (self._index_mode() not in ("exact", "ivf")
+                    or os.getenv("USE_ATLAS_VECTOR_SEARCH", "false").lower() == "true"):
+                # Embeddings are cached now, so each search skips the encoder
+                return [self.vector_search(q, limit, s, filters) for q, s in zip(queries, sources)]
+
+            index = self._get_vector_index()
+            groups = {}
+            for position, source in enumerate(sources):
+                query_filter = source_filter(source, filters)
+                groups.setdefault(filter_key(query_filter), (query_filter, []))[1].append(position)
+
+            batches = [[] for _ in queries]
+            for query_filter, positions in groups.values():
+                try:
+                    hits = index.search_batch(query_vectors[positions], limit, filters=query_filter)
+                except ValueError as e:
+                    # Filter uses a field the local index does not hold
+                    logger.warning(f"Local vector search fell back to Mongo: {str(e)}")
+                    for position in positions:
+                        batches[position] = self._aggregate_vector_search(
+                            queries[position], limit, query_filter)
+                    continue
+                for position, query_hits in zip(positions, hits):
+                    batches[position] = [index.document(row, score) for row, score in query_hits]
+
+            # Hydrate every batch with one Mongo round trip
+            hydrated = self._hydrate([doc for docs in batches for doc in docs])
+            by_id = {str(doc['_id']): doc for doc in hydrated}
+            return [
+                [dict(by_id[str(doc['_id'])], score=doc['score'])
+                 for doc in docs if str(doc['_id']) in by_id]
+                for docs in batches
+            ]
+        except Exception as e:
+            logger.error(f"Batch vector search failed: {str(e)}")
+            return [[] for _ in queries]
 
-    def text_search(self, query: str, limit: int = 5, source: str = None) -> List[Dict]:
+    def text_search(self, query: str, limit: int = 5, source: str = None,
+                    filters: Optional[Dict] = None) -> List[Dict]:
         """
         Perform text search on the existing knowledge base.
-        Uses the existing text index on 'content' field.
+        Uses the existing text index on 'content' field, or the in-process
+        BM25 index when TEXT_INDEX=bm25. Filters the BM25 index cannot
+        evaluate are answered through the Mongo text index instead.
         """
         try:
+            if self.text_index_mode == "bm25":
+                index = self._get_text_index()
+                try:
+                    hits = index.search(query, limit, filters=source_filter(source, filters))
+                    return [index.document(row, score) for row, score in hits]
+                except ValueError as e:
+                    # Filter uses a field or operator the BM25 index does not hold
+                    logger.warning(f"BM25 search fell back to Mongo: {str(e)}")
+
             query_filter = {"$text": {"$search": query}}
-            if source:
-                query_filter["source"] = source
+            query_filter.update(source_filter(source, filters))
                 
             return list(self.collection.find(
                 query_filter,
                 {
                     "_id": 1,
-                    "content": 1,
-                    "source": 1,
-                    "tags": 1,
-                    "metadata": 1,
+                    **{field: 1 for field in PAYLOAD_FIELDS},
                     "score": {"$meta": "textScore"}
                 }
             ).sort([("score", -1)]).limit(limit))
         except Exception as e:
-            logging.getLogger(f"Text search failed for query '{query}': {str(e)}")
+            logger.error(f"Text search failed for query '{query}': {str(e)}")
             return []
 
-    def vector_search(self, query: str, limit: int = 5, source: str = None) -> List[Dict]:
+    def vector_search(self, query: str, limit: int = 5, source: str = None,
+                      filters: Optional[Dict] = None) -> List[Dict]:
         """
         Perform vector similarity search using existing embeddings.
-        Works with both Atlas vector search and local approximate search.
+        Works with Atlas vector search, the in-process index (VECTOR_INDEX=exact)
+        or an exhaustive server-side aggregation.
+
+        `source` and `filters` (a Mongo-style dict over source, tags and
+        metadata fields, e.g. {"metadata.surah_number": {"$lte": 10}}) are
+        applied before the top `limit` documents are selected.
         """
+        query_filter = source_filter(source, filters)
         try:
-            query_embedding = self._generate_embedding(query)
-            
             if os.getenv("USE_ATLAS_VECTOR_SEARCH", "false").lower() == "true":
                 # Atlas vector search
+                query_embedding = self._generate_embedding(query)
                 pipeline = [
                     {
                         "$vectorSearch": {
@@ -199,95 +523,154 @@ class KnowledgeRetriever:
                     {
                         "$project": {
                             "_id": 1,
-                            "content": 1,
-                            "source": 1,
-                            "tags": 1,
-                            "metadata": 1,
+                            **{field: 1 for field in PAYLOAD_FIELDS},
                             "score": {"$meta": "vectorSearchScore"}
                         }
                     }
                 ]
                 results = list(self.collection.aggregate(pipeline))
+            elif self._index_mode() in ("exact", "ivf"):
+                try:
+                    return self._local_vector_search(query, limit, query_filter)
+                except ValueError as e:
+                    # Filter uses a field the local index does not hold
+                    logger.warning(f"Local vector search fell back to Mongo: {str(e)}")
+                    return self._aggregate_vector_search(query, limit, query_filter)
             else:
-                # Local approximate search (slower)
-                results = list(self.collection.aggregate([
-                    {
-                        "$addFields": {
-                            "similarity": {
-                                "$let": {
-                                    "vars": {
-                                        "dotProduct": {"$dotProduct": ["$vector", query_embedding]},
-                                        "magnitudeA": {"$sqrt": {"$dotProduct": ["$vector", "$vector"]}},
-                                        "magnitudeB": {"$sqrt": {"$dotProduct": [query_embedding, query_embedding]}}
-                                    },
-                                    "in": {
-                                        "$divide": [
-                                            "$$dotProduct",
-                                            {"$multiply": ["$$magnitudeA", "$$magnitudeB"]}
-                                        ]
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    {"$sort": {"similarity": -1}},
-                    {"$limit": limit},
-                    {
-                        "$project": {
-                            "_id": 1,
-                            "content": 1,
-                            "source": 1,
-                            "tags": 1,
-                            "metadata": 1,
-                            "score": "$similarity"
-                        }
-                    }
-                ]))
-            
-            if source:
-                results = [doc for doc in results if doc.get('source') == source]
-            
-            return results
+                return self._aggregate_vector_search(query, limit, query_filter)
+
+            # Atlas returns the global top candidates; drop non-matching ones
+            return [doc for doc in results if matches(doc, query_filter)]
         except Exception as e:
             logging.getLogger(f"Vector search failed: {str(e)}")
             return []
 
-    def hybrid_search(self, query: str, limit: int = 5, source: str = None) -> List[Dict]:
+    def _index_mode(self) -> str:
+        """
+        VECTOR_INDEX, switched to the exact index once the corpus meta records
+        packed vectors (written by migrate_vectors or a binary import), since
+        the aggregation fallback cannot score them. Re-read when the corpus
+        version moves.
+        """
+        if self.vector_index_mode == "none":
+            version = self.corpus_version()
+            if version != self._storage_checked_version:
+                self._storage_checked_version = version
+                if read_vector_storage(self.db) == "binary":
+                    logger.info("Corpus stores packed vectors, switching to the exact vector index")
+                    self.vector_index_mode = "exact"
+        return self.vector_index_mode
+
+    def _aggregate_vector_search(self, query: str, limit: int, query_filter: Dict) -> List[Dict]:
+        """Server-side exhaustive search (slower), filtered before scoring"""
+        query_embedding = self._generate_embedding(query)
+        # Only array-valued vectors can be scored by the aggregation operators
+        pipeline = [{"$match": {**query_filter, "vector": {"$type": "array"}}}]
+        pipeline += [
+            {
+                "$addFields": {
+                    "similarity": {
+                        "$let": {
+                            "vars": {
+                                "dotProduct": {"$dotProduct": ["$vector", query_embedding]},
+                                "magnitudeA": {"$sqrt": {"$dotProduct": ["$vector", "$vector"]}},
+                                "magnitudeB": {"$sqrt": {"$dotProduct": [query_embedding, query_embedding]}}
+                            },
+                            "in": {
+                                "$divide": [
+                                    "$$dotProduct",
+                                    {"$multiply": ["$$magnitudeA", "$$magnitudeB"]}
+                                ]
+                            }
+                        }
+                    }
+                }
+            },
+            {"$sort": {"similarity": -1}},
+            {"$limit": limit},
+            {
+                "$project": {
+                    "_id": 1,
+                    **{field: 1 for field in PAYLOAD_FIELDS},
+                    "score": "$similarity"
+                }
+            }
+        ]
+        return list(self.collection.aggregate(pipeline))
+
+    def hybrid_search(self, query: str, limit: int = 5, source: str = None,
+                      fusion: Optional[str] = None, filters: Optional[Dict] = None) -> List[Dict]:
         """
         Combine text and vector search results from existing data.
+
+        Both legs run concurrently against one HYBRID_LEG_TIMEOUT deadline;
+        a leg that misses it contributes no results. `fusion` picks the
+        strategy ("weighted", "rrf" or "max") and defaults to HYBRID_FUSION.
+        `filters` is passed to both legs.
         """
         try:
-            vector_results = self.vector_search(query, limit, source)
-            text_results = self.text_search(query, limit, source)
-            
-            # Combine and deduplicate
-            seen_ids = set()
-            combined = []
-            
-            for doc in vector_results + text_results:
-                doc_id = str(doc['_id'])
-                if doc_id not in seen_ids:
-                    seen_ids.add(doc_id)
-                    combined.append(doc)
-            
-            # Normalize and combine scores
-            max_vector = max(doc.get('score', 0) for doc in vector_results) or 1
-            max_text = max(doc.get('score', 0) for doc in text_results) or 1
-            
-            for doc in combined:
-                vector_score = next(
-                    (d['score']/max_vector for d in vector_results 
-                    if str(d['_id']) == str(doc['_id'])), 0)
-                text_score = next(
-                    (d['score']/max_text for d in text_results 
-                    if str(d['_id']) == str(doc['_id'])), 0)
-                doc['combined_score'] = (0.6 * vector_score) + (0.4 * text_score)
-            
-            return sorted(combined, key=lambda x: x['combined_score'], reverse=True)[:limit]
+            fuse = get_fusion(fusion or self.fusion)
+            vector_results, text_results = self._leg_results([
+                _Leg(self._search_pool, "vector", query, self.vector_search, query, limit, source, filters),
+                _Leg(self._search_pool, "text", query, self.text_search, query, limit, source, filters)
+            ])
+            return fuse(vector_results, text_results, limit)
         except Exception as e:
             logging.getLogger(f"Hybrid search failed: {str(e)}")
             return []
 
+    def batch_hybrid_search(self, queries: List[str], limit: int = 5,
+                            sources: Optional[List[Optional[str]]] = None,
+                            fusion: Optional[str] = None,
+                            filters: Optional[Dict] = None) -> List[List[Dict]]:
+        """
+        Hybrid search for many queries; the vector leg runs as one batch
+        while the text searches run concurrently. `filters` is passed to
+        both legs. Returns one result list per query.
+        """
+        sources = sources or [None] * len(queries)
+        try:
+            fuse = get_fusion(fusion or self.fusion)
+        except ValueError as e:
+            logging.getLogger(f"Hybrid search failed: {str(e)}")
+            return [[] for _ in queries]
+
+        text_legs = [_Leg(self._search_pool, "text", query, self.text_search, query, limit, source, filters)
+                     for query, source in zip(queries, sources)]
+        vector_batches = self.batch_vector_search(queries, limit, sources, filters)
+        return [
+            fuse(vector_results, text_results, limit)
+            for vector_results, text_results in zip(vector_batches, self._leg_results(text_legs))
+        ]
+
+    def _leg_results(self, legs: List[_Leg]) -> List[List[Dict]]:
+        """
+        Wait for hybrid legs against one shared deadline, HYBRID_LEG_TIMEOUT
+        after the first of them starts running, so time queued for a pool
+        thread is not charged to the search. A leg that has not started
+        within another HYBRID_LEG_TIMEOUT is cancelled. Legs that time out
+        or fail contribute no results.
+        """
+        queued_until = time.monotonic() + self.leg_timeout
+        for leg in legs:
+            leg.started.wait(max(0.0, queued_until - time.monotonic()))
+        starts = [leg.started_at for leg in legs if leg.started.is_set()]
+        deadline = min(starts) + self.leg_timeout if starts else 0.0
+        return [self._leg_result(leg, deadline) for leg in legs]
+
+    def _leg_result(self, leg: _Leg, deadline: float) -> List[Dict]:
+        """Wait for one hybrid leg until deadline, treating a timeout or failure as no results"""
+        if not leg.started.is_set() and leg.future.cancel():
+            logger.warning(f"{leg.name} search never got a search thread for query '{leg.query}'")
+            return []
+        try:
+            return leg.future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            logger.warning(f"{leg.name} search exceeded {self.leg_timeout}s for query '{leg.query}'")
+        except Exception as e:
+            logger.error(f"{leg.name} search failed: {str(e)}")
+        return []
+
     def get_by_reference(self, reference: str, source: str) -> Optional[Dict]:
         """
         Retrieve document by its reference using existing metadata.
@@ -313,6 +696,8 @@ class KnowledgeRetriever:
 
     def __del__(self):
         """Clean up MongoDB connection"""
+        if hasattr(self, '_search_pool'):
+            self._search_pool.shutdown(wait=False)
         if hasattr(self, 'client') and self.client:
             try:
                 self.client.close()
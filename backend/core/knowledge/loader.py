@@ -1,13 +1,14 @@
 from sklearn import logger
 from sklearn import cluster
 from sklearn.cluster import KMeans
-from sentence_transformers import SentenceTransformer
+from core.utils.model_registry import registry
 import numpy as np
 
 class ThemeGenerator:
     def __init__(self, knowledge_db):
         self.db = knowledge_db
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Clustering only compares these embeddings with each other, so any ENCODER_BACKEND will do
+        self.model = registry.encoder('all-MiniLM-L6-v2')
         self.themes = {}
         
     def generate_themes(self, n_clusters=5):
@@ -0,0 +1,103 @@
+"""
+Convert stored embeddings from BSON arrays of doubles to packed float32 BinData.
+
+    python -m core.knowledge.migrate_vectors [--batch-size 500] [--dry-run]
+
+Documents are converted in _id order, in batches, with one unordered
+bulk_write per batch. Each update only applies while `vector` is still an
+array, and only array-typed vectors are selected, so the command can be
+interrupted and re-run at any time; it resumes with whatever is left.
+
+Before converting, the corpus meta records binary storage, which moves
+retrievers on the $dotProduct aggregation (VECTOR_INDEX=none) to the
+exact index once they see the new corpus version. Atlas readers
+(USE_ATLAS_VECTOR_SEARCH=true) need a `vectorSearch`-type index; the
+importer's knnVector mapping does not index packed vectors.
+"""
+import argparse
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+from .corpus_meta import record_vector_storage
+from .vector_codec import pack_vector
+
+logger = logging.getLogger(__name__)
+
+ARRAY_VECTORS = {"vector": {"$type": "array"}}
+
+
+def migrate_vectors(collection, batch_size: int = 500, dim: int = 384,
+                    dry_run: bool = False, limit: Optional[int] = None) -> Dict[str, int]:
+    """Pack every array-valued `vector` in place and return progress counters"""
+    stats = {"scanned": 0, "converted": 0, "skipped": 0}
+    remaining = collection.count_documents(ARRAY_VECTORS)
+    logger.info(f"{remaining} documents still store vectors as arrays")
+    if remaining and not dry_run:
+        record_vector_storage(collection.database, "binary")
+    started = time.time()
+    last_id = None
+
+    while limit is None or stats["scanned"] < limit:
+        query = dict(ARRAY_VECTORS)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        size = batch_size if limit is None else min(batch_size, limit - stats["scanned"])
+        batch = list(collection.find(query, {"vector": 1}).sort("_id", 1).limit(size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        operations = []
+        for doc in batch:
+            vector = doc.get("vector") or []
+            if len(vector) != dim:
+                stats["skipped"] += 1
+                continue
+            operations.append(UpdateOne(
+                {"_id": doc["_id"], **ARRAY_VECTORS},
+                {"$set": {"vector": pack_vector(vector)}}
+            ))
+        stats["scanned"] += len(batch)
+
+        if operations and not dry_run:
+            result = collection.bulk_write(operations, ordered=False)
+            stats["converted"] += result.modified_count
+        elif dry_run:
+            stats["converted"] += len(operations)
+
+        rate = stats["scanned"] / max(time.time() - started, 1e-9)
+        logger.info(f"Migrated {stats['converted']}/{remaining} vectors "
+                    f"({rate:.0f} docs/s, last _id {last_id})")
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many documents")
+    parser.add_argument("--dry-run", action="store_true", help="count conversions without writing")
+    args = parser.parse_args()
+
+    load_dotenv('.env')
+    atlas_uri = os.getenv("MONGODB_URI")
+    if not atlas_uri:
+        raise ValueError("MONGODB_URI environment variable not set")
+
+    client = MongoClient(atlas_uri)
+    try:
+        stats = migrate_vectors(client["AdamAI-KnowledgeDB"].entries, batch_size=args.batch_size,
+                                dry_run=args.dry_run, limit=args.limit)
+        logger.info(f"Vector migration finished: {stats}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
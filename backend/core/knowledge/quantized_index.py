@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .vector_index import ExactVectorIndex, normalize_rows, top_k
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("float16", "int8")
+
+
+class QuantizedVectorIndex(ExactVectorIndex):
+    """
+    Exact index whose candidate scan runs on compact codes.
+
+    Vectors are stored as float16, or as int8 with a per-dimension scale,
+    and the top `k * rerank_factor` candidates are re-scored against the
+    full-precision matrix. Opened from an embedding snapshot, the float32
+    matrix stays memory-mapped on disk and only the re-ranked rows are
+    ever paged in, so resident memory is the codes alone. The codes are
+    saved next to the snapshot the first time it is quantized and
+    memory-mapped by later opens. An index built in memory keeps both the
+    matrix and the codes, so it saves nothing and is meant for tests and
+    offline evaluation.
+    """
+
+    def __init__(self, dim: int = 384, precision: str = "int8", rerank_factor: int = 4,
+                 chunk_size: int = 65536):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+        super().__init__(dim)
+        self.precision = precision
+        self.rerank_factor = rerank_factor
+        self.chunk_size = chunk_size
+        self.codes = np.empty((0, dim), dtype=np.int8 if precision == "int8" else np.float16)
+        self.scale = np.ones(dim, dtype=np.float32)
+
+    def build(self, ids: Sequence, vectors: np.ndarray,
+              payloads: Optional[Sequence[Dict]] = None,
+              attributes: Optional[Sequence[Dict]] = None):
+        super().build(ids, vectors, payloads, attributes)
+        self.quantize()
+
+    @classmethod
+    def from_snapshot(cls, path: str, **options) -> "QuantizedVectorIndex":
+        """Open a snapshot, reusing its saved codes or quantizing it once and saving them"""
+        index = super().from_snapshot(path, **options)
+        with open(os.path.join(path, "manifest.json")) as f:
+            stamp = json.load(f)["created_at"]
+        codes_path = os.path.join(path, f"codes-{index.precision}-{stamp}.npy")
+        scale_path = os.path.join(path, f"scale-{index.precision}-{stamp}.npy")
+        if os.path.exists(codes_path) and os.path.exists(scale_path):
+            index.codes = np.load(codes_path, mmap_mode="r")
+            index.scale = np.load(scale_path)
+            logger.info(f"Opened {index.precision} codes from {codes_path}")
+            return index
+
+        index.quantize()
+        try:
+            # Scale first: readers only look for the codes once both exist
+            for target, array in ((scale_path, index.scale), (codes_path, index.codes)):
+                tmp_path = f"{target}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, array)
+                os.replace(tmp_path, target)
+            logger.info(f"Saved {index.precision} codes to {codes_path}")
+        except OSError as e:
+            logger.warning(f"Could not save quantized codes next to the snapshot: {str(e)}")
+        return index
+
+    def quantize(self):
+        """Encode the full-precision matrix into codes, one chunk at a time"""
+        if self.precision == "float16":
+            self.scale = np.ones(self.dim, dtype=np.float32)
+            self.codes = np.empty(self.matrix.shape, dtype=np.float16)
+        else:
+            max_abs = np.zeros(self.dim, dtype=np.float32)
+            for start in range(0, len(self.matrix), self.chunk_size):
+                chunk = np.abs(self.matrix[start:start + self.chunk_size])
+                max_abs = np.maximum(max_abs, chunk.max(axis=0)) if len(chunk) else max_abs
+            max_abs[max_abs == 0] = 1.0
+            self.scale = (max_abs / 127.0).astype(np.float32)
+            self.codes = np.empty(self.matrix.shape, dtype=np.int8)
+
+        for start in range(0, len(self.matrix), self.chunk_size):
+            chunk = np.asarray(self.matrix[start:start + self.chunk_size], dtype=np.float32)
+            if self.precision == "float16":
+                self.codes[start:start + len(chunk)] = chunk.astype(np.float16)
+            else:
+                self.codes[start:start + len(chunk)] = np.clip(
+                    np.rint(chunk / self.scale), -127, 127).astype(np.int8)
+
+    def _approximate_scores(self, queries: np.ndarray, rows) -> np.ndarray:
+        """(n_queries, n_rows) scores computed from the codes in chunks"""
+        codes = self.codes if rows is None else self.codes[rows]
+        scaled = (queries * self.scale).T
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), self.chunk_size):
+            chunk = codes[start:start + self.chunk_size].astype(np.float32)
+            scores[:, start:start + len(chunk)] = (chunk @ scaled).T
+        return scores
+
+    def _rerank(self, q: np.ndarray, approx: np.ndarray, rows, k: int) -> List[Tuple[int, float]]:
+        candidates = top_k(approx, k * self.rerank_factor)
+        if rows is None:
+            global_rows = candidates
+        elif isinstance(rows, slice):
+            global_rows = candidates + rows.start
+        else:
+            global_rows = rows[candidates]
+        order = np.sort(global_rows)
+        exact = np.asarray(self.matrix[order], dtype=np.float32) @ q
+        return [(int(order[i]), float(exact[i])) for i in top_k(exact, k)]
+
+    def search(self, query: np.ndarray, k: int = 5,
+               filters: Optional[Dict] = None) -> List[Tuple[int, float]]:
+        """Candidate scan on the codes, then full-precision re-ranking"""
+        if not len(self):
+            return []
+        q = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        rows = self.candidate_rows(filters)
+        return self._rerank(q, self._approximate_scores(q[None], rows)[0], rows, k)
+
+    def search_batch(self, queries: np.ndarray, k: int = 5, filters: Optional[Dict] = None,
+                     chunk_size: int = 256) -> List[List[Tuple[int, float]]]:
+        queries = normalize_rows(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        if not len(self):
+            return [[] for _ in range(len(queries))]
+        rows = self.candidate_rows(filters)
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            block = queries[start:start + chunk_size]
+            approx = self._approximate_scores(block, rows)
+            results.extend(self._rerank(q, scores, rows, k) for q, scores in zip(block, approx))
+        return results
+
+    def recall_at_k(self, queries: np.ndarray, k: int = 10) -> float:
+        """Fraction of the exact top-k that the quantized search also returns"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if not len(queries) or not len(self):
+            return 1.0
+        truth = ExactVectorIndex.search_batch(self, queries, k)
+        found = self.search_batch(queries, k)
+        hits = sum(len({r for r, _ in t} & {r for r, _ in f}) for t, f in zip(truth, found))
+        return hits / sum(len(t) for t in truth)
+
+    def report(self, k: int = 10, sample_size: int = 100, seed: int = 0) -> Dict:
+        """Recall@k on lightly perturbed indexed vectors used as queries, plus memory use"""
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(self), min(sample_size, len(self)), replace=False))
+        queries = np.asarray(self.matrix[rows], dtype=np.float32)
+        queries = queries + rng.normal(scale=0.5 / np.sqrt(self.dim), size=queries.shape)
+        report = {"precision": self.precision, "k": k,
+                  f"recall@{k}": self.recall_at_k(queries, k), **self.memory_usage()}
+        logger.info(f"Quantized index report: {report}")
+        return report
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes held by the codes versus the full-precision matrix"""
+        return {
+            "codes": int(self.codes.nbytes + self.scale.nbytes),
+            "float32": int(len(self.matrix) * self.dim * 4),
+        }
+
+    def _options(self) -> Dict:
+        return {"precision": self.precision, "rerank_factor": self.rerank_factor,
+                "chunk_size": self.chunk_size}
+
+    def _state(self) -> Dict[str, np.ndarray]:
+        state = super()._state()
+        state.update({"codes": self.codes, "scale": self.scale})
+        return state
+
+    def _restore(self, state: Dict[str, np.ndarray], meta: Dict):
+        super()._restore(state, meta)
+        self.codes = state["codes"]
+        self.scale = state["scale"]
@@ -1,61 +1,30 @@
-from logging.handlers import RotatingFileHandler
+import hashlib
+import json
 import os
 import numpy as np
 from typing import List, Dict, Optional
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 from .knowledge_db import KnowledgeRetriever, KnowledgeSource
+from .vector_index import decode_ids, encode_ids
+from .embedding_cache import normalize_text
+from .contradictions import ContradictionFilter, entry_keywords, extract_keywords
+from core.utils.cache import LRUCache
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential
 from collections import defaultdict
 
-def configure_logging():
-    """Configure dual logging - file and console"""
-    # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
-    # Main logger configuration
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
-    # File handler (for all logs)
-    file_handler = RotatingFileHandler(
-        'logs/adam_system.log',
-        maxBytes=5*1024*1024,  # 5MB
-        backupCount=3
-    )
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    ))
-    
-    # Console handler (only ERROR and above)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.ERROR)  # Only show errors in console
-    
-    # Add handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    # Special ready logger for console
-    ready_logger = logging.getLogger('adam_ready')
-    ready_logger.propagate = False
-    ready_handler = logging.StreamHandler()
-    ready_handler.setLevel(logging.INFO)
-    ready_handler.setFormatter(logging.Formatter('%(message)s'))
-    ready_logger.addHandler(ready_handler)
 
-    # Suppress sentence_transformers logs
-    logging.getLogger('sentence_transformers').setLevel(logging.WARNING)
-    logging.getLogger('transformers').setLevel(logging.WARNING)
-
-# Call this at the start of your application
-configure_logging()
+# Quran verses, other religious texts and general wisdom gathered per theme
+THEME_SOURCE_LIMITS = [
+    (KnowledgeSource.QURAN.value, 20),
+    (KnowledgeSource.BIBLE.value, 10),
+    (KnowledgeSource.BOOK.value, 5)
+]
 
 
 class SacredScanner:
     def __init__(self, knowledge_db: KnowledgeRetriever):
         self.db = knowledge_db
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
         self.theme_hierarchy = {
             'mercy': ['forgive', 'compassion', 'kindness', 'pardon', 'merciful'],
             'comfort': ['lonely', 'sad', 'ease', 'distress', 'anxiety', 'peace'],
@@ -63,8 +32,21 @@ class SacredScanner:
             'prayer': ['supplication', 'dua', 'worship', 'invocation'],
             'patience': ['perseverance', 'steadfast', 'endurance', 'trials']
         }
+        # Theme -> contradicting words, from data/contradiction_rules.json
+        self.contradictions = ContradictionFilter.from_file()
+        # Whole scan results keyed by (normalized question, source, corpus version)
+        self.scan_cache = LRUCache(
+            maxsize=int(os.getenv("SCAN_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("SCAN_CACHE_TTL", "3600")) or None
+        )
         self.thematic_index = defaultdict(list)
-        self._refresh_thematic_index()
+        # Snapshot of the index (ids and scores) reused across restarts
+        self.thematic_index_path = os.getenv("THEMATIC_INDEX_PATH", "cache/thematic_index.json")
+        self.thematic_corpus_version = None
+        self.thematic_hashes: Dict[str, str] = {}
+        # Rebuilds only what the snapshot is missing or has stale
+        self._load_thematic_index()
+        self.refresh_thematic_index()
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def scan(self, question: str, context: Optional[Dict] = None) -> Dict[str, List[Dict]]:
@@ -83,6 +65,12 @@ class SacredScanner:
             - all_results: All search results
         """
         try:
+            source = context.get('source') if context else None
+            key = (normalize_text(question), source, self.db.corpus_version())
+            cached = self.scan_cache.get(key)
+            if cached is not None:
+                return self._copy_results(cached)
+
             # Get initial results from all sources
             all_results = self._get_initial_results(question, context)
             
@@ -99,16 +87,27 @@ class SacredScanner:
             # Get thematically expanded results
             related_results = self._get_related_results(question, quran_results)
             
-            return {
+            results = {
                 'verses': quran_results[:5],  # Top 5 Quran verses
                 'wisdom': filtered_other[:3],  # Top 3 other religious texts
                 'related': related_results[:5],  # Top 5 thematically related
                 'all_results': all_results
             }
+            if all_results:
+                self.scan_cache.set(key, self._copy_results(results))
+            return results
         except Exception as e:
             logging.getLogger(f"Scan error: {str(e)}", exc_info=True)
             return self._empty_response()
 
+    def _copy_results(self, results: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        """Per-call copy so callers can annotate result docs without touching the cache"""
+        return {key: [dict(doc) for doc in docs] for key, docs in results.items()}
+
+    def cache_stats(self) -> Dict:
+        """Hit/miss/eviction counters of the scan cache"""
+        return self.scan_cache.stats()
+
     def _get_initial_results(self, question: str, context: Optional[Dict]) -> List[Dict]:
         """Get initial search results with hybrid approach"""
         if context and context.get('source'):
@@ -141,40 +140,7 @@ class SacredScanner:
                              items: List[Dict], 
                              quran_verses: List[Dict]) -> List[Dict]:
         """Filter out items that contradict Quranic teachings"""
-        if not quran_verses:
-            return items
-            
-        # Extract themes from Quran verses
-        quran_themes = set()
-        for verse in quran_verses:
-            quran_themes.update(verse.get('tags', []))
-            quran_themes.update(self._extract_keywords(verse.get('content', '')))
-        
-        # Define contradiction patterns
-        contradiction_map = {
-            'mercy': ['harsh', 'unforgiving', 'cruel'],
-            'comfort': ['despair', 'hopeless', 'abandon'],
-            'truth': ['falsehood', 'lie', 'deceive']
-        }
-        
-        filtered = []
-        for item in items:
-            item_text = item.get('content', '').lower()
-            should_include = True
-            
-            # Check against Quran themes
-            for theme in quran_themes:
-                for bad_word in contradiction_map.get(theme, []):
-                    if bad_word in item_text:
-                        should_include = False
-                        break
-                if not should_include:
-                    break
-            
-            if should_include:
-                filtered.append(item)
-                
-        return filtered
+        return self.contradictions.filter(items, quran_verses)
 
     def _get_related_results(self, question: str, quran_results: List[Dict]) -> List[Dict]:
         """Get thematically related results"""
@@ -183,7 +149,7 @@ class SacredScanner:
             themes = set()
             for verse in quran_results[:3]:
                 themes.update(verse.get('tags', []))
-                themes.update(self._extract_keywords(verse.get('content', '')))
+                themes.update(entry_keywords(verse))
             related = []
             for theme in themes:
                 related.extend(self.thematic_index.get(theme, []))
@@ -205,46 +171,131 @@ class SacredScanner:
 
     def _extract_keywords(self, text: str) -> List[str]:
         """Extract important keywords from text"""
-        if not text:
+        return extract_keywords(text)
+
+    def _theme_hashes(self) -> Dict[str, str]:
+        """Fingerprint of each theme's definition (keywords and per-source limits)"""
+        return {
+            theme: hashlib.sha1(json.dumps(
+                {"keywords": keywords, "sources": THEME_SOURCE_LIMITS}, sort_keys=True
+            ).encode()).hexdigest()
+            for theme, keywords in self.theme_hierarchy.items()
+        }
+
+    def _load_thematic_index(self) -> bool:
+        """Use the snapshot at THEMATIC_INDEX_PATH when it matches the current corpus"""
+        if not self.thematic_index_path or not os.path.exists(self.thematic_index_path):
+            return False
+        try:
+            with open(self.thematic_index_path) as f:
+                snapshot = json.load(f)
+            if snapshot.get("corpus_version") != self.db.corpus_version():
+                return False
+
+            themes = snapshot["themes"]
+            refs = [{"_id": doc_id, "score": score}
+                    for theme in themes.values()
+                    for doc_id, score in zip(decode_ids(theme["ids"]), theme["scores"])]
+            entries = {str(doc["_id"]): doc for doc in self.db.fetch_entries(refs)}
+            self.thematic_index = defaultdict(list)
+            for name, theme in themes.items():
+                for doc_id, score in zip(decode_ids(theme["ids"]), theme["scores"]):
+                    entry = entries.get(str(doc_id))
+                    if entry:
+                        self.thematic_index[name].append({**entry, "score": score})
+            self.thematic_corpus_version = snapshot["corpus_version"]
+            self.thematic_hashes = {name: theme["hash"] for name, theme in themes.items()}
+            logging.getLogger(__name__).info(
+                f"Loaded thematic index snapshot with {len(refs)} items from {self.thematic_index_path}")
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            logging.getLogger(__name__).warning(f"Ignoring thematic index snapshot: {str(e)}")
+            return False
+
+    def _save_thematic_index(self):
+        if not self.thematic_index_path:
+            return
+        snapshot = {
+            "corpus_version": self.thematic_corpus_version,
+            "themes": {
+                theme: {
+                    "hash": self.thematic_hashes[theme],
+                    "ids": encode_ids([doc["_id"] for doc in docs]),
+                    "scores": [doc.get("score") for doc in docs]
+                }
+                for theme, docs in self.thematic_index.items()
+                if theme in self.thematic_hashes
+            }
+        }
+        try:
+            os.makedirs(os.path.dirname(self.thematic_index_path) or ".", exist_ok=True)
+            tmp_path = f"{self.thematic_index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.thematic_index_path)
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Could not save thematic index snapshot: {str(e)}")
+
+    def refresh_thematic_index(self, force: bool = False) -> List[str]:
+        """
+        Bring the thematic index up to date and return the rebuilt themes.
+
+        A changed corpus rebuilds every theme; otherwise only themes whose
+        definition changed (or that were never built) are recomputed.
+        """
+        corpus_version = self.db.corpus_version()
+        hashes = self._theme_hashes()
+        if force or corpus_version != self.thematic_corpus_version:
+            stale = list(hashes)
+        else:
+            stale = [theme for theme, digest in hashes.items()
+                     if self.thematic_hashes.get(theme) != digest]
+        removed = [theme for theme in self.thematic_index if theme not in hashes]
+        for theme in removed:
+            del self.thematic_index[theme]
+        if not stale and not removed:
             return []
-        return [word.lower() for word in text.split() if len(word) > 3 and word.isalpha()]
 
-    def _refresh_thematic_index(self):
-        """Build comprehensive thematic index"""
-        self.thematic_index = defaultdict(list)
-        
-        for theme in self.theme_hierarchy.keys():
-            try:
-                # Get Quran verses with this theme
-                quran_results = self.db.vector_search(
-                    theme, 
-                    limit=20,
-                    source=KnowledgeSource.QURAN.value
-                )
-                
-                # Get other religious texts with this theme
-                bible_results = self.db.vector_search(
-                    theme,
-                    limit=10,
-                    source=KnowledgeSource.BIBLE.value
-                )
-                
-                # Get general wisdom on this theme
-                book_results = self.db.vector_search(
-                    theme,
-                    limit=5,
-                    source=KnowledgeSource.BOOK.value
-                )
-                
-                # Combine and store
-                self.thematic_index[theme] = quran_results + bible_results + book_results
-                
-                logging.getLogger(f"Indexed {len(self.thematic_index[theme])} items for theme {theme}")
-            
-            except Exception as e:
-                logging.getLogger(f"Error indexing theme {theme}: {str(e)}", exc_info=True)
-        
-        #logging.info(f"Thematic index built with {sum(len(v) for v in self.thematic_index.values())} entries")
+        if stale and not self._refresh_thematic_index(stale):
+            return []
+        # Cached scans embed related results from the old index
+        self.scan_cache.clear()
+        self.thematic_corpus_version = corpus_version
+        self.thematic_hashes = hashes
+        self._save_thematic_index()
+        return stale
+
+    def _refresh_thematic_index(self, themes: Optional[List[str]] = None) -> bool:
+        """Build the thematic index for the given themes (all by default)"""
+        themes = list(self.theme_hierarchy.keys()) if themes is None else themes
+
+        source_limits = THEME_SOURCE_LIMITS
+        queries = [theme for theme in themes for _ in source_limits]
+        sources = [source for _ in themes for source, _ in source_limits]
+
+        try:
+            # One batched encode and scoring pass for every theme/source pair
+            results = self.db.batch_vector_search(
+                queries,
+                limit=max(limit for _, limit in source_limits),
+                sources=sources
+            )
+            # batch_vector_search answers a failed search with empty lists
+            if not any(results) and self.db.collection.estimated_document_count():
+                raise RuntimeError("vector search returned nothing for a non-empty corpus")
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Error building thematic index: {str(e)}")
+            return False
+        batches = iter(results)
+
+        for theme in themes:
+            # Combine and store
+            self.thematic_index[theme] = []
+            for _, limit in source_limits:
+                self.thematic_index[theme].extend(next(batches)[:limit])
+
+            logging.getLogger(f"Indexed {len(self.thematic_index[theme])} items for theme {theme}")
+        return True
 
     def _empty_response(self) -> Dict[str, List[Dict]]:
         """Return empty response structure"""
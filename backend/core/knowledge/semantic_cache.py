@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from .vector_index import normalize_rows
+
+
+class SemanticCache:
+    """
+    Small in-memory cache keyed by query embeddings instead of exact text.
+
+    A lookup returns the value stored for the most similar cached query
+    when its cosine similarity reaches `threshold`, so paraphrases of a
+    question share one entry. Embeddings live in a fixed (capacity, dim)
+    matrix; when it is full the least recently used slot is overwritten.
+    Entries also expire after `ttl` seconds and are dropped wholesale
+    when the corpus version changes.
+    """
+
+    def __init__(self, capacity: int = 256, threshold: float = 0.92, dim: int = 384,
+                 ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.dim = dim
+        self.ttl = ttl
+        self.clock = clock
+        self.version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self._reset()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.latency_saved = 0.0
+
+    def _reset(self):
+        self.matrix = np.zeros((self.capacity, self.dim), dtype=np.float32)
+        self.used = np.zeros(self.capacity, dtype=bool)
+        self.last_used = np.zeros(self.capacity, dtype=np.float64)
+        self.expires = np.full(self.capacity, np.inf)
+        self.values: list = [None] * self.capacity
+        self.costs = np.zeros(self.capacity, dtype=np.float64)
+
+    def _check_version(self, version: Optional[Hashable]):
+        if version != self.version:
+            self._reset()
+            self.version = version
+
+    def _nearest(self, vector: np.ndarray) -> Tuple[int, float]:
+        live = self.used & (self.expires > self.clock())
+        if not live.any():
+            return -1, -1.0
+        scores = np.where(live, self.matrix @ vector, -np.inf)
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+    def lookup(self, vector: np.ndarray, version: Optional[Hashable] = None) -> Optional[Tuple[Any, float]]:
+        """(value, similarity) for the closest cached query above threshold, else None"""
+        if not self.capacity:
+            return None
+        vector = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            self._check_version(version)
+            slot, similarity = self._nearest(vector)
+            if slot < 0 or similarity < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.last_used[slot] = self.clock()
+            self.latency_saved += float(self.costs[slot])
+            return self.values[slot], similarity
+
+    def add(self, vector: np.ndarray, value: Any, cost: float = 0.0,
+            version: Optional[Hashable] = None):
+        """Store value for a query embedding; cost is the seconds a hit will save"""
+        if not self.capacity:
+            return
+        vector = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        now = self.clock()
+        with self._lock:
+            self._check_version(version)
+            slot, similarity = self._nearest(vector)
+            if slot < 0 or similarity < 0.999:
+                free = np.flatnonzero(~self.used | (self.expires <= now))
+                if len(free):
+                    slot = int(free[0])
+                else:
+                    slot = int(np.argmin(self.last_used))
+                    self.evictions += 1
+            self.matrix[slot] = vector
+            self.used[slot] = True
+            self.last_used[slot] = now
+            self.expires[slot] = now + self.ttl if self.ttl else np.inf
+            self.values[slot] = value
+            self.costs[slot] = cost
+
+    def __len__(self) -> int:
+        return int((self.used & (self.expires > self.clock())).sum())
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+        }
@@ -1,26 +1,47 @@
+import logging
+import os
 from typing import List, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
 import numpy as np
 from .knowledge_db import KnowledgeSource
+from .corpus_tfidf import CorpusTfidf
+from .enrichment import THEME_HIERARCHY, mood_delta, theme_labels, load_corpus_tfidf
 from collections import Counter
 
 class UniversalSynthesizer:
     def __init__(self, knowledge_db):
         self.db = knowledge_db
-        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-        self.theme_hierarchy = {
-            'comfort': ['lonely', 'sad', 'ease', 'peace', 'solace', 'heal'],
-            'mercy': ['forgive', 'compassion', 'kind', 'merciful', 'pardon', 'grace'],
-            'wisdom': ['knowledge', 'understanding', 'insight', 'learn', 'teach'],
-            'prayer': ['supplication', 'dua', 'worship', 'invocation', 'pray'],
-            'prophets': ['muhammad', 'isa', 'musa', 'abraham', 'david', 'solomon']
-        }
+        self.tfidf_path = os.getenv("TFIDF_MODEL_PATH", "cache/tfidf.npz")
+        self.tfidf_mtime = None
+        self.tfidf = self._load_tfidf()
+        self.theme_hierarchy = THEME_HIERARCHY
         self.theme_weights = {
             'quran': 1.5,
             'bible': 1.2,
             'book': 1.0
         }
 
+    def _load_tfidf(self) -> CorpusTfidf:
+        """
+        Corpus TF-IDF from TFIDF_MODEL_PATH. The model is fitted offline by
+        the importer or `python -m core.knowledge.corpus_tfidf`, never here.
+        """
+        try:
+            self.tfidf_mtime = os.path.getmtime(self.tfidf_path) if os.path.exists(self.tfidf_path) else None
+            return load_corpus_tfidf(self.db.collection, path=self.tfidf_path, fit_missing=False)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Corpus TF-IDF unavailable, using tags only: {str(e)}")
+            return CorpusTfidf()
+
+    def _current_tfidf(self) -> CorpusTfidf:
+        """The loaded model, reloaded once a refit has replaced the file"""
+        try:
+            mtime = os.path.getmtime(self.tfidf_path)
+        except OSError:
+            return self.tfidf
+        if mtime != self.tfidf_mtime:
+            self.tfidf = self._load_tfidf()
+        return self.tfidf
+
     def blend(self, verses: List[Dict], wisdom: List[Dict], context: Dict = None) -> Dict:
         """Enhanced knowledge blending with multi-source synthesis"""
         if not verses and not wisdom:
@@ -92,30 +113,28 @@ class UniversalSynthesizer:
 
     def _analyze_themes(self, sources: List[Dict]) -> List[str]:
         """Identify themes across all sources"""
+        if not sources:
+            return []
+
+        # Enriched entries carry their own theme labels
+        if all(s.get('themes') is not None for s in sources):
+            detected = []
+            for s in sources:
+                for theme in s['themes']:
+                    if theme not in detected:
+                        detected.append(theme)
+            return detected
+
         texts = [s['content'] for s in sources]
         tags = []
         
         # Get tags from all sources
         for s in sources:
-            tags.extend(s.get('tags', []))
-        
-        # Analyze text content
-        if texts:
-            self.vectorizer.fit(texts)
-            terms = self.vectorizer.get_feature_names_out()
-            scores = np.sum(self.vectorizer.transform(texts).toarray(), axis=0)
-            top_terms = [terms[i] for i in np.argsort(scores)[-5:][::-1]]
-            
-            # Match terms to themes
-            detected = []
-            for term in top_terms + tags:
-                for theme, keywords in self.theme_hierarchy.items():
-                    if term in keywords and theme not in detected:
-                        detected.append(theme)
-            
-            return detected
+            tags.extend(s.get('tags') or [])
         
-        return []
+        # Analyze text content against the corpus-wide vocabulary and IDF
+        top_terms = self._current_tfidf().top_terms(texts, k=5)
+        return theme_labels(top_terms + tags)
 
     def _determine_primary_theme(self, themes: List[str]) -> str:
         """Select most relevant theme"""
@@ -137,14 +156,10 @@ class UniversalSynthesizer:
 
     def _analyze_mood(self, sources: List[Dict]) -> float:
         """Analyze emotional tone across sources (0=sad, 1=joyful)"""
-        positive = ['hope', 'love', 'peace', 'joy', 'mercy']
-        negative = ['lonely', 'suffering', 'pain', 'fear', 'anger']
-        
         score = 0.5
         for s in sources:
-            text = s['content'].lower()
-            score += sum(0.02 for word in positive if word in text)
-            score -= sum(0.02 for word in negative if word in text)
+            delta = s.get('mood_delta')
+            score += delta if delta is not None else mood_delta(s['content'])
         
         return np.clip(score, 0.1, 0.9)
 
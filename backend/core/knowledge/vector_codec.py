@@ -0,0 +1,40 @@
+from typing import Optional, Sequence, Union
+
+import numpy as np
+from bson.binary import Binary
+
+# BSON binary subtype for vectors, and the header byte for packed float32
+VECTOR_SUBTYPE = 9
+FLOAT32_DTYPE = 0x27
+_FLOAT32_HEADER = bytes([FLOAT32_DTYPE, 0])
+
+
+def pack_vector(vector: Union[Sequence[float], np.ndarray]) -> Binary:
+    """
+    Encode an embedding as a packed little-endian float32 BinData vector.
+
+    This is the same layout as bson.binary.Binary.from_vector(..., FLOAT32)
+    without needing pymongo 4.10. Only a `vectorSearch`-type Atlas index can
+    read it; the legacy knnVector mapping the importer creates, and the
+    $dotProduct aggregation, see array vectors only.
+    """
+    data = np.asarray(vector, dtype="<f4").ravel()
+    return Binary(_FLOAT32_HEADER + data.tobytes(), VECTOR_SUBTYPE)
+
+
+def unpack_vector(value) -> Optional[np.ndarray]:
+    """Decode a stored `vector` field (BinData or array of doubles) as float32"""
+    if value is None:
+        return None
+    if isinstance(value, Binary):
+        if value.subtype != VECTOR_SUBTYPE or bytes(value[:1]) != bytes([FLOAT32_DTYPE]):
+            raise ValueError(f"Unsupported vector encoding (subtype {value.subtype})")
+        return np.frombuffer(value, dtype="<f4", offset=2)
+    return np.asarray(value, dtype=np.float32)
+
+
+def encode_for_storage(vector: Union[Sequence[float], np.ndarray], storage: str = "array"):
+    """Value to write to `vector`: a packed Binary or a plain list of doubles"""
+    if storage == "binary":
+        return pack_vector(vector)
+    return np.asarray(vector, dtype=np.float32).tolist()
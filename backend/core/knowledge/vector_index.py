@@ -0,0 +1,429 @@
+import json
+import logging
+import os
+import time
+from collections import abc
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from core.utils.cache import LRUCache
+from .corpus_meta import corpus_fingerprint
+from .filters import FilterColumns, filter_key
+from .vector_codec import unpack_vector
+
+logger = logging.getLogger(__name__)
+
+# Per-entry fields computed once at ingest by core.knowledge.enrichment
+ENRICHED_FIELDS = ("keywords", "themes", "mood_delta", "top_terms")
+
+# Fields returned alongside the score for every search hit
+PAYLOAD_FIELDS = ("content", "source", "tags", "metadata") + ENRICHED_FIELDS
+
+# Fields always read so searches can be filtered before top-k selection
+ATTRIBUTE_FIELDS = ("source", "tags", "metadata")
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (zero rows are left untouched)"""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= scores.size:
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def load_entries(collection, dim: int = 384, with_payload: bool = True,
+                 batch_size: int = 2000) -> Tuple[List, np.ndarray, List[Dict]]:
+    """
+    Read every embedded entry from MongoDB in one pass.
+
+    Returns the document ids, an (n, dim) float32 matrix and row-aligned
+    documents holding the filterable fields, plus `content` when
+    with_payload is set. Packed BinData vectors are copied straight from
+    their buffers; legacy arrays of doubles are converted row by row.
+    """
+    query = {"vector": {"$exists": True}}
+    fields = PAYLOAD_FIELDS if with_payload else ATTRIBUTE_FIELDS
+    projection = {"vector": 1, **{field: 1 for field in fields}}
+
+    expected = collection.count_documents(query)
+    matrix = np.empty((expected, dim), dtype=np.float32)
+    ids, docs = [], []
+
+    for doc in collection.find(query, projection, batch_size=batch_size):
+        vector = unpack_vector(doc.get("vector"))
+        if vector is None or len(vector) != dim:
+            continue
+        row = len(ids)
+        if row >= matrix.shape[0]:
+            # Collection grew while we were reading
+            matrix = np.resize(matrix, (max(row * 2, 1), dim))
+        matrix[row] = vector
+        ids.append(doc["_id"])
+        docs.append({field: doc.get(field) for field in fields})
+
+    return ids, matrix[:len(ids)], docs
+
+
+def encode_ids(ids: Sequence) -> List[str]:
+    """Serialize document ids, tagging ObjectIds so they round-trip"""
+    return [f"oid:{doc_id}" if isinstance(doc_id, ObjectId) else str(doc_id) for doc_id in ids]
+
+
+def decode_ids(encoded: Sequence[str]) -> List:
+    """Inverse of encode_ids"""
+    return [ObjectId(doc_id[4:]) if doc_id.startswith("oid:") else doc_id for doc_id in encoded]
+
+
+class SnapshotIds(abc.Sequence):
+    """Read-only id table backed by a memory-mapped fixed-width byte array"""
+
+    def __init__(self, table: np.ndarray):
+        self.table = table
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        return decode_ids([self.table[row].decode()])[0]
+
+
+def write_snapshot(collection, path: str, dim: int = 384, corpus_version: Optional[str] = None) -> int:
+    """
+    Write the normalized embedding matrix, id table and filter columns
+    to `path`, stamped with the corpus version they were read at.
+
+    Each snapshot gets its own timestamped files; manifest.json is swapped
+    in last so readers never see a half-written snapshot.
+    """
+    ids, matrix, attributes = load_entries(collection, dim, with_payload=False)
+    index = ExactVectorIndex(dim)
+    index.build(ids, matrix, attributes=attributes)
+    index.corpus_version = corpus_version
+    index.write_snapshot(path)
+    return len(index)
+
+
+def snapshot_exists(path: Optional[str]) -> bool:
+    return bool(path) and os.path.exists(os.path.join(path, "manifest.json"))
+
+
+def snapshot_version(path: Optional[str]) -> Optional[str]:
+    """Corpus version recorded in a snapshot's manifest, None when missing or unstamped"""
+    if not snapshot_exists(path):
+        return None
+    with open(os.path.join(path, "manifest.json")) as f:
+        return json.load(f).get("corpus_version")
+
+
+# Files older than this that no manifest names are left over by a concurrent writer
+SNAPSHOT_GRACE_SECONDS = 300
+
+
+def _prune_snapshot(path: str, current: str, replaced: Optional[str]):
+    """Delete the files of superseded snapshots; readers that mapped them keep their pages"""
+    now = time.time()
+    for name in os.listdir(path):
+        stamp = name.rsplit("-", 2)
+        if name.startswith("manifest.json") or len(stamp) < 3:
+            continue
+        stamp = f"{stamp[-2]}-{stamp[-1].split('.')[0]}"
+        if stamp == current:
+            continue
+        file_path = os.path.join(path, name)
+        try:
+            if stamp == replaced or now - os.path.getmtime(file_path) > SNAPSHOT_GRACE_SECONDS:
+                os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+
+class ExactVectorIndex:
+    """
+    Brute-force cosine index held in process memory.
+
+    Vectors live in one contiguous, pre-normalized float32 matrix so a
+    query is a single matrix-vector product followed by argpartition.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.ids: Sequence = []
+        self._id_to_row: Optional[Dict[str, int]] = None
+        self.matrix = np.empty((0, dim), dtype=np.float32)
+        self.payloads: List[Dict] = []
+        self.columns = FilterColumns()
+        # source -> (start, stop) when rows are grouped by source
+        self.partitions: Dict[str, Tuple[int, int]] = {}
+        self._masks = LRUCache(maxsize=64)
+        # Corpus version the rows were read at, compared by the retriever before each use
+        self.corpus_version: Optional[str] = None
+
+    @classmethod
+    def from_collection(cls, collection, dim: int = 384, **options) -> "ExactVectorIndex":
+        """Build the index from the `vector` field of every entry"""
+        index = cls(dim, **options)
+        ids, matrix, payloads = load_entries(collection, dim)
+        index.build(ids, matrix, payloads)
+        logger.info(f"Built {cls.__name__} with {len(index)} entries")
+        return index
+
+    @classmethod
+    def from_snapshot(cls, path: str, **options) -> "ExactVectorIndex":
+        """
+        Open a snapshot written by write_snapshot() without copying it.
+
+        The matrix and id table are read-only memory maps, so every worker
+        process on the host shares the same page-cache pages. Payloads are
+        not kept in memory; callers hydrate hits from MongoDB by _id.
+        """
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        index = cls(manifest["dim"], **options)
+        index.matrix = np.load(os.path.join(path, manifest["vectors"]), mmap_mode="r")
+        index.ids = SnapshotIds(np.load(os.path.join(path, manifest["ids"]), mmap_mode="r"))
+        with np.load(os.path.join(path, manifest["columns"]), allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        index.columns = FilterColumns.from_state(arrays, manifest["column_meta"])
+        index.partitions = index._find_partitions()
+        index.corpus_version = manifest.get("corpus_version")
+        logger.info(f"Opened embedding snapshot with {len(index)} entries from {path}")
+        return index
+
+    def write_snapshot(self, path: str):
+        """Dump the matrix, id table and filter columns for from_snapshot()"""
+        os.makedirs(path, exist_ok=True)
+        # Nanoseconds keep a rewrite from truncating files this process still has mapped
+        now = time.time_ns()
+        stamp = f"{time.strftime('%Y%m%d%H%M%S', time.localtime(now // 10**9))}{now % 10**9:09d}-{os.getpid()}"
+        files = {name: f"{name}-{stamp}.{ext}"
+                 for name, ext in (("vectors", "npy"), ("ids", "npy"), ("columns", "npz"))}
+
+        np.save(os.path.join(path, files["vectors"]), self.matrix)
+        np.save(os.path.join(path, files["ids"]),
+                np.array(encode_ids(list(self.ids)), dtype=np.bytes_))
+        columns = self.columns.to_state()
+        with open(os.path.join(path, files["columns"]), "wb") as f:
+            np.savez(f, **columns["arrays"])
+
+        manifest = {**files, "dim": self.dim, "count": len(self), "column_meta": columns["meta"],
+                    "created_at": stamp, "corpus_version": self.corpus_version}
+        manifest_path = os.path.join(path, "manifest.json")
+        replaced = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                replaced = json.load(f).get("created_at")
+        tmp_manifest = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_manifest, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, manifest_path)
+        _prune_snapshot(path, stamp, replaced)
+        logger.info(f"Wrote embedding snapshot with {len(self)} entries to {path}")
+
+    @property
+    def id_to_row(self) -> Dict[str, int]:
+        """Map from str(_id) to matrix row, built on first use"""
+        if self._id_to_row is None:
+            self._id_to_row = {str(doc_id): row for row, doc_id in enumerate(self.ids)}
+        return self._id_to_row
+
+    def build(self, ids: Sequence, vectors: np.ndarray,
+              payloads: Optional[Sequence[Dict]] = None,
+              attributes: Optional[Sequence[Dict]] = None):
+        """
+        Replace the index contents with the given vectors.
+
+        `attributes` holds the filterable fields of each row and defaults
+        to the payloads. Rows are stored grouped by source so a source
+        filter scores one contiguous slice of the matrix.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(ids) != vectors.shape[0]:
+            raise ValueError("ids and vectors must have the same length")
+        if payloads is not None and len(payloads) not in (0, len(ids)):
+            raise ValueError("payloads must be row-aligned with ids")
+
+        self.ids = list(ids)
+        self.matrix = normalize_rows(vectors)
+        self.payloads = list(payloads or [])
+        self.columns = FilterColumns.from_attributes(attributes or self.payloads or [{}] * len(self.ids))
+
+        sources = self.columns.codes.get("source")
+        order = np.argsort(sources, kind="stable") if sources is not None else np.arange(len(self.ids))
+        self._apply_order(order)
+        self.partitions = self._find_partitions()
+
+    def _apply_order(self, order: np.ndarray):
+        """Permute every row-aligned structure"""
+        self.matrix = np.ascontiguousarray(self.matrix[order])
+        self.ids = [self.ids[row] for row in order]
+        self._id_to_row = None
+        if self.payloads:
+            self.payloads = [self.payloads[row] for row in order]
+        self.columns = self.columns.take(order)
+        self.partitions = {}
+        self._masks.clear()
+
+    def _find_partitions(self) -> Dict[str, Tuple[int, int]]:
+        """Contiguous row range per source, if rows are grouped by source"""
+        codes = self.columns.codes.get("source")
+        if codes is None or len(codes) == 0 or np.any(np.diff(codes) < 0):
+            return {}
+        vocab = self.columns.vocab["source"]
+        starts = np.searchsorted(codes, np.arange(len(vocab)), side="left")
+        stops = np.searchsorted(codes, np.arange(len(vocab)), side="right")
+        return {vocab[i]: (int(starts[i]), int(stops[i])) for i in range(len(vocab))}
+
+    def candidate_rows(self, filters: Optional[Dict]):
+        """
+        Rows that satisfy `filters`: None for no filter, a slice for a
+        plain source partition, otherwise an array from a cached bitmap.
+        """
+        if not filters:
+            return None
+        if set(filters) == {"source"} and isinstance(filters["source"], str) and self.partitions:
+            start, stop = self.partitions.get(filters["source"], (0, 0))
+            return slice(start, stop)
+        return self.filter_bitmap(filters)[1]
+
+    def filter_bitmap(self, filters: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """Cached (boolean mask, matching rows) for a filter dict"""
+        key = filter_key(filters)
+        cached = self._masks.get(key)
+        if cached is None:
+            mask = self.columns.mask(filters)
+            cached = (mask, np.flatnonzero(mask))
+            self._masks.set(key, cached)
+        return cached
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _scored_rows(self, scores: np.ndarray, rows, k: int) -> List[Tuple[int, float]]:
+        """Top-k of scores computed over a candidate subset, as global rows"""
+        best = top_k(scores, k)
+        if rows is None:
+            return [(int(i), float(scores[i])) for i in best]
+        if isinstance(rows, slice):
+            return [(int(rows.start + i), float(scores[i])) for i in best]
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+    def search(self, query: np.ndarray, k: int = 5,
+               filters: Optional[Dict] = None) -> List[Tuple[int, float]]:
+        """
+        Return (row, cosine score) pairs for the k nearest entries that
+        match `filters` (a Mongo-style dict such as {"source": "bible"}).
+        """
+        if not len(self):
+            return []
+        q = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        rows = self.candidate_rows(filters)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        return self._scored_rows(matrix @ q, rows, k)
+
+    def search_batch(self, queries: np.ndarray, k: int = 5, filters: Optional[Dict] = None,
+                     chunk_size: int = 256) -> List[List[Tuple[int, float]]]:
+        """Score many queries at once with one matrix-matrix product per chunk"""
+        queries = normalize_rows(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        if not len(self):
+            return [[] for _ in range(len(queries))]
+
+        rows = self.candidate_rows(filters)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            scores = queries[start:start + chunk_size] @ matrix.T
+            results.extend(self._scored_rows(row_scores, rows, k) for row_scores in scores)
+        return results
+
+    def document(self, row: int, score: Optional[float] = None) -> Dict:
+        """Build a result dict for a row in the retriever's output shape"""
+        doc = {"_id": self.ids[row]}
+        if self.payloads:
+            doc.update(self.payloads[row])
+        if score is not None:
+            doc["score"] = score
+        return doc
+
+    def save(self, path: str):
+        """Persist the index to a single .npz file, swapped in once complete"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **self._state())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ExactVectorIndex":
+        """Load an index written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            state = {key: data[key] for key in data.files}
+        meta = json.loads(str(state.pop("meta")))
+        index = cls(meta["dim"], **meta.get("options", {}))
+        index._restore(state, meta)
+        logger.info(f"Loaded {cls.__name__} with {len(index)} entries from {path}")
+        return index
+
+    def _options(self) -> Dict:
+        """Constructor arguments beyond dim, stored with the index"""
+        return {}
+
+    def _state(self) -> Dict[str, np.ndarray]:
+        columns = self.columns.to_state()
+        meta = {
+            "dim": self.dim,
+            "options": self._options(),
+            "ids": encode_ids(list(self.ids)),
+            "payloads": self.payloads,
+            "columns": columns["meta"],
+            "corpus_version": self.corpus_version,
+        }
+        state = {f"col:{key}": column for key, column in columns["arrays"].items()}
+        state.update({"matrix": self.matrix, "meta": np.array(json.dumps(meta, default=str))})
+        return state
+
+    def _restore(self, state: Dict[str, np.ndarray], meta: Dict):
+        self.ids = decode_ids(meta["ids"])
+        self._id_to_row = None
+        self.matrix = np.ascontiguousarray(state["matrix"], dtype=np.float32)
+        self.payloads = meta["payloads"]
+        arrays = {key[4:]: column for key, column in state.items() if key.startswith("col:")}
+        self.columns = FilterColumns.from_state(arrays, meta["columns"])
+        self.partitions = self._find_partitions()
+        self.corpus_version = meta.get("corpus_version")
+
+
+def main():
+    """Write the embedding snapshot at VECTOR_SNAPSHOT_PATH from the entries collection"""
+    from pymongo import MongoClient
+    from dotenv import load_dotenv
+
+    load_dotenv('.env')
+    atlas_uri = os.getenv("MONGODB_URI")
+    path = os.getenv("VECTOR_SNAPSHOT_PATH")
+    if not atlas_uri or not path:
+        raise ValueError("MONGODB_URI and VECTOR_SNAPSHOT_PATH environment variables must be set")
+
+    client = MongoClient(atlas_uri)
+    try:
+        db = client["AdamAI-KnowledgeDB"]
+        write_snapshot(db.entries, path, corpus_version=corpus_fingerprint(db, db.entries))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,194 @@
+"""
+Background worker that keeps conversation analysis caught up with traffic.
+
+Each pass reads the oldest page of conversations still flagged
+`analyzed: False`, in (timestamp, _id) order. The page is grouped per user
+and summarized and classified with batched pipeline calls. Results are
+written with bulk writes and the page is flagged as analyzed, so the next
+query starts after it. Paging by the flag rather than a saved timestamp
+also picks up conversations that arrive late with older timestamps, such
+as writes replayed from the conversation journal. Conversations younger
+than `settle_seconds` are left for a later pass so a session is
+summarized once it has settled.
+
+A page that fails is retried with exponential backoff. After
+`max_attempts` failures in a row its conversations are flagged
+`analysis_failed`, and the skipped range is recorded in the worker's
+checkpoint so the worker can move on.
+
+    python -m core.learning.analysis_worker [--once] [--retry-skipped]
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from .interactive_learner import InteractiveLearner
+from .memory_system import MemoryDatabase
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT = "conversation_analysis"
+
+# Skipped ranges kept in the checkpoint
+MAX_SKIPPED_RANGES = 100
+
+
+class ConversationAnalysisWorker:
+    def __init__(self, learner: InteractiveLearner, page_size: int = 64,
+                 interval: float = 5.0, settle_seconds: float = 60.0,
+                 max_attempts: int = 5, max_backoff: float = 300.0):
+        self.learner = learner
+        self.memory = learner.memory
+        self.page_size = page_size
+        self.interval = interval
+        self.settle_seconds = settle_seconds
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.processed = 0
+        self.sessions = 0
+        self.failures = 0
+        self.skipped = 0
+        self.busy_seconds = 0.0
+        self.last_rate = 0.0
+        # Consecutive failures of the page starting at _failed_head
+        self._failed_head = None
+        self._attempts = 0
+        self.retry_delay = 0.0
+
+    def run_once(self) -> int:
+        """
+        Analyze the oldest settled page; returns the conversations processed
+        or skipped. A failed page returns 0 and sets `retry_delay`.
+        """
+        before = datetime.utcnow() - timedelta(seconds=self.settle_seconds)
+        convs = self.memory.get_unanalyzed_conversations(limit=self.page_size, before=before)
+        if not convs:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            analyses = self.learner.analyze_conversations(convs)
+            self.memory.store_summaries(analyses)
+            self.memory.mark_many_as_analyzed([conv["_id"] for conv in convs])
+        except Exception as e:
+            return self._page_failed(convs, e)
+
+        self._failed_head, self._attempts, self.retry_delay = None, 0, 0.0
+        elapsed = time.perf_counter() - started
+        self.processed += len(convs)
+        self.sessions += len(analyses)
+        self.busy_seconds += elapsed
+        self.last_rate = len(convs) / max(elapsed, 1e-9)
+        self.memory.save_checkpoint(CHECKPOINT, {
+            "last_timestamp": convs[-1]["timestamp"],
+            "last_conv_id": convs[-1]["_id"],
+            "processed": self.processed
+        })
+        logger.info(f"Analyzed {len(convs)} conversations in {len(analyses)} sessions "
+                    f"({self.last_rate:.1f} conv/s)")
+        return len(convs)
+
+    def _page_failed(self, convs: List[Dict], error: Exception) -> int:
+        """Back off and retry the page, or skip it once it has failed max_attempts times"""
+        self.failures += 1
+        head = convs[0]["_id"]
+        self._attempts = self._attempts + 1 if head == self._failed_head else 1
+        self._failed_head = head
+        logger.error(f"Analysis failed for {len(convs)} conversations from {head} "
+                     f"(attempt {self._attempts}/{self.max_attempts}): {str(error)}")
+        if self._attempts < self.max_attempts:
+            self.retry_delay = min(self.interval * 2 ** (self._attempts - 1), self.max_backoff)
+            return 0
+
+        self.memory.mark_analysis_failed([conv["_id"] for conv in convs], str(error))
+        checkpoint = self.memory.load_checkpoint(CHECKPOINT) or {}
+        skipped = checkpoint.get("skipped", []) + [{
+            "first_timestamp": convs[0]["timestamp"],
+            "first_conv_id": head,
+            "last_timestamp": convs[-1]["timestamp"],
+            "last_conv_id": convs[-1]["_id"],
+            "count": len(convs),
+            "error": str(error),
+            "skipped_at": datetime.utcnow()
+        }]
+        self.memory.save_checkpoint(CHECKPOINT, {"skipped": skipped[-MAX_SKIPPED_RANGES:]})
+        logger.error(f"Skipped {len(convs)} conversations after {self._attempts} failed attempts; "
+                     f"retry them with --retry-skipped")
+        self.skipped += len(convs)
+        self._failed_head, self._attempts, self.retry_delay = None, 0, 0.0
+        return len(convs)
+
+    def run(self):
+        """Drain every settled conversation, then poll every `interval` seconds"""
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                logger.error(f"Analysis worker error: {str(e)}")
+            self._stop.wait(self.retry_delay or self.interval)
+
+    def retry_skipped(self) -> int:
+        """Make conversations skipped after failed attempts eligible again"""
+        cleared = self.memory.clear_analysis_failures()
+        self.memory.save_checkpoint(CHECKPOINT, {"skipped": []})
+        return cleared
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="analysis-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        return {
+            "processed": self.processed,
+            "sessions": self.sessions,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "conversations_per_second": self.processed / self.busy_seconds if self.busy_seconds else 0.0,
+            "last_page_conversations_per_second": round(self.last_rate, 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze logged conversations in batches")
+    parser.add_argument("--page-size", type=int, default=int(os.getenv("ANALYSIS_PAGE_SIZE", "64")))
+    parser.add_argument("--once", action="store_true", help="drain the backlog and exit")
+    parser.add_argument("--retry-skipped", action="store_true",
+                        help="retry conversations skipped after repeated failures")
+    args = parser.parse_args()
+
+    worker = ConversationAnalysisWorker(
+        InteractiveLearner(MemoryDatabase()),
+        page_size=args.page_size,
+        interval=float(os.getenv("ANALYSIS_INTERVAL", "5")),
+        settle_seconds=float(os.getenv("ANALYSIS_SETTLE_SECONDS", "60")),
+        max_attempts=int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "5"))
+    )
+    if args.retry_skipped:
+        logger.info(f"Retrying {worker.retry_skipped()} skipped conversations")
+    if args.once:
+        while True:
+            if worker.run_once():
+                continue
+            if not worker.retry_delay:
+                break
+            time.sleep(worker.retry_delay)
+        logger.info(f"Analysis finished: {worker.stats()}")
+    else:
+        worker.run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+# Fields of a conversation kept for context preparation
+TURN_FIELDS = ("_id", "user_id", "user_message", "adam_response", "timestamp", "topics")
+
+# Rough per-turn overhead of the dict and its small fields, in bytes
+TURN_OVERHEAD = 256
+
+
+def turn_size(turn: Dict) -> int:
+    return (TURN_OVERHEAD + len(turn.get("user_message") or "") + len(turn.get("adam_response") or "")
+            + sum(len(topic) for topic in turn.get("topics") or []))
+
+
+class ConversationContextCache:
+    """
+    Per-user ring buffers of the most recent conversation turns.
+
+    Each cached user holds up to `turns` turns, newest first, with their
+    topics computed once by `topics_of` when the turn is added. Users are
+    evicted least recently used first when there are more than `max_users`
+    of them or their turns exceed `max_bytes` in total. A user missing from
+    the cache is filled from MongoDB by the caller; turns written by this
+    process while the user is cached are appended.
+
+    Turns written by other processes never reach this buffer, so a hit
+    more than `check_interval` seconds after the last check asks
+    `newest_of` for the user's newest stored timestamp. If MongoDB holds a
+    newer turn than the buffer, the lookup misses and the next `fill`
+    merges the stored history with the dropped buffer, keeping this
+    process's turns that are still waiting to be written.
+    """
+
+    def __init__(self, topics_of: Callable[[Dict], List[str]], turns: int = 5,
+                 max_users: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 newest_of: Optional[Callable[[str], Any]] = None, check_interval: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.topics_of = topics_of
+        self.turns = turns
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.newest_of = newest_of
+        self.check_interval = check_interval
+        self.clock = clock
+        self._users: "OrderedDict[str, Deque[Dict]]" = OrderedDict()
+        self._bytes: Dict[str, int] = {}
+        self._checked: Dict[str, float] = {}
+        # Buffers found stale, merged into the refill that follows the miss
+        self._stale: Dict[str, Deque[Dict]] = {}
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def _turn(self, conv: Dict) -> Dict:
+        turn = {field: conv.get(field) for field in TURN_FIELDS}
+        if turn["topics"] is None:
+            turn["topics"] = self.topics_of(conv)
+        return turn
+
+    def get(self, user_id: str, limit: int) -> Optional[List[Dict]]:
+        """Newest `limit` turns of a cached user, or None on a miss"""
+        if limit > self.turns:
+            return None
+        with self._lock:
+            turns = self._users.get(user_id)
+            if turns is None:
+                self.misses += 1
+                return None
+            check = (self.newest_of is not None
+                     and self.clock() - self._checked.get(user_id, 0.0) >= self.check_interval)
+            cached_newest = turns[0]["timestamp"] if turns else None
+
+        if check:
+            stored_newest = self.newest_of(user_id)
+            if stored_newest is not None and (cached_newest is None or stored_newest > cached_newest):
+                with self._lock:
+                    if user_id in self._users:
+                        self._stale[user_id] = self._users[user_id]
+                    self._drop(user_id)
+                    self.misses += 1
+                    self.stale += 1
+                return None
+
+        with self._lock:
+            turns = self._users.get(user_id)
+            if turns is None:
+                self.misses += 1
+                return None
+            if check:
+                self._checked[user_id] = self.clock()
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return [dict(turn) for turn in list(turns)[:limit]]
+
+    def fill(self, user_id: str, conversations: Iterable[Dict]) -> List[Dict]:
+        """
+        Cache a user's history as read from MongoDB, newest first, and return
+        the turns. Turns of a buffer dropped as stale that MongoDB does not
+        hold yet are merged back in.
+        """
+        turns = [self._turn(conv) for conv in conversations]
+        with self._lock:
+            local = self._stale.pop(user_id, ())
+        stored = {turn["_id"] for turn in turns}
+        pending = [turn for turn in local if turn["_id"] not in stored]
+        if pending:
+            turns = sorted(turns + pending, key=lambda turn: turn["timestamp"], reverse=True)
+        turns = deque(turns, maxlen=self.turns)
+        with self._lock:
+            self._set(user_id, turns)
+            self._checked[user_id] = self.clock()
+        return [dict(turn) for turn in turns]
+
+    def append(self, user_id: str, conv: Dict):
+        """Add a newly written turn for a user that is already cached"""
+        if user_id not in self._users:
+            return
+        turn = self._turn(conv)
+        with self._lock:
+            turns = self._users.get(user_id)
+            if turns is None:
+                return
+            turns.appendleft(turn)
+            self._set(user_id, turns)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._drop(user_id)
+            self._stale.pop(user_id, None)
+
+    def _set(self, user_id: str, turns: Deque[Dict]):
+        size = sum(turn_size(turn) for turn in turns)
+        self.total_bytes += size - self._bytes.get(user_id, 0)
+        self._users[user_id] = turns
+        self._bytes[user_id] = size
+        self._users.move_to_end(user_id)
+        while self._users and (len(self._users) > self.max_users or self.total_bytes > self.max_bytes):
+            oldest = next(iter(self._users))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, user_id: str):
+        if self._users.pop(user_id, None) is not None:
+            self.total_bytes -= self._bytes.pop(user_id)
+            self._checked.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._users),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,271 @@
+import atexit
+import itertools
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class ConversationWriter:
+    """
+    Write-behind inserter for conversation documents.
+
+    submit() puts a document on a bounded queue and returns at once. A
+    background thread drains the queue into unordered insert_many calls of
+    up to `batch_size` documents, or whatever arrived within
+    `flush_interval` seconds of the first one. Batches that cannot reach
+    MongoDB, and documents that find the queue full, are appended to a
+    JSON-lines journal that is replayed once writes succeed again. The
+    queue is flushed on interpreter exit.
+
+    Each process journals to its own file, `journal_path` with the pid
+    before the extension. A replay first claims a journal by renaming it
+    to a name carrying the replaying pid. It claims its own journal and
+    those left behind by processes that are no longer running, and removes
+    a journal only after replaying it. A journal is therefore never read
+    by two processes at once.
+    """
+
+    def __init__(self, collection, max_queue: int = 10000, batch_size: int = 100,
+                 flush_interval: float = 0.5, journal_path: Optional[str] = None,
+                 retry_interval: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.collection = collection
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        if journal_path:
+            root, ext = os.path.splitext(os.path.basename(journal_path))
+            self._journal_dir = os.path.dirname(journal_path) or "."
+            self._journal_name = (root, ext)
+            self._journal_re = re.compile(
+                rf"(?P<base>{re.escape(root)}(?:\.(?P<writer>\d+))?{re.escape(ext)})"
+                rf"(?:\.replay-(?P<replayer>\d+)-\d+)?$")
+        self.retry_interval = retry_interval
+        self.clock = clock
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_queue)
+        self._journal_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._claims = itertools.count()
+        self._stopped = threading.Event()
+        self._next_replay = 0.0
+        self.counters = {"enqueued": 0, "written": 0, "batches": 0, "journaled": 0,
+                         "replayed": 0, "failures": 0}
+        self.max_queue_depth = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._thread = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, doc: Dict[str, Any]):
+        """Queue a document for insertion; spills to the journal when the queue is full"""
+        if self._stopped.is_set():
+            self._write([doc])
+            return
+        try:
+            self._queue.put_nowait((self.clock(), doc))
+        except queue.Full:
+            logger.warning("Conversation queue full, journaling write")
+            self._journal([doc])
+            return
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self.counters["enqueued"] += 1
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def _count(self, counter: str, n: int = 1):
+        with self._stats_lock:
+            self.counters[counter] += n
+
+    def _collect(self, first: tuple) -> List[tuple]:
+        batch = [first]
+        deadline = self.clock() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - self.clock()
+            try:
+                item = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.task_done()
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.retry_interval)
+            except queue.Empty:
+                self._replay_journal()
+                continue
+            if first is None:
+                self._queue.task_done()
+                break
+            batch = self._collect(first)
+            try:
+                self._write([doc for _, doc in batch])
+                lag = self.clock() - batch[0][0]
+                with self._stats_lock:
+                    self.last_lag = lag
+                    self.max_lag = max(self.max_lag, lag)
+                self._replay_journal()
+            except Exception as e:
+                logger.error(f"Conversation writer batch failed: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, docs: List[Dict]) -> bool:
+        """insert_many the docs, journaling them if MongoDB is unreachable"""
+        try:
+            self.collection.insert_many(docs, ordered=False)
+            written = len(docs)
+        except BulkWriteError as e:
+            # Rows already inserted by an earlier, partly journaled attempt are fine
+            errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY]
+            if errors:
+                logger.error(f"Dropped {len(errors)} conversation writes: {errors[0].get('errmsg')}")
+            written = e.details.get("nInserted", 0)
+        except PyMongoError as e:
+            self._count("failures")
+            logger.warning(f"Conversation write failed, journaling {len(docs)} documents: {str(e)}")
+            self._journal(docs)
+            self._next_replay = self.clock() + self.retry_interval
+            return False
+        with self._stats_lock:
+            self.counters["written"] += written
+            self.counters["batches"] += 1
+        return True
+
+    def _own_journal(self) -> str:
+        """This process's journal file; the pid is read per call so forked workers differ"""
+        root, ext = self._journal_name
+        return os.path.join(self._journal_dir, f"{root}.{os.getpid()}{ext}")
+
+    def _journal(self, docs: List[Dict]):
+        if not self.journal_path:
+            logger.error(f"No conversation journal configured, dropping {len(docs)} writes")
+            return
+        if not docs:
+            return
+        with self._journal_lock:
+            os.makedirs(self._journal_dir, exist_ok=True)
+            with open(self._own_journal(), "a") as f:
+                for doc in docs:
+                    f.write(json_util.dumps(doc, json_options=json_util.CANONICAL_JSON_OPTIONS) + "\n")
+        self._count("journaled", len(docs))
+
+    def _claim_journals(self) -> List[str]:
+        """Rename every journal this process may replay to a name only it uses"""
+        pid = os.getpid()
+        own = self._own_journal()
+        try:
+            names = sorted(os.listdir(self._journal_dir))
+        except FileNotFoundError:
+            return []
+        claimed = []
+        for name in names:
+            match = self._journal_re.match(name)
+            if not match:
+                continue
+            path = os.path.join(self._journal_dir, name)
+            owner = match.group("replayer") or match.group("writer")
+            if match.group("replayer") == str(pid):
+                # Left over from an earlier replay in this process
+                claimed.append(path)
+                continue
+            if path != own and owner is not None and _pid_alive(int(owner)):
+                continue
+            target = os.path.join(self._journal_dir,
+                                  f"{match.group('base')}.replay-{pid}-{next(self._claims)}")
+            with self._journal_lock:
+                try:
+                    os.replace(path, target)
+                except FileNotFoundError:
+                    # Claimed by another process first
+                    continue
+            claimed.append(target)
+        return claimed
+
+    def _replay_journal(self):
+        """Re-insert journaled documents once MongoDB accepts writes again"""
+        if not self.journal_path or self.clock() < self._next_replay:
+            return
+        for path in self._claim_journals():
+            docs = []
+            with open(path) as f:
+                for line in f:
+                    try:
+                        if line.strip():
+                            docs.append(json_util.loads(line))
+                    except ValueError:
+                        # A line cut short by a crash mid-append
+                        logger.warning(f"Skipping unreadable journal line in {path}")
+            for start in range(0, len(docs), self.batch_size):
+                chunk = docs[start:start + self.batch_size]
+                if not self._write(chunk):
+                    # The failed chunk is back in our journal; keep the rest with it
+                    self._journal(docs[start + self.batch_size:])
+                    os.remove(path)
+                    return
+                self._count("replayed", len(chunk))
+            os.remove(path)
+            if docs:
+                logger.info(f"Replayed {len(docs)} journaled conversations from {path}")
+
+    def flush(self):
+        """Block until every queued document has been written or journaled"""
+        self._queue.join()
+
+    def close(self):
+        """Flush the queue and stop the background thread"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join()
+
+    def lag(self) -> float:
+        """Seconds the oldest queued document has been waiting"""
+        with self._queue.mutex:
+            oldest = next((item[0] for item in self._queue.queue if item is not None), None)
+        return self.clock() - oldest if oldest is not None else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            counters = dict(self.counters)
+            max_queue_depth, last_lag, max_lag = self.max_queue_depth, self.last_lag, self.max_lag
+        return {
+            **counters,
+            "queue_depth": self._queue.qsize(),
+            "lag_seconds": round(self.lag(), 3),
+            "max_queue_depth": max_queue_depth,
+            "last_lag_seconds": round(last_lag, 3),
+            "max_lag_seconds": round(max_lag, 3),
+        }
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process with this pid is running on this host"""
+    if os.name == "nt":
+        # os.kill cannot probe without signalling on Windows; never steal a journal there
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
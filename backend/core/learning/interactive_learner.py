@@ -1,12 +1,15 @@
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, List, Optional
 from pymongo import MongoClient, ASCENDING
-from transformers import pipeline
+from core.utils.model_registry import registry
 from .memory_system import MemoryDatabase
+from .topics import TopicMatcher
 import random
 import numpy as np
 import logging 
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,15 +18,14 @@ logger = logging.getLogger(__name__)
 class InteractiveLearner:
     def __init__(self, memory_db: MemoryDatabase):
         self.memory = memory_db
-        self.summarizer = pipeline(
-            "summarization", 
-            model="facebook/bart-large-cnn",
-            device="cpu"  # Change to "cuda" if using GPU
+        # Shared per process; MODEL_DEVICE=cuda moves them to the GPU
+        self.summarizer = registry.pipeline(
+            "summarization",
+            "facebook/bart-large-cnn"
         )
-        self.sentiment = pipeline(
+        self.sentiment = registry.pipeline(
             "text-classification",
-            model="finiteautomata/bertweet-base-sentiment-analysis",
-            device="cpu"
+            "finiteautomata/bertweet-base-sentiment-analysis"
         )
         self.theme_keywords = {
             'mercy': ['forgive', 'mercy', 'compassion', 'pardon'],
@@ -31,6 +33,9 @@ class InteractiveLearner:
             'prayer': ['salah', 'pray', 'worship', 'dua'],
             'afterlife': ['hereafter', 'judgment', 'paradise', 'hell']
         }
+        self.topic_matcher = TopicMatcher(self.theme_keywords)
+        # Texts per forward pass of the summarization and sentiment pipelines
+        self.batch_size = int(os.getenv("ANALYSIS_BATCH_SIZE", "8"))
 
     def analyze_conversation(self, conv_id: str) -> Optional[Dict]:
         """Generate and store conversation insights"""
@@ -38,33 +43,12 @@ class InteractiveLearner:
         if not conv:
             return None
 
-        # Prepare conversation text
-        dialog_text = self._prepare_conversation_text(conv['messages'])
-        
         try:
-            # Generate summary
-            summary = self._generate_summary(dialog_text)
-            
-            # Analyze sentiment
-            sentiment = self._analyze_sentiment(summary)
-            
-            # Extract topics
-            topics = self._extract_topics(dialog_text)
-            
-            # Prepare analysis data
-            analysis = {
-                "conv_id": conv_id,
-                "user_id": conv["user_id"],
-                "summary": summary,
-                "sentiment": sentiment["label"],
-                "sentiment_score": float(sentiment["score"]),
-                "topics": topics,
-                "timestamp": datetime.utcnow()
-            }
+            analysis = self.analyze_conversations([conv])[0]
             
             # Store results
-            self.memory.store_summary(analysis)
-            self.memory.mark_as_analyzed(conv_id)
+            self.memory.store_summaries([analysis])
+            self.memory.mark_many_as_analyzed([conv_id])
             
             return analysis
             
@@ -72,6 +56,53 @@ class InteractiveLearner:
             logger.error(f"Analysis failed for {conv_id}: {str(e)}")
             return None
 
+    def analyze_conversations(self, convs: List[Dict]) -> List[Dict]:
+        """
+        One analysis per user for a batch of conversations.
+
+        Each user's conversations are joined in time order into a single
+        dialog; summaries and sentiment for all dialogs come from batched
+        pipeline calls. Analyses have a deterministic _id, so storing one
+        twice replaces it instead of adding a duplicate.
+        """
+        sessions: Dict[str, List[Dict]] = OrderedDict()
+        for conv in sorted(convs, key=lambda c: (c.get("timestamp") or datetime.min, str(c["_id"]))):
+            sessions.setdefault(conv.get("user_id"), []).append(conv)
+
+        dialogs = [
+            self._prepare_conversation_text(
+                [m for conv in session for m in self._conversation_messages(conv)])
+            for session in sessions.values()
+        ]
+        summaries = self._generate_summaries(dialogs)
+        sentiments = self._analyze_sentiments(summaries)
+
+        analyses = []
+        for (user_id, session), dialog, summary, sentiment in zip(
+                sessions.items(), dialogs, summaries, sentiments):
+            conv_ids = [conv["_id"] for conv in session]
+            analyses.append({
+                "_id": f"{user_id}:{conv_ids[0]}",
+                "conv_id": conv_ids[-1],
+                "conv_ids": conv_ids,
+                "user_id": user_id,
+                "summary": summary,
+                "sentiment": sentiment["label"],
+                "sentiment_score": float(sentiment["score"]),
+                "topics": self._extract_topics(dialog),
+                "timestamp": datetime.utcnow()
+            })
+        return analyses
+
+    def _conversation_messages(self, conv: Dict) -> List[Dict]:
+        """Messages of a conversation; log_conversation stores a single user/adam turn"""
+        if conv.get('messages'):
+            return conv['messages']
+        return [
+            {"role": "user", "content": conv.get('user_message') or ''},
+            {"role": "adam", "content": conv.get('adam_response') or ''}
+        ]
+
     def _prepare_conversation_text(self, messages: List[Dict]) -> str:
         """Convert message history to text"""
         return "\n".join(
@@ -79,34 +110,42 @@ class InteractiveLearner:
             for m in messages
         )
 
+    def _generate_summaries(self, texts: List[str]) -> List[str]:
+        """Summaries of many texts from one batched summarizer call"""
+        summaries = ["Brief discussion"] * len(texts)
+        # Skip very short conversations
+        long_rows = [i for i, text in enumerate(texts) if len(text.split()) >= 50]
+        if long_rows:
+            results = self.summarizer(
+                [texts[i] for i in long_rows],
+                max_length=130,
+                min_length=30,
+                do_sample=False,
+                truncation=True,
+                batch_size=self.batch_size
+            )
+            for i, result in zip(long_rows, results):
+                summaries[i] = result['summary_text']
+        return summaries
+
+    def _analyze_sentiments(self, texts: List[str]) -> List[Dict]:
+        """Top sentiment label of many texts from one batched classifier call"""
+        if not texts:
+            return []
+        results = self.sentiment(texts, batch_size=self.batch_size)
+        return [
+            {"label": result['label'], "score": result['score']}
+            for result in (r[0] if isinstance(r, list) else r for r in results)
+        ]
+
     def _generate_summary(self, text: str) -> str:
         """Generate conversation summary"""
-        if len(text.split()) < 50:  # Skip very short conversations
-            return "Brief discussion"
-        
-        result = self.summarizer(
-            text,
-            max_length=130,
-            min_length=30,
-            do_sample=False
-        )
-        return result[0]['summary_text']
+        return self._generate_summaries([text])[0]
 
     def _analyze_sentiment(self, text: str) -> Dict:
         """Analyze emotional tone"""
-        result = self.sentiment(text)
-        return {
-            "label": result[0]['label'],
-            "score": result[0]['score']
-        }
+        return self._analyze_sentiments([text])[0]
 
     def _extract_topics(self, text: str) -> List[str]:
         """Identify key discussion topics"""
-        text_lower = text.lower()
-        topics = []
-        
-        for theme, keywords in self.theme_keywords.items():
-            if any(kw in text_lower for kw in keywords):
-                topics.append(theme)
-                
-        return topics if topics else ["general"]
\ No newline at end of file
+        return self.topic_matcher.extract(text) or ["general"]
@@ -1,13 +1,16 @@
 import uuid
 from datetime import datetime
 from typing import Dict, List, Optional
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReplaceOne, UpdateMany
 from transformers import pipeline
 from config import Config
 import random
 import numpy as np
 import logging
 import os
+from .conversation_writer import ConversationWriter
+from .context_cache import ConversationContextCache
+from .topics import TopicMatcher
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,30 +22,68 @@ class MemoryDatabase:
         self.db = self.client[os.getenv("DB_NAME", "AdamAI-MemoryDB")]
         self.conversations = self.db.conversations
         self.summaries = self.db.summaries
+        self.checkpoints = self.db.checkpoints
+        self.topic_matcher = TopicMatcher()
         self._create_indexes()
+        # Recent turns of active users, kept in step with log_conversation
+        check_interval = float(os.getenv("CONTEXT_CACHE_CHECK_INTERVAL", "30"))
+        self.context_cache = ConversationContextCache(
+            self._conversation_topics,
+            turns=int(os.getenv("CONTEXT_CACHE_TURNS", "5")),
+            max_users=int(os.getenv("CONTEXT_CACHE_USERS", "10000")),
+            max_bytes=int(os.getenv("CONTEXT_CACHE_BYTES", str(64 * 1024 * 1024))),
+            # Other workers' turns are noticed within this many seconds; 0 never checks
+            newest_of=self._newest_timestamp if check_interval > 0 else None,
+            check_interval=check_interval
+        )
+        # Conversations are inserted in the background unless CONVERSATION_WRITE_BEHIND=false
+        self.writer = None
+        if os.getenv("CONVERSATION_WRITE_BEHIND", "true").lower() == "true":
+            self.writer = ConversationWriter(
+                self.conversations,
+                max_queue=int(os.getenv("CONVERSATION_QUEUE_SIZE", "10000")),
+                batch_size=int(os.getenv("CONVERSATION_BATCH_SIZE", "100")),
+                flush_interval=float(os.getenv("CONVERSATION_FLUSH_INTERVAL", "0.5")),
+                # Each process journals to its own copy, with its pid before the extension
+                journal_path=os.getenv("CONVERSATION_JOURNAL_PATH", "cache/conversation_journal.jsonl")
+            )
 
     def _create_indexes(self):
         """Create necessary database indexes"""
         self.conversations.create_index([("user_id", ASCENDING)])
         self.conversations.create_index([("timestamp", ASCENDING)])
+        self.conversations.create_index([("user_id", ASCENDING), ("timestamp", DESCENDING)])
+        self.conversations.create_index([("analyzed", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)])
         self.summaries.create_index([("user_id", ASCENDING)])
         self.summaries.create_index([("topics", ASCENDING)])
         self.summaries.create_index([("timestamp", ASCENDING)])
+        self.summaries.create_index([("user_id", ASCENDING), ("topics", ASCENDING), ("timestamp", DESCENDING)])
 
     def log_conversation(self, user_id: str, user_message: str, adam_response: str) -> str:
         """Store a conversation with timestamp"""
         conv_id = str(uuid.uuid4())
-        self.conversations.insert_one({
+        doc = {
             "_id": conv_id,
             "user_id": user_id,
             "user_message": user_message,
             "adam_response": adam_response,
             "timestamp": datetime.utcnow(),
+            "topics": self.topic_matcher.conversation(user_message, adam_response),
             "analyzed": False
-        })
-        logger.info(f"Logged conversation {conv_id} for user {user_id}")
+        }
+        self.context_cache.append(user_id, doc)
+        if self.writer is not None:
+            self.writer.submit(doc)
+            logger.debug(f"Queued conversation {conv_id} for user {user_id}")
+        else:
+            self.conversations.insert_one(doc)
+            logger.info(f"Logged conversation {conv_id} for user {user_id}")
         return conv_id
 
+    def writer_stats(self) -> Optional[Dict]:
+        """Queue depth, lag and journal counters of the write-behind logger"""
+        return self.writer.stats() if self.writer is not None else None
+
     def store_conversation(self, user_id: str, user_message: str, adam_response: str) -> str:
         """Alias for log_conversation"""
         return self.log_conversation(user_id, user_message, adam_response)
@@ -55,15 +96,40 @@ class MemoryDatabase:
             limit=limit
         ))
 
+    def _newest_timestamp(self, user_id: str) -> Optional[datetime]:
+        """Timestamp of the user's newest stored conversation, read through the (user_id, timestamp) index"""
+        newest = self.conversations.find_one({"user_id": user_id}, {"timestamp": 1},
+                                             sort=[("timestamp", DESCENDING)])
+        return newest["timestamp"] if newest else None
+
     def get_recent_conversations(self, user_id: str, limit: int = 3) -> List[Dict]:
-        """Get recent conversations (alias for get_user_conversations)"""
-        return self.get_user_conversations(user_id, limit)
+        """Get recent conversations, from the per-user context cache when possible"""
+        cached = self.context_cache.get(user_id, limit)
+        if cached is not None:
+            return cached
+        if limit > self.context_cache.turns:
+            return self.get_user_conversations(user_id, limit)
+        history = self.get_user_conversations(user_id, self.context_cache.turns)
+        return self.context_cache.fill(user_id, history)[:limit]
+
+    def get_unanalyzed_conversations(self, limit: int = 10, before: Optional[datetime] = None) -> List[Dict]:
+        """
+        Get conversations needing analysis.
+
+        Without `before`, the newest first. With it, the oldest
+        conversations logged up to `before` in (timestamp, _id) order,
+        leaving out those skipped after repeated analysis failures.
+        """
+        if before is None:
+            return list(self.conversations.find(
+                {"analyzed": False},
+                sort=[("timestamp", -1)],
+                limit=limit
+            ))
 
-    def get_unanalyzed_conversations(self, limit: int = 10) -> List[Dict]:
-        """Get conversations needing analysis"""
         return list(self.conversations.find(
-            {"analyzed": False},
-            sort=[("timestamp", -1)],
+            {"analyzed": False, "analysis_failed": {"$ne": True}, "timestamp": {"$lte": before}},
+            sort=[("timestamp", ASCENDING), ("_id", ASCENDING)],
             limit=limit
         ))
 
@@ -74,11 +140,54 @@ class MemoryDatabase:
             {"$set": {"analyzed": True}}
         )
 
+    def mark_many_as_analyzed(self, conv_ids: List[str]):
+        """Flag a batch of conversations as analyzed in one write"""
+        if conv_ids:
+            self.conversations.bulk_write(
+                [UpdateMany({"_id": {"$in": conv_ids}}, {"$set": {"analyzed": True}})]
+            )
+
+    def mark_analysis_failed(self, conv_ids: List[str], error: str):
+        """Leave conversations out of batch analysis until clear_analysis_failures()"""
+        if conv_ids:
+            self.conversations.bulk_write(
+                [UpdateMany({"_id": {"$in": conv_ids}},
+                            {"$set": {"analysis_failed": True, "analysis_error": error}})]
+            )
+
+    def clear_analysis_failures(self) -> int:
+        """Make skipped conversations eligible for analysis again"""
+        result = self.conversations.update_many(
+            {"analysis_failed": True},
+            {"$unset": {"analysis_failed": "", "analysis_error": ""}}
+        )
+        return result.modified_count
+
     def store_summary(self, summary_data: Dict):
         """Store conversation analysis"""
         self.summaries.insert_one(summary_data)
         logger.info(f"Stored summary for conversation {summary_data.get('conv_id', 'unknown')}")
 
+    def store_summaries(self, analyses: List[Dict]):
+        """Upsert analyses by _id with one unordered bulk write"""
+        if analyses:
+            self.summaries.bulk_write(
+                [ReplaceOne({"_id": a["_id"]}, a, upsert=True) for a in analyses],
+                ordered=False
+            )
+            logger.info(f"Stored {len(analyses)} conversation summaries")
+
+    def load_checkpoint(self, name: str) -> Optional[Dict]:
+        """Progress saved by a background job, if any"""
+        return self.checkpoints.find_one({"_id": name})
+
+    def save_checkpoint(self, name: str, state: Dict):
+        self.checkpoints.update_one(
+            {"_id": name},
+            {"$set": {**state, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
     def find_related_summaries(self, user_id: str, message: str = None, limit: int = 3) -> List[Dict]:
         """Find related summaries - handles message or direct topics"""
         topics = self._extract_topics(message) if message else []
@@ -89,21 +198,10 @@ class MemoryDatabase:
         
         return list(self.summaries.find(query).sort("timestamp", -1).limit(limit))
 
+    def _conversation_topics(self, conv: Dict) -> List[str]:
+        """Topics of both sides of a conversation turn"""
+        return self.topic_matcher.conversation(conv.get('user_message'), conv.get('adam_response'))
+
     def _extract_topics(self, text: str) -> List[str]:
         """Improved topic extraction logic"""
-        text_lower = text.lower()
-        topics = []
-        
-        # Common Islamic topics
-        islamic_topics = {
-            'mercy': ['mercy', 'compassion', 'rahma'],
-            'forgiveness': ['forgive', 'pardon', 'maghfira'],
-            'prayer': ['pray', 'salah', 'dua'],
-            'prophets': ['prophet', 'muhammad', 'isa', 'musa']
-        }
-        
-        for theme, keywords in islamic_topics.items():
-            if any(keyword in text_lower for keyword in keywords):
-                topics.append(theme)
-        
-        return topics
\ No newline at end of file
+        return self.topic_matcher.extract(text)
\ No newline at end of file
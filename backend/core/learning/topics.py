@@ -0,0 +1,116 @@
+"""
+Topic tagging for conversations, done once when a conversation is logged.
+
+MemoryDatabase.log_conversation stores the topics of both sides of a turn
+as an indexed `topics` array. Conversations logged before that are tagged by
+
+    python -m core.learning.topics [--batch-size 500] [--limit N]
+
+which pages by _id and only touches documents without `topics`, so it can
+be interrupted and re-run.
+"""
+import argparse
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Common Islamic topics; keywords match anywhere in the lowercased text
+ISLAMIC_TOPICS = {
+    'mercy': ['mercy', 'compassion', 'rahma'],
+    'forgiveness': ['forgive', 'pardon', 'maghfira'],
+    'prayer': ['pray', 'salah', 'dua'],
+    'prophets': ['prophet', 'muhammad', 'isa', 'musa']
+}
+
+UNTAGGED = {"topics": {"$exists": False}}
+
+
+class TopicMatcher:
+    """One compiled alternation per topic, built once"""
+
+    def __init__(self, topics: Optional[Dict[str, List[str]]] = None):
+        topics = topics or ISLAMIC_TOPICS
+        self.patterns = [
+            (topic, re.compile("|".join(map(re.escape, keywords))))
+            for topic, keywords in topics.items()
+        ]
+
+    def extract(self, text: str) -> List[str]:
+        """Topics with a keyword in text, in definition order"""
+        text_lower = (text or "").lower()
+        return [topic for topic, pattern in self.patterns if pattern.search(text_lower)]
+
+    def conversation(self, user_message: str, adam_response: str) -> List[str]:
+        """Topics of either side of a conversation turn"""
+        text_lower = f"{user_message or ''}\n{adam_response or ''}".lower()
+        return [topic for topic, pattern in self.patterns if pattern.search(text_lower)]
+
+
+def backfill_topics(collection, matcher: TopicMatcher, batch_size: int = 500,
+                    limit: Optional[int] = None) -> Dict[str, int]:
+    """Tag every conversation without `topics` and return progress counters"""
+    stats = {"scanned": 0, "tagged": 0}
+    remaining = collection.count_documents(UNTAGGED)
+    logger.info(f"{remaining} conversations have no topics")
+    started = time.time()
+    last_id = None
+
+    while limit is None or stats["scanned"] < limit:
+        query = dict(UNTAGGED)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        size = batch_size if limit is None else min(batch_size, limit - stats["scanned"])
+        batch = list(collection.find(query, {"user_message": 1, "adam_response": 1})
+                     .sort("_id", 1).limit(size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        operations = [
+            UpdateOne({"_id": doc["_id"], **UNTAGGED},
+                      {"$set": {"topics": matcher.conversation(doc.get("user_message"),
+                                                               doc.get("adam_response"))}})
+            for doc in batch
+        ]
+        result = collection.bulk_write(operations, ordered=False)
+        stats["scanned"] += len(batch)
+        stats["tagged"] += result.modified_count
+
+        rate = stats["scanned"] / max(time.time() - started, 1e-9)
+        logger.info(f"Tagged {stats['tagged']}/{remaining} conversations "
+                    f"({rate:.0f} docs/s, last _id {last_id})")
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill topics on logged conversations")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many documents")
+    args = parser.parse_args()
+
+    load_dotenv('.env')
+    db_uri = os.getenv("MONGODB_URI")
+    if not db_uri:
+        raise ValueError("MONGODB_URI environment variable not set")
+
+    client = MongoClient(db_uri)
+    try:
+        conversations = client[os.getenv("DB_NAME", "AdamAI-MemoryDB")].conversations
+        stats = backfill_topics(conversations, TopicMatcher(), batch_size=args.batch_size,
+                                limit=args.limit)
+        logger.info(f"Topic backfill finished: {stats}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,88 @@
+import re
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# go_emotions labels the lexicon can vote for
+LABELS = (
+    "neutral", "joy", "gratitude", "admiration", "love", "curiosity", "approval",
+    "sadness", "fear", "anger", "grief", "disappointment", "nervousness", "confusion",
+)
+
+LEXICON = {
+    "neutral": "hi hello hey salam salaam assalamu alaikum greetings morning evening okay ok yes "
+               "sure bye goodbye",
+    "joy": "happy glad joy joyful excited wonderful great awesome blessed delighted cheerful",
+    "gratitude": "thanks thank thankful grateful appreciate jazakallah alhamdulillah",
+    "admiration": "beautiful amazing brilliant inspiring wise impressive subhanallah",
+    "love": "love loving adore",
+    "curiosity": "what why how who where when which wonder curious explain tell meaning",
+    "approval": "agree right true good nice",
+    "sadness": "sad unhappy lonely alone depressed cry crying tears heartbroken miserable empty",
+    "fear": "afraid scared fear frightened terrified worried",
+    "anger": "angry mad furious hate annoyed frustrated",
+    "grief": "grief grieving mourning died passed loss lost",
+    "disappointment": "disappointed disappointing letdown",
+    "nervousness": "anxious anxiety nervous stressed stress panic",
+    "confusion": "confused confusing unsure understand",
+}
+
+# Words that carry no emotion and do not count against coverage
+FILLER = frozenset("""
+i me my im i'm you your is am are was be been do does did to of a an the and or but so
+it this that in on at for with about just very really much feel feeling today now please
+can could would should will there here have has had we us our
+""".split())
+
+NEGATIONS = frozenset("not no never don't dont can't cant isn't isnt nothing nobody hardly".split())
+
+# Messages that always go to the model, however confident the lexicon is
+CRISIS_PATTERNS = re.compile(
+    r"\b(?:suicid\w*|kill(?:ing)? myself|end (?:it all|my life)|self[- ]harm\w*|"
+    r"want to die|hurt(?:ing)? myself|no reason to live|hopeless|abuse\w*|rape\w*)\b"
+)
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+
+class LexiconEmotionScorer:
+    """
+    Cheap emotion estimate from a word -> go_emotions label lexicon.
+
+    Votes of the known words are summed with one bincount over label ids.
+    Confidence is the share of non-filler words the lexicon knows times the
+    share of votes the winning label got, halved when a negation appears,
+    so long, mixed or unfamiliar messages score low and go to the model.
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, str]] = None):
+        lexicon = lexicon or LEXICON
+        self.labels = np.array(LABELS)
+        label_ids = {label: i for i, label in enumerate(LABELS)}
+        self.vocabulary: Dict[str, int] = {}
+        for label, words in lexicon.items():
+            for word in words.split():
+                self.vocabulary[word] = label_ids[label]
+
+    def is_crisis(self, text: str) -> bool:
+        return CRISIS_PATTERNS.search(text.lower()) is not None
+
+    def score(self, text: str) -> Tuple[Dict[str, float], float]:
+        """(label -> share of votes for the top 5 labels, confidence in 0..1)"""
+        tokens = [t for t in _TOKEN_RE.findall(text.lower()) if t not in FILLER]
+        if not tokens:
+            return {}, 0.0
+        known = [self.vocabulary[t] for t in tokens if t in self.vocabulary]
+        if not known:
+            return {}, 0.0
+
+        votes = np.bincount(known, minlength=len(self.labels)).astype(np.float64)
+        shares = votes / votes.sum()
+        top = np.argsort(-shares, kind="stable")[:5]
+        profile = {str(self.labels[i]): float(shares[i]) for i in top if shares[i] > 0}
+
+        confidence = (len(known) / len(tokens)) * float(shares[top[0]])
+        if any(t in NEGATIONS for t in tokens):
+            confidence *= 0.5
+        return profile, confidence
+
@@ -1,17 +1,35 @@
 # emotional_personality.py
-from transformers import pipeline
+from core.utils.model_registry import registry
+from core.utils.micro_batcher import MicroBatcher
+from .emotion_lexicon import LexiconEmotionScorer
 import numpy as np
-from typing import Dict
+from typing import Dict, List
+import os
 import re
 
 class EmotionalModel:
     def __init__(self):
         # Emotion detection model
-        self.emotion_classifier = pipeline(
+        self.emotion_classifier = registry.pipeline(
             "text-classification",
-            model="SamLowe/roberta-base-go_emotions",
+            "SamLowe/roberta-base-go_emotions",
             top_k=5
         )
+        # Concurrent analyze() calls share one forward pass per batch
+        self.batcher = None
+        if os.getenv("EMOTION_BATCHING", "true").lower() == "true":
+            self.batcher = MicroBatcher(
+                self._classify_batch,
+                max_batch_size=int(os.getenv("EMOTION_BATCH_SIZE", "16")),
+                max_wait_ms=float(os.getenv("EMOTION_BATCH_WAIT_MS", "2")),
+                name="emotion-batcher"
+            )
+        
+        # "cascade" answers confident, crisis-free messages from the lexicon; "model" always runs RoBERTa
+        self.mode = os.getenv("EMOTION_MODE", "cascade").lower()
+        self.lexicon = LexiconEmotionScorer()
+        self.min_confidence = float(os.getenv("EMOTION_MIN_CONFIDENCE", "0.75"))
+        self.counters = {"lexicon": 0, "model": 0, "low_confidence": 0, "crisis": 0}
         
         # Personality configuration
         self.personality_traits = {
@@ -39,11 +57,39 @@ class EmotionalModel:
             ]
         }
 
+    def _classify_batch(self, texts: List[str]) -> List[List[Dict]]:
+        """Top-5 emotion labels for each text from one pipeline call"""
+        outputs = self.emotion_classifier(texts, batch_size=len(texts))
+        # A single-label pipeline returns a dict per text instead of a list
+        return [output if isinstance(output, list) else [output] for output in outputs]
+
     def analyze(self, text: str) -> Dict:
         """Analyze emotional content of text"""
-        results = self.emotion_classifier(text)[0]
-        emotion_scores = {r['label']: r['score'] for r in results}
-        
+        crisis = False
+        if self.mode == "cascade":
+            crisis = self.lexicon.is_crisis(text)
+            if crisis:
+                self.counters["crisis"] += 1
+            else:
+                emotion_scores, confidence = self.lexicon.score(text)
+                if confidence >= self.min_confidence:
+                    self.counters["lexicon"] += 1
+                    return self._summarize(emotion_scores)
+                self.counters["low_confidence"] += 1
+        self.counters["model"] += 1
+        emotion = self._summarize(self._classify(text))
+        emotion['is_urgent'] = emotion['is_urgent'] or crisis
+        return emotion
+
+    def _classify(self, text: str) -> Dict[str, float]:
+        """Top-5 go_emotions scores from the transformer"""
+        if self.batcher is not None:
+            results = self.batcher(text)
+        else:
+            results = self._classify_batch([text])[0]
+        return {r['label']: r['score'] for r in results}
+
+    def _summarize(self, emotion_scores: Dict[str, float]) -> Dict:
         # Calculate weighted mood score
         mood = sum(
             self.emotion_weights.get(emotion, 0.5) * score
@@ -57,6 +103,16 @@ class EmotionalModel:
             'emotion_profile': emotion_scores
         }
 
+    def stats(self) -> Dict:
+        """Cascade counters and the classifier batcher's queue and batch sizes"""
+        analyzed = self.counters["lexicon"] + self.counters["model"]
+        return {
+            "mode": self.mode,
+            **self.counters,
+            "model_skip_rate": self.counters["lexicon"] / analyzed if analyzed else 0.0,
+            "batcher": self.batcher.stats() if self.batcher else None
+        }
+
     def assess_safety(self, text: str) -> Dict:
         """Check content safety and appropriateness"""
         text_lower = text.lower()
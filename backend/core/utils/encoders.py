@@ -0,0 +1,245 @@
+"""
+Alternative CPU inference backends for sentence-transformer encoders.
+
+ENCODER_BACKEND selects one of:
+    torch       the stock SentenceTransformer (default)
+    torch-int8  SentenceTransformer with torch dynamic int8 Linear layers
+    onnx        the transformer exported to ONNX and run with onnxruntime
+    onnx-int8   the ONNX export with dynamically quantized int8 weights
+
+ONNX exports are cached under ENCODER_CACHE_DIR. Every backend returns the
+same mean-pooled (and, for MiniLM, normalized) vectors as the torch model;
+cosine_agreement() and `python -m core.utils.encoders` measure how closely.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+_INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Average token embeddings over the non-padding positions"""
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+def cosine_agreement(candidate: np.ndarray, reference: np.ndarray) -> Dict[str, float]:
+    """Mean and worst row-wise cosine similarity between two embedding matrices"""
+    candidate = np.asarray(candidate, dtype=np.float32).reshape(len(reference), -1)
+    reference = np.asarray(reference, dtype=np.float32).reshape(len(reference), -1)
+    norms = np.linalg.norm(candidate, axis=1) * np.linalg.norm(reference, axis=1)
+    cosines = (candidate * reference).sum(axis=1) / np.clip(norms, 1e-12, None)
+    return {"mean": float(cosines.mean()), "min": float(cosines.min())}
+
+
+def encoder_revision(model) -> Optional[str]:
+    """Hub commit of the weights behind an encoder, None when it is not known"""
+    revision = getattr(model, "revision", None)
+    if revision:
+        return revision
+    try:
+        return getattr(model[0].auto_model.config, "_commit_hash", None)
+    except Exception:
+        return None
+
+
+def _cache_dir(name: str) -> str:
+    root = os.getenv("ENCODER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "adam-encoders"))
+    return os.path.join(root, name.replace("/", "__"))
+
+
+class OnnxEncoder:
+    """
+    Drop-in replacement for SentenceTransformer.encode backed by onnxruntime.
+
+    Only the transformer runs in ONNX; mean pooling and normalization are
+    done in numpy, mirroring the sentence-transformers pipeline.
+    """
+
+    def __init__(self, model_dir: str, file_name: str = "model.onnx", threads: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, "encoder.json")) as f:
+            config = json.load(f)
+        self.normalize = config["normalize"]
+        self.max_seq_length = config["max_seq_length"]
+        self.revision = config.get("revision")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, file_name), options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32,
+               **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        # Sort by length so each batch pads as little as possible
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        embeddings, chunks = np.empty((0, 0), dtype=np.float32), []
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            tokens = self.tokenizer(batch, padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors="np")
+            feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            chunks.append(mean_pool(hidden, tokens["attention_mask"]))
+        if chunks:
+            embeddings = np.empty((len(texts), chunks[0].shape[1]), dtype=np.float32)
+            embeddings[order] = np.vstack(chunks)
+        if self.normalize and len(embeddings):
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+
+def _publish(export_dir: str, model_dir: str):
+    """Move a finished export into place, model.onnx last since its presence marks completion"""
+    names = sorted(os.listdir(export_dir), key=lambda name: name == "model.onnx")
+    for name in names:
+        os.replace(os.path.join(export_dir, name), os.path.join(model_dir, name))
+
+
+def export_onnx(name: str, model_dir: Optional[str] = None, quantize: bool = False) -> str:
+    """
+    Export a SentenceTransformer's transformer to ONNX (once) and return the directory.
+
+    Files are written to a private temporary directory and renamed into
+    place, so a worker loading the model never sees a half-written export.
+    """
+    model_dir = model_dir or _cache_dir(name)
+    target = "model_int8.onnx" if quantize else "model.onnx"
+    if os.path.exists(os.path.join(model_dir, target)):
+        return model_dir
+
+    os.makedirs(model_dir, exist_ok=True)
+    if not os.path.exists(os.path.join(model_dir, "model.onnx")):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(name, device="cpu")
+        transformer, pooling = model[0], model[1]
+        if not getattr(pooling, "pooling_mode_mean_tokens", False):
+            raise ValueError(f"Only mean-pooling encoders can be exported, {name} is not one")
+
+        export_dir = tempfile.mkdtemp(prefix=".export-", dir=model_dir)
+        try:
+            sample = transformer.tokenizer(["export sample"], return_tensors="pt")
+            input_names = [key for key in _INPUT_NAMES if key in sample]
+            axes = {key: {0: "batch", 1: "sequence"} for key in input_names + ["last_hidden_state"]}
+            with torch.no_grad():
+                torch.onnx.export(
+                    transformer.auto_model.eval(),
+                    tuple(sample[key] for key in input_names),
+                    os.path.join(export_dir, "model.onnx"),
+                    input_names=input_names,
+                    output_names=["last_hidden_state"],
+                    dynamic_axes=axes,
+                    opset_version=14
+                )
+            transformer.tokenizer.save_pretrained(export_dir)
+            with open(os.path.join(export_dir, "encoder.json"), "w") as f:
+                json.dump({
+                    "model": name,
+                    "max_seq_length": model.max_seq_length,
+                    "normalize": any(type(module).__name__ == "Normalize" for module in model),
+                    "revision": encoder_revision(model),
+                }, f)
+            _publish(export_dir, model_dir)
+        finally:
+            shutil.rmtree(export_dir, ignore_errors=True)
+        logger.info(f"Exported {name} to ONNX in {model_dir}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        tmp_path = os.path.join(model_dir, f".{target}.{os.getpid()}.tmp")
+        try:
+            quantize_dynamic(os.path.join(model_dir, "model.onnx"), tmp_path,
+                             weight_type=QuantType.QInt8)
+            os.replace(tmp_path, os.path.join(model_dir, target))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        logger.info(f"Quantized ONNX export of {name} to int8")
+    return model_dir
+
+
+def load_encoder(name: str, backend: str = "torch", device: str = "cpu"):
+    """Load an encoder with a .encode() compatible with SentenceTransformer's"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}', expected one of {BACKENDS}")
+    if backend.startswith("onnx"):
+        quantize = backend == "onnx-int8"
+        model_dir = export_onnx(name, quantize=quantize)
+        return OnnxEncoder(model_dir, "model_int8.onnx" if quantize else "model.onnx",
+                           threads=int(os.getenv("ENCODER_THREADS", "0")) or None)
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(name, device=device)
+    if backend == "torch-int8":
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def benchmark(name: str, backend: str, sentences: List[str], repeats: int = 3) -> Dict:
+    """Speed-up and cosine agreement of a backend against the torch encoder"""
+    reference = load_encoder(name, "torch")
+    candidate = load_encoder(name, backend)
+
+    def timed(model):
+        best = float("inf")
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for sentence in sentences:
+                model.encode(sentence)
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    agreement = cosine_agreement(candidate.encode(sentences), reference.encode(sentences))
+    torch_seconds, backend_seconds = timed(reference), timed(candidate)
+    return {
+        "backend": backend,
+        "agreement": agreement,
+        "ms_per_query_torch": 1000 * torch_seconds / len(sentences),
+        "ms_per_query_backend": 1000 * backend_seconds / len(sentences),
+        "speedup": torch_seconds / backend_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and benchmark an encoder backend")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backend", default=os.getenv("ENCODER_BACKEND", "onnx"), choices=BACKENDS)
+    args = parser.parse_args()
+
+    sentences = [
+        "What does the Quran say about mercy?",
+        "How should I pray when I feel anxious?",
+        "Tell me about the prophet Musa and Pharaoh",
+        "Blessed are the merciful, for they shall obtain mercy",
+        "Is patience rewarded in the hereafter?",
+        "I feel lonely and far from God",
+    ] * 5
+    print(json.dumps(benchmark(args.model, args.backend, sentences), indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item calls into batched calls of `fn`.
+
+    submit() enqueues an item and returns a Future. A worker thread takes
+    the first waiting item, keeps collecting until `max_batch_size` items
+    are queued or `max_wait_ms` has passed since it arrived, then runs
+    fn(items) once and resolves every future with its row of the result.
+    Items that arrive while a batch is running are picked up together by
+    the next one, so batches grow with load on their own.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0, name: str = "micro-batcher"):
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self.max_queue_depth = 0
+        self.batch_sizes: Dict[int, int] = {}
+        self.queue_wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        future: Future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError(f"{self.name} is closed"))
+            return future
+        self._queue.put((item, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Submit one item and wait for its result"""
+        return self.submit(item).result(timeout)
+
+    def _collect(self, first: tuple) -> List[tuple]:
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                # Take whatever is already queued, then wait out the deadline
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if pending is None:
+                self._queue.put(None)
+                break
+            batch.append(pending)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._collect(first)
+            started = time.perf_counter()
+            live = [(item, future) for item, future, _ in batch if future.set_running_or_notify_cancel()]
+            items = [item for item, _ in live]
+            futures = [future for _, future in live]
+            try:
+                results = self.fn(items) if items else []
+                if len(results) != len(items):
+                    raise ValueError(f"{self.name} returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"{self.name} batch of {len(items)} failed: {str(e)}")
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            finished = time.perf_counter()
+
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+                self.queue_wait_seconds += sum(started - enqueued for _, _, enqueued in batch)
+                self.run_seconds += finished - started
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop accepting items; queued items are still processed"""
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "items": self.items,
+                "failures": self.failures,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "mean_queue_wait_ms": 1000 * self.queue_wait_seconds / self.items if self.items else 0.0,
+                "mean_batch_ms": 1000 * self.run_seconds / self.batches if self.batches else 0.0,
+            }
@@ -0,0 +1,138 @@
+import gc
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _torch_module(model: Any):
+    """The torch module behind a SentenceTransformer or transformers pipeline"""
+    return getattr(model, "model", model)
+
+
+def model_memory(model: Any) -> Optional[int]:
+    """Bytes held by a model's parameters and buffers, None if unknown"""
+    module = _torch_module(model)
+    if not hasattr(module, "parameters"):
+        return None
+    tensors = list(module.parameters()) + list(getattr(module, "buffers", lambda: [])())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    """
+    Process-wide store of shared, lazily loaded models.
+
+    Models are keyed by name and device (plus any loader options), loaded
+    at most once even when several threads ask at the same time, and kept
+    until unload() is called. Loading different models does not serialize:
+    each key has its own lock.
+    """
+
+    def __init__(self, default_device: Optional[str] = None):
+        self.default_device = default_device or os.getenv("MODEL_DEVICE", "cpu")
+        self._models: Dict[Tuple, Any] = {}
+        self._load_seconds: Dict[Tuple, float] = {}
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, loader: Callable[[str, str], Any], device: Optional[str] = None,
+            options: Hashable = ()) -> Any:
+        """Return the shared model for (name, device, options), loading it on first use"""
+        key = (name, device or self.default_device, options)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            model = self._models.get(key)
+            if model is None:
+                started = time.perf_counter()
+                model = loader(name, key[1])
+                self._load_seconds[key] = time.perf_counter() - started
+                with self._lock:
+                    self._models[key] = model
+                logger.info(f"Loaded model {name} on {key[1]} in {self._load_seconds[key]:.1f}s")
+        return model
+
+    def sentence_transformer(self, name: str = "all-MiniLM-L6-v2", device: Optional[str] = None):
+        """Shared SentenceTransformer encoder"""
+        def load(model_name: str, model_device: str):
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name, device=model_device)
+
+        return self.get(name, load, device, ("sentence-transformer",))
+
+    def encoder(self, name: str = "all-MiniLM-L6-v2", backend: Optional[str] = None,
+                device: Optional[str] = None):
+        """
+        Shared sentence encoder on the inference backend chosen by
+        ENCODER_BACKEND (see core.utils.encoders); "torch" is the plain
+        SentenceTransformer and shares its instance.
+        """
+        backend = (backend or os.getenv("ENCODER_BACKEND", "torch")).lower()
+        if backend == "torch":
+            return self.sentence_transformer(name, device)
+
+        def load(model_name: str, model_device: str):
+            from .encoders import load_encoder
+            return load_encoder(model_name, backend, model_device)
+
+        return self.get(name, load, device, ("encoder", backend))
+
+    def pipeline(self, task: str, name: str, device: Optional[str] = None, **kwargs):
+        """Shared transformers pipeline for a task and model"""
+        def load(model_name: str, model_device: str):
+            from transformers import pipeline
+            return pipeline(task, model=model_name, device=model_device, **kwargs)
+
+        return self.get(name, load, device, ("pipeline", task, tuple(sorted(kwargs.items()))))
+
+    def unload(self, name: str, device: Optional[str] = None) -> int:
+        """Drop every loaded variant of a model (on one device if given); returns the count"""
+        with self._lock:
+            keys = [key for key in self._models
+                    if key[0] == name and (device is None or key[1] == device)]
+            for key in keys:
+                del self._models[key]
+                self._load_seconds.pop(key, None)
+        if keys:
+            gc.collect()
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except ImportError:
+                pass
+            logger.info(f"Unloaded {len(keys)} instance(s) of model {name}")
+        return len(keys)
+
+    def loaded(self) -> Dict[str, Dict]:
+        """Loaded models with their device, memory footprint and load time"""
+        with self._lock:
+            items = list(self._models.items())
+        report = {}
+        for key, model in items:
+            name, device, options = key
+            label = f"{name}@{device}"
+            if options and options[0] in ("pipeline", "encoder"):
+                label = f"{options[1]}:{label}"
+            report[label] = {
+                "device": device,
+                "memory_bytes": model_memory(model),
+                "load_seconds": round(self._load_seconds.get(key, 0.0), 3),
+            }
+        return report
+
+    def memory_usage(self) -> int:
+        """Total bytes held by loaded models whose size is known"""
+        return sum(info["memory_bytes"] or 0 for info in self.loaded().values())
+
+
+# Shared by every component in the process
+registry = ModelRegistry()
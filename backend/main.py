@@ -1,4 +1,5 @@
 import time
+import threading
 from typing import Dict, Optional
 import logging
 from logging.handlers import RotatingFileHandler
@@ -6,9 +7,12 @@ from core.knowledge.knowledge_db import KnowledgeRetriever
 from core.knowledge.sacred_scanner import SacredScanner
 from core.knowledge.synthesizer import UniversalSynthesizer
 from core.knowledge.mind_integrator import MindIntegrator
+from core.knowledge.prophetic_responses import AdamRules
+from core.knowledge.semantic_cache import SemanticCache
 from core.personality.emotional_model import EmotionalModel
 from core.personality.general_personality import GeneralPersonality
 from core.learning.memory_system import MemoryDatabase
+from core.utils.model_registry import registry
 import os
 from dotenv import load_dotenv
 
@@ -54,38 +58,146 @@ def configure_logging():
     # Suppress duplicate root logs
     logging.getLogger().handlers = []
 
-# Call this at the start of your application
-configure_logging()
-
 load_dotenv()
 
+# Startup stages, in the order they are loaded
+STARTUP_STAGES = ("safety", "memory", "retrieval", "emotion", "warmup")
+
+
 class AdamAI:
-    def __init__(self):
-        """Initialize with silent logging"""
-        self._silent_init()
-        self._announce_ready()
+    def __init__(self, staged: Optional[bool] = None):
+        """
+        Initialize with silent logging.
+
+        With staged startup (STAGED_STARTUP, on by default) the constructor
+        returns at once and the components load in a background thread;
+        until retrieval is ready, messages are answered by AdamRules. A
+        stage that fails is retried STARTUP_RETRIES times with exponential
+        backoff before startup gives up and stays not ready.
+        """
+        if staged is None:
+            staged = os.getenv("STAGED_STARTUP", "true").lower() == "true"
+        self.rules = AdamRules()
+        self.db = self.scanner = self.synthesizer = self.integrator = None
+        self.emotion = self.safety = self.memory = None
+        # Synthesized knowledge reused across paraphrased questions
+        self.semantic_cache = SemanticCache(
+            capacity=int(os.getenv("SEMANTIC_CACHE_SIZE", "256")),
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "3600")) or None
+        )
+        self.stages = {stage: "pending" for stage in STARTUP_STAGES}
+        self.startup_error = None
+        self.started_at = time.time()
+        self._ready = threading.Event()
+
+        if staged:
+            self._startup_thread = threading.Thread(
+                target=self._staged_init, name="adam-startup", daemon=True)
+            self._startup_thread.start()
+        else:
+            self._silent_init()
+            self._announce_ready()
 
     def _silent_init(self):
         """Perform initialization with logs going to file only"""
         try:
-            self.db = KnowledgeRetriever()
-            self.scanner = SacredScanner(self.db)
-            self.synthesizer = UniversalSynthesizer(self.db)
-            self.integrator = MindIntegrator()
-            self.emotion = EmotionalModel()
-            self.safety = GeneralPersonality()
-            self.memory = MemoryDatabase()
-
-        
-        
-            # Warm up components
-            self._initialize_system()
-            logging.getLogger('adam.system').info("AdamAI system initialized")
+            for stage in STARTUP_STAGES:
+                self._load_stage_with_retry(stage)
+            self.startup_error = None
+            self._mark_ready()
 
         except Exception as e:
             logging.getLogger('adam.system').critical(f"Initialization failed: {str(e)}")
             raise
 
+    def _staged_init(self):
+        """Background startup: load each stage in priority order"""
+        try:
+            self._silent_init()
+            self._announce_ready()
+        except Exception:
+            # startup_error and the failed stage stay visible through readiness()
+            pass
+
+    def _load_stage_with_retry(self, stage: str):
+        attempts = max(1, int(os.getenv("STARTUP_RETRIES", "3")))
+        delay = float(os.getenv("STARTUP_RETRY_DELAY", "5"))
+        for attempt in range(1, attempts + 1):
+            try:
+                self._load_stage(stage)
+                return
+            except Exception as e:
+                self.startup_error = f"{stage}: {str(e)}"
+                logging.getLogger('adam.system').error(
+                    f"Startup stage {stage} failed (attempt {attempt}/{attempts}): {str(e)}")
+                if attempt == attempts:
+                    raise
+                time.sleep(delay * 2 ** (attempt - 1))
+
+    def _load_stage(self, stage: str):
+        self.stages[stage] = "loading"
+        started = time.time()
+        try:
+            if stage == "safety":
+                self.safety = GeneralPersonality()
+            elif stage == "memory":
+                self.memory = MemoryDatabase()
+            elif stage == "retrieval":
+                db = KnowledgeRetriever()
+                scanner = SacredScanner(db)
+                self.synthesizer = UniversalSynthesizer(db)
+                self.integrator = MindIntegrator()
+                self.db, self.scanner = db, scanner
+            elif stage == "emotion":
+                self.emotion = EmotionalModel()
+            elif stage == "warmup":
+                # Warm up components
+                self._initialize_system()
+        except Exception:
+            self.stages[stage] = "failed"
+            raise
+        self.stages[stage] = "ready"
+        logging.getLogger('adam.system').info(f"Startup stage {stage} ready in {time.time() - started:.1f}s")
+
+    def _mark_ready(self):
+        self._ready.set()
+        logging.getLogger('adam.system').info(
+            f"AdamAI system initialized in {time.time() - self.started_at:.1f}s")
+        logging.getLogger('adam.system').info(f"Loaded models: {registry.loaded()}")
+
+    def is_ready(self) -> bool:
+        """True once every startup stage has loaded"""
+        return self._ready.is_set() and all(state == "ready" for state in self.stages.values())
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def cache_stats(self) -> Dict:
+        """Hit rates of the response-level caches"""
+        stats = {"semantic": self.semantic_cache.stats()}
+        if self.scanner is not None:
+            stats["scan"] = self.scanner.cache_stats()
+        if self.memory is not None:
+            stats["context"] = self.memory.context_cache.stats()
+        return stats
+
+    def inference_stats(self) -> Dict:
+        """Batching and queue counters of the request-path models and writers"""
+        return {
+            "emotion": self.emotion.stats() if self.emotion is not None else None,
+            "conversation_writer": self.memory.writer_stats() if self.memory is not None else None
+        }
+
+    def readiness(self) -> Dict:
+        """Startup progress for health checks"""
+        return {
+            "ready": self.is_ready(),
+            "stages": dict(self.stages),
+            "error": self.startup_error,
+            "uptime_seconds": round(time.time() - self.started_at, 1)
+        }
+
     def _announce_ready(self):
         """Show ready message in console"""
         ready_logger = logging.getLogger('adam_ready')
@@ -94,9 +206,7 @@ class AdamAI:
 
     def _initialize_system(self):
         """Initialize system components"""
-        logging.getLogger("Building thematic index...")
-        self.scanner._refresh_thematic_index()
-    
+        # The scanner loads or builds its thematic index on construction
         if os.getenv("BACKFILL_EMBEDDINGS", "false").lower() == "true":
             logging.getLogger("Backfilling embeddings...")
             self.db.backfill_embeddings()
@@ -113,13 +223,16 @@ class AdamAI:
         Returns:
             Adam's crafted response with clay metaphors
         """
+        if self.stages["retrieval"] != "ready":
+            return self._fallback_response(user_id, message)
+
         try:
             # Step 1: Safety and Emotion Analysis
             safety_check = self.safety.assess(message)
             if isinstance(safety_check, dict) and safety_check.get('is_unsafe', False):
                 return "*sets clay aside* I cannot respond to that which may cause harm."
                 
-            emotion = self.emotion.analyze(message)
+            emotion = self.emotion.analyze(message) if self.stages["emotion"] == "ready" else None
             if isinstance(emotion, dict):
                 mood_score = emotion.get('mood_score', 0.5)
             else:
@@ -127,28 +240,13 @@ class AdamAI:
             
             # Step 2: Contextual Memory Retrieval
             context = self._prepare_context(user_id, message, mood_score)
-            
-            # Step 3: Knowledge Retrieval
-            try:
-                scan_results = self.scanner.scan(message, context)
-            except Exception as scan_error:
-                if "text index required" in str(scan_error):
-                    logging.error("Text index missing - attempting to create...")
-                    self.db.create_text_index()
-                    scan_results = self.scanner.scan(message, context)  # Retry
-                else:
-                    raise
 
-            # Step 4: Knowledge Synthesis
-            synthesized = self.synthesizer.blend(
-                verses=scan_results.get('verses', []),
-                wisdom=scan_results.get('wisdom', []),
-                context=context
-            )
+            # Steps 3-4: Knowledge Retrieval and Synthesis, shared by paraphrases
+            synthesized = self._synthesize_knowledge(message, context)
             
             # Step 5: Response Generation
             response = self.integrator.integrate(
-                synthesized,
+                dict(synthesized),
                 user_context={
                     "user_id": user_id,
                     "mood": mood_score,
@@ -168,6 +266,49 @@ class AdamAI:
                 return "*reshapes clay* My knowledge needs reorganization... please ask again momentarily"
             return "*clay crumbles* My thoughts are scattered... please ask again"
 
+    def _synthesize_knowledge(self, message: str, context: Dict) -> Dict:
+        """Scan and blend knowledge for a question, reusing the bundle of a near-duplicate"""
+        started = time.perf_counter()
+        query_vector = self.db.encode_query(message)
+        corpus_version = self.db.corpus_version()
+        cached = self.semantic_cache.lookup(query_vector, corpus_version)
+        if cached is not None:
+            return cached[0]
+
+        try:
+            scan_results = self.scanner.scan(message, context)
+        except Exception as scan_error:
+            if "text index required" in str(scan_error):
+                logging.error("Text index missing - attempting to create...")
+                self.db.create_text_index()
+                scan_results = self.scanner.scan(message, context)  # Retry
+            else:
+                raise
+
+        synthesized = self.synthesizer.blend(
+            verses=scan_results.get('verses', []),
+            wisdom=scan_results.get('wisdom', []),
+            context=context
+        )
+        if scan_results.get('all_results') and synthesized and 'content' in synthesized:
+            self.semantic_cache.add(query_vector, synthesized,
+                                    time.perf_counter() - started, corpus_version)
+        return synthesized
+
+    def _fallback_response(self, user_id: str, message: str) -> str:
+        """Cheap pattern response used while retrieval is still loading"""
+        if self.safety is not None:
+            safety_check = self.safety.assess(message)
+            if isinstance(safety_check, dict) and safety_check.get('is_unsafe', False):
+                return "*sets clay aside* I cannot respond to that which may cause harm."
+        response = self.rules.respond(message)
+        if self.memory is not None:
+            try:
+                self._store_conversation(user_id, message, response)
+            except Exception as e:
+                logging.getLogger('adam.system').warning(f"Could not store fallback reply: {str(e)}")
+        return response
+
     def _store_conversation(self, user_id: str, user_msg: str, adam_response: str):
         """Store conversation in memory"""
         self.memory.store_conversation(
@@ -188,10 +329,8 @@ class AdamAI:
         
         for conv in history:
             if isinstance(conv, dict):
-                # Extract themes from message content
-                themes = self.memory._extract_topics(conv.get('user_message', ''))
-                themes.extend(self.memory._extract_topics(conv.get('adam_response', '')))
-                related_themes.update(themes)
+                # Topics are computed once, when the turn is cached
+                related_themes.update(conv.get('topics') or [])
                 
                 conversation_history.append({
                     "role": "user",
@@ -210,9 +349,10 @@ class AdamAI:
         }
 
 if __name__ == "__main__":
+    configure_logging()
     try:
         # This will show nothing in console until ready
-        adam = AdamAI()
+        adam = AdamAI(staged=False)
         
         # Simple conversation loop
         while True:
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import mongomock
+
+from core.learning import memory_system
+from core.learning.analysis_worker import ConversationAnalysisWorker
+from core.learning.interactive_learner import InteractiveLearner
+from core.utils.model_registry import registry
+
+
+def fake_pipeline(task, name, **kwargs):
+    calls = []
+
+    def run(texts, **options):
+        calls.append(len(texts))
+        if task == "summarization":
+            return [{"summary_text": f"summary of {len(t.split())} words"} for t in texts]
+        return [{"label": "POS", "score": 0.9} for _ in texts]
+
+    run.calls = calls
+    return run
+
+
+def bulk_write(collection):
+    # mongomock's bulk API lags behind pymongo's ReplaceOne/UpdateMany
+    def write(operations, ordered=True):
+        for op in operations:
+            if type(op).__name__ == "ReplaceOne":
+                collection.replace_one(op._filter, op._doc, upsert=op._upsert)
+            else:
+                collection.update_many(op._filter, op._doc)
+        return SimpleNamespace()
+    return write
+
+
+def make_memory(monkeypatch):
+    monkeypatch.setenv("CONVERSATION_WRITE_BEHIND", "false")
+    monkeypatch.setattr(memory_system, "MongoClient", mongomock.MongoClient)
+    memory = memory_system.MemoryDatabase("mongodb://localhost")
+    memory.summaries.bulk_write = bulk_write(memory.summaries)
+    memory.conversations.bulk_write = bulk_write(memory.conversations)
+    return memory
+
+
+def test_worker_batches_per_user_and_resumes(monkeypatch):
+    monkeypatch.setattr(registry, "pipeline", fake_pipeline)
+    memory = make_memory(monkeypatch)
+    start = datetime.utcnow() - timedelta(hours=1)
+    memory.conversations.insert_many([
+        {"_id": f"c{i:02d}", "user_id": f"u{i % 3}", "user_message": "how should I pray " * (i % 2 * 30),
+         "adam_response": "*shapes clay* with mercy", "timestamp": start + timedelta(seconds=i),
+         "analyzed": False}
+        for i in range(10)
+    ])
+    learner = InteractiveLearner(memory)
+
+    worker = ConversationAnalysisWorker(learner, page_size=6)
+    assert worker.run_once() == 6
+    assert memory.summaries.count_documents({}) == 3
+    assert learner.sentiment.calls == [3]
+    summary = memory.summaries.find_one({"user_id": "u0"})
+    assert summary["conv_ids"] == ["c00", "c03"] and "prayer" in summary["topics"]
+
+    # A new worker picks up after the pages the first one finished
+    resumed = ConversationAnalysisWorker(learner, page_size=6)
+    assert resumed.run_once() == 4
+    assert resumed.run_once() == 0
+    assert memory.conversations.count_documents({"analyzed": False}) == 0
+    assert memory.summaries.count_documents({}) == 6
+    assert resumed.stats()["conversations_per_second"] > 0
+
+
+def test_failed_pages_are_retried_then_skipped(monkeypatch):
+    monkeypatch.setattr(registry, "pipeline", fake_pipeline)
+    memory = make_memory(monkeypatch)
+    start = datetime.utcnow() - timedelta(hours=1)
+
+    def log(i, offset):
+        memory.conversations.insert_one({
+            "_id": f"c{i}", "user_id": "u1", "user_message": "hello", "adam_response": "peace",
+            "timestamp": start + timedelta(seconds=offset), "analyzed": False})
+
+    for i in range(4):
+        log(i, i)
+    learner = InteractiveLearner(memory)
+    analyze = learner.analyze_conversations
+    outage = [2]
+
+    def flaky(convs):
+        if outage[0]:
+            outage[0] -= 1
+            raise RuntimeError("mongo unavailable")
+        return analyze(convs)
+
+    learner.analyze_conversations = flaky
+    worker = ConversationAnalysisWorker(learner, page_size=2, interval=1.0, max_attempts=3)
+    assert worker.run_once() == 0 and worker.retry_delay == 1.0
+    assert worker.run_once() == 0 and worker.retry_delay == 2.0
+    # The page was not skipped: the retry after the outage analyzes it
+    assert worker.run_once() == 2 and worker.retry_delay == 0.0
+    assert memory.conversations.count_documents({"analyzed": True}) == 2
+
+    # A conversation replayed late with an older timestamp is still found
+    log(9, -30)
+    outage[0] = 3
+    assert [worker.run_once() for _ in range(3)] == [0, 0, 2]
+    skipped = memory.load_checkpoint("conversation_analysis")["skipped"]
+    assert [(r["first_conv_id"], r["last_conv_id"], r["count"]) for r in skipped] == [("c9", "c2", 2)]
+    assert worker.run_once() == 1 and worker.run_once() == 0
+    assert memory.conversations.count_documents({"analysis_failed": True}) == 2
+
+    assert worker.retry_skipped() == 2
+    assert worker.run_once() == 2
+    assert memory.conversations.count_documents({"analyzed": False}) == 0
+    assert worker.stats()["skipped"] == 2
+
+
+def test_analyze_conversation_reads_logged_turns(monkeypatch):
+    monkeypatch.setattr(registry, "pipeline", fake_pipeline)
+    memory = make_memory(monkeypatch)
+    conv_id = memory.log_conversation("u1", "Tell me about forgiveness", "*molds clay* Allah forgives")
+    analysis = InteractiveLearner(memory).analyze_conversation(conv_id)
+
+    assert analysis["summary"] == "Brief discussion" and analysis["topics"] == ["mercy"]
+    assert memory.conversations.find_one({"_id": conv_id})["analyzed"] is True
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from core.knowledge.ann_index import IVFIndex
+from core.knowledge.vector_index import ExactVectorIndex
+
+
+@pytest.fixture
+def clustered_corpus():
+    rng = np.random.default_rng(3)
+    centers = rng.normal(size=(20, 384))
+    vectors = np.repeat(centers, 100, axis=0) + 0.3 * rng.normal(size=(2000, 384))
+    ids = [f"doc{i}" for i in range(len(vectors))]
+    return ids, vectors.astype(np.float32), rng
+
+
+def recall(index, exact, queries, k=10, **kwargs):
+    found = 0
+    for q in queries:
+        truth = {exact.ids[row] for row, _ in exact.search(q, k)}
+        found += len(truth & {index.ids[row] for row, _ in index.search(q, k, **kwargs)})
+    return found / (k * len(queries))
+
+
+def test_ivf_recall_grows_with_nprobe(clustered_corpus):
+    ids, vectors, rng = clustered_corpus
+    exact = ExactVectorIndex()
+    exact.build(ids, vectors)
+    ivf = IVFIndex(nlist=32, nprobe=1)
+    ivf.build(ids, vectors)
+    queries = vectors[rng.choice(len(vectors), 20, replace=False)]
+
+    low = recall(ivf, exact, queries, nprobe=1)
+    high = recall(ivf, exact, queries, nprobe=32)
+
+    assert high == pytest.approx(1.0)
+    assert low <= high
+    assert low > 0.5
+
+
+def test_ivf_save_load_roundtrip(clustered_corpus, tmp_path):
+    ids, vectors, _ = clustered_corpus
+    ivf = IVFIndex(nlist=16, nprobe=4)
+    ivf.build(ids, vectors, [{"content": i} for i in ids])
+    ivf.corpus_version = "3:100:abc"
+    path = str(tmp_path / "ivf.npz")
+    ivf.save(path)
+
+    loaded = IVFIndex.load(path)
+
+    assert loaded.nprobe == 4
+    assert loaded.corpus_version == "3:100:abc"
+    assert loaded.ids == ivf.ids
+    assert loaded.search(vectors[5], 3) == ivf.search(vectors[5], 3)
+    assert loaded.document(0)["content"] == ivf.document(0)["content"]
+
+
+def test_ivf_filtered_search_returns_only_matches(clustered_corpus):
+    ids, vectors, _ = clustered_corpus
+    attributes = [{"source": "bible" if i % 50 == 0 else "quran"} for i in range(len(ids))]
+    ivf = IVFIndex(nlist=32, nprobe=1)
+    ivf.build(ids, vectors, attributes=attributes)
+
+    hits = ivf.search(vectors[0], 10, filters={"source": "bible"})
+
+    assert len(hits) == 10
+    assert {int(ivf.ids[row][3:]) % 50 for row, _ in hits} == {0}
@@ -0,0 +1,48 @@
+import pytest
+from core.knowledge.bm25_index import BM25Index, analyze
+
+DOCS = [
+    {"content": "Indeed, Allah is Forgiving and Merciful", "source": "quran"},
+    {"content": "Blessed are the merciful, for they shall obtain mercy", "source": "bible"},
+    {"content": "And establish prayer and give zakah", "source": "quran"},
+    {"content": "Pray without ceasing", "source": "bible"},
+    {"content": "The patient ones are given their reward without account", "source": "quran"},
+]
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.build([f"doc{i}" for i in range(len(DOCS))], DOCS)
+    return index
+
+
+def test_analyzer_stems_and_drops_stop_words():
+    assert analyze("The Prophet's prayers are answered") == ["prophet", "prayer", "answer"]
+
+
+def test_search_ranks_by_bm25(index):
+    hits = index.search("merciful mercy", 5)
+
+    assert [index.ids[row] for row, _ in hits] == ["doc1", "doc0"]
+    assert hits[0][1] > hits[1][1] > 0
+    assert index.search("praying", 5)[0][0] in (2, 3)
+    assert index.search("unrelated words", 5) == []
+
+
+def test_search_applies_filters(index):
+    hits = index.search("pray prayer", 5, filters={"source": "bible"})
+    assert [index.document(row)["content"] for row, _ in hits] == ["Pray without ceasing"]
+
+
+def test_save_load_roundtrip(index, tmp_path):
+    path = str(tmp_path / "bm25.npz")
+    index.corpus_version = "2:6:doc5"
+    index.save(path)
+
+    loaded = BM25Index.load(path)
+
+    assert loaded.corpus_version == "2:6:doc5"
+
+    assert loaded.search("merciful", 3) == index.search("merciful", 3)
+    assert loaded.document(1, 2.0) == {"_id": "doc1", "score": 2.0, **DOCS[1]}
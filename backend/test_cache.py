@@ -0,0 +1,64 @@
+import numpy as np
+from core.utils.cache import LRUCache
+from core.knowledge.embedding_cache import EmbeddingCache, normalize_text
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_expires_entries_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4
+    assert cache.get("a") == 1
+    clock.now = 6
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_embedding_cache_skips_encoder_for_repeats(tmp_path):
+    calls = []
+
+    def encode(text):
+        calls.append(text)
+        return np.full(4, len(text), dtype=np.float32)
+
+    path = str(tmp_path / "embeddings.db")
+    cache = EmbeddingCache("model", maxsize=8, path=path)
+    first = cache.get_or_encode("What is  Mercy ", encode)
+    second = cache.get_or_encode("what is mercy", encode)
+
+    assert calls == ["what is mercy"]
+    assert np.array_equal(first, second)
+
+    restarted = EmbeddingCache("model", maxsize=8, path=path)
+    assert np.array_equal(restarted.get_or_encode("WHAT IS MERCY", encode), first)
+    assert restarted.stats()["disk_hits"] == 1
+    assert len(calls) == 1
+
+    # Vectors from another backend or weights revision are never served
+    assert EmbeddingCache("model", maxsize=8, path=path, backend="onnx").get("what is mercy") is None
+    assert EmbeddingCache("model", maxsize=8, path=path, revision="abc123").get("what is mercy") is None
+
+
+def test_normalize_text():
+    assert normalize_text("  How do\tI   PRAY ") == "how do i pray"
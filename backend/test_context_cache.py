@@ -0,0 +1,101 @@
+from core.learning.context_cache import ConversationContextCache, turn_size
+
+
+def topics_of(conv):
+    return [word for word in ("mercy", "prayer") if word in conv["user_message"]]
+
+
+def turn(i, message="hello"):
+    return {"_id": i, "user_id": "u", "user_message": message, "adam_response": "*shapes clay*",
+            "timestamp": i, "analyzed": False}
+
+
+def test_ring_buffer_keeps_newest_turns_with_topics():
+    calls = []
+    cache = ConversationContextCache(lambda conv: calls.append(conv["_id"]) or topics_of(conv), turns=3)
+    assert cache.get("u", 3) is None
+
+    cache.fill("u", [turn(2, "about prayer"), turn(1)])
+    cache.append("u", turn(3, "on mercy"))
+    cache.append("u", turn(4))
+    cache.append("stranger", turn(5))
+
+    recent = cache.get("u", 3)
+    assert [t["_id"] for t in recent] == [4, 3, 2]
+    assert recent[1]["topics"] == ["mercy"] and recent[2]["topics"] == ["prayer"]
+    assert "analyzed" not in recent[0]
+    assert cache.get("u", 4) is None
+    assert cache.get("stranger", 1) is None
+    # topics were computed once per turn, on the way in
+    assert sorted(calls) == [1, 2, 3, 4]
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_eviction_by_users_and_bytes():
+    cache = ConversationContextCache(topics_of, turns=2, max_users=2)
+    cache.fill("a", [turn(1)])
+    cache.fill("b", [turn(2)])
+    cache.get("a", 1)
+    cache.fill("c", [turn(3)])
+    assert cache.get("b", 1) is None and cache.get("a", 1) is not None
+
+    size = turn_size({**turn(0), "topics": []})
+    cache = ConversationContextCache(topics_of, turns=2, max_bytes=3 * size)
+    cache.fill("a", [turn(1), turn(2)])
+    cache.fill("b", [turn(3)])
+    cache.append("b", turn(4))
+    assert cache.get("a", 1) is None and len(cache.get("b", 2)) == 2
+    assert cache.stats()["bytes"] == 2 * size and cache.stats()["evictions"] == 1
+
+
+def test_turns_written_by_another_process_invalidate_the_buffer():
+    stored, now = [], [0.0]
+
+    def newest_of(user_id):
+        return max((t["timestamp"] for t in stored if t["user_id"] == user_id), default=None)
+
+    def worker():
+        return ConversationContextCache(topics_of, turns=3, newest_of=newest_of,
+                                        check_interval=2.0, clock=lambda: now[0])
+
+    def log(cache, conv):
+        stored.append(conv)
+        cache.append(conv["user_id"], conv)
+
+    a, b = worker(), worker()
+    log(a, turn(1))
+    a.fill("u", [turn(1)])
+    b.fill("u", [turn(1)])
+    log(b, turn(2, "about prayer"))
+
+    # Within the check interval a serves its buffer without asking MongoDB
+    assert [t["_id"] for t in a.get("u", 3)] == [1]
+    now[0] = 2.0
+    assert a.get("u", 3) is None and a.stats()["stale"] == 1
+    a.fill("u", sorted(stored, key=lambda t: -t["timestamp"]))
+    assert [t["_id"] for t in a.get("u", 3)] == [2, 1]
+
+    # b's own appends keep its buffer current, so its check passes
+    now[0] = 5.0
+    assert [t["_id"] for t in b.get("u", 3)] == [2, 1] and b.stats()["stale"] == 0
+
+
+def test_stale_refill_keeps_turns_still_waiting_to_be_written():
+    stored, now = [], [0.0]
+
+    def newest_of(user_id):
+        return max((t["timestamp"] for t in stored if t["user_id"] == user_id), default=None)
+
+    cache = ConversationContextCache(topics_of, turns=3, newest_of=newest_of,
+                                     check_interval=2.0, clock=lambda: now[0])
+    stored.append(turn(1))
+    cache.fill("u", [turn(1)])
+    # Turn 3 is still queued in this process's writer when another worker stores turn 4
+    cache.append("u", turn(3))
+    stored.append(turn(4))
+
+    now[0] = 2.0
+    assert cache.get("u", 3) is None
+    cache.fill("u", sorted(stored, key=lambda t: -t["timestamp"]))
+
+    assert [t["_id"] for t in cache.get("u", 3)] == [4, 3, 1]
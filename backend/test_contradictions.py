@@ -0,0 +1,31 @@
+import random
+
+from core.knowledge.contradictions import ContradictionFilter, filter_contradictions_reference
+
+RULES = {
+    'mercy': ['harsh', 'unforgiving', 'cruel'],
+    'comfort': ['despair', 'hopeless', 'abandon'],
+    'truth': ['falsehood', 'lie', 'deceive'],
+}
+
+
+def test_compiled_filter_matches_reference():
+    engine = ContradictionFilter(RULES)
+    words = ['mercy', 'comfort', 'truth', 'harshly', 'cruelty', 'believe', 'despairing',
+             'abandoned', 'peace', 'lord', 'Mercy', 'light']
+    rng = random.Random(0)
+    for _ in range(200):
+        verses = [{'content': ' '.join(rng.choices(words, k=6)),
+                   'tags': rng.sample(['mercy', 'truth', 'general'], k=1)}
+                  for _ in range(rng.randint(0, 4))]
+        items = [{'content': ' '.join(rng.choices(words, k=8))} for _ in range(10)]
+        assert engine.filter(items, verses) == filter_contradictions_reference(items, verses, RULES)
+
+
+def test_substring_semantics_and_default_rules():
+    engine = ContradictionFilter.from_file()
+    verses = [{'content': 'Indeed Allah is full of mercy', 'tags': []}]
+    items = [{'content': 'A CRUELTY unseen'}, {'content': 'Be gentle'}, {'content': 'Do not believe lies'}]
+    # "believe" contains "lie" but truth is not an active theme here
+    assert engine.filter(items, verses) == items[1:]
+    assert engine.filter(items, []) == items
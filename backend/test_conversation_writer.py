@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import mongomock
+from bson import json_util
+from pymongo.errors import ServerSelectionTimeoutError
+
+from core.learning.conversation_writer import ConversationWriter
+
+
+def conversation(i):
+    return {"_id": f"c{i}", "user_id": "u1", "user_message": f"question {i}",
+            "timestamp": datetime(2024, 1, 1, 0, 0, i % 60), "analyzed": False}
+
+
+def test_writes_are_batched_in_background():
+    collection = mongomock.MongoClient().db.conversations
+    writer = ConversationWriter(collection, batch_size=10, flush_interval=0.05)
+    for i in range(25):
+        writer.submit(conversation(i))
+    writer.flush()
+
+    assert collection.count_documents({}) == 25
+    stats = writer.stats()
+    assert stats["written"] == 25 and 3 <= stats["batches"] <= 25
+    assert stats["queue_depth"] == 0 and stats["lag_seconds"] == 0.0
+    writer.close()
+
+
+def test_unreachable_mongo_spills_to_journal_and_replays(tmp_path):
+    collection = mongomock.MongoClient().db.conversations
+    insert_many = collection.insert_many
+    down = [True]
+
+    def flaky_insert_many(docs, ordered=True):
+        if down[0]:
+            raise ServerSelectionTimeoutError("no servers")
+        return insert_many(docs, ordered=ordered)
+
+    collection.insert_many = flaky_insert_many
+    journal = str(tmp_path / "journal.jsonl")
+    writer = ConversationWriter(collection, batch_size=5, flush_interval=0.01,
+                                journal_path=journal, retry_interval=0.05)
+    for i in range(7):
+        writer.submit(conversation(i))
+    writer.flush()
+    assert collection.count_documents({}) == 0
+    assert writer.stats()["journaled"] == 7
+
+    down[0] = False
+    deadline = time.monotonic() + 2
+    while collection.count_documents({}) < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+    assert collection.count_documents({}) == 7
+    assert collection.find_one({"_id": "c3"})["timestamp"] == datetime(2024, 1, 1, 0, 0, 3)
+    assert writer.stats()["replayed"] == 7
+
+
+def test_replay_claims_orphaned_journals_only(tmp_path):
+    collection = mongomock.MongoClient().db.conversations
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+
+    def journal(name, ids):
+        with open(tmp_path / name, "w") as f:
+            for i in ids:
+                f.write(json_util.dumps(conversation(i)) + "\n")
+
+    journal(f"journal.{dead.pid}.jsonl", [0, 1])
+    journal(f"journal.{os.getppid()}.jsonl", [2])
+    journal(f"journal.jsonl.replay-{dead.pid}-0", [3])
+    with open(tmp_path / f"journal.{dead.pid}.jsonl", "a") as f:
+        f.write('{"_id": "c9", "user_')
+
+    writer = ConversationWriter(collection, journal_path=str(tmp_path / "journal.jsonl"))
+    writer._replay_journal()
+    writer.close()
+
+    assert sorted(doc["_id"] for doc in collection.find()) == ["c0", "c1", "c3"]
+    assert writer.stats()["replayed"] == 3
+    # A live process's journal is left for that process
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"journal.{os.getppid()}.jsonl"]
@@ -0,0 +1,60 @@
+import numpy as np
+import mongomock
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from core.knowledge.corpus_meta import bump_corpus_version
+from core.knowledge.corpus_tfidf import CorpusTfidf
+from core.knowledge.enrichment import load_corpus_tfidf
+
+CORPUS = [
+    "Allah is merciful and forgiving to those who repent",
+    "Be patient, for patience is a light in the darkness",
+    "The merciful forgive and find peace",
+    "Seek knowledge from the cradle to the grave",
+    "Pray and your prayer will bring peace to the heart",
+]
+
+
+def test_top_terms_match_dense_reference():
+    model = CorpusTfidf().fit(CORPUS)
+    texts = CORPUS[:3]
+    reference = TfidfVectorizer(stop_words='english', max_features=5000).fit(CORPUS)
+    scores = reference.transform(texts).toarray().sum(axis=0)
+    terms = reference.get_feature_names_out()
+    expected = [terms[i] for i in np.lexsort((np.arange(len(terms)), -scores))[:5]]
+
+    assert model.top_terms(texts, k=5) == expected
+    assert model.top_terms(texts, k=5) == model.top_terms(list(texts), k=5)
+    assert model.document_terms(["merciful merciful peace"], k=1) == [["merciful"]]
+
+
+def test_fit_from_collection_and_round_trip(tmp_path):
+    collection = mongomock.MongoClient().db.entries
+    collection.insert_many([{"content": text} for text in CORPUS] + [{"source": "quran"}])
+    model = CorpusTfidf.from_collection(collection, corpus_version="3:5:x")
+    assert model.documents == len(CORPUS)
+
+    path = str(tmp_path / "tfidf.npz")
+    model.save(path)
+    loaded = CorpusTfidf.load(path)
+    assert loaded.corpus_version == loaded.fit_version == "3:5:x"
+    assert loaded.top_terms(["forgive me and grant me peace"]) == model.top_terms(["forgive me and grant me peace"])
+    assert CorpusTfidf().top_terms(["anything"]) == []
+
+
+def test_version_checked_on_load(tmp_path):
+    db = mongomock.MongoClient().db
+    db.entries.insert_many([{"content": text} for text in CORPUS])
+    path = str(tmp_path / "tfidf.npz")
+
+    assert not load_corpus_tfidf(db.entries, path=path, fit_missing=False).fitted
+    fitted = load_corpus_tfidf(db.entries, path=path)
+    assert fitted.corpus_version == "0"
+
+    bump_corpus_version(db)
+    db.entries.insert_one({"content": "Zakat purifies wealth"})
+    stale = load_corpus_tfidf(db.entries, path=path, fit_missing=False)
+    assert stale.corpus_version == "0" and "zakat" not in stale.terms
+    refitted = load_corpus_tfidf(db.entries, path=path)
+    assert refitted.corpus_version == "1" and "zakat" in refitted.terms
+    assert CorpusTfidf.load(path).corpus_version == "1"
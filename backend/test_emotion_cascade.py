@@ -0,0 +1,38 @@
+from core.personality import emotional_model
+from core.personality.emotion_lexicon import LexiconEmotionScorer
+from core.utils.model_registry import registry
+
+
+def test_lexicon_confidence():
+    scorer = LexiconEmotionScorer()
+    profile, confidence = scorer.score("Thanks!")
+    assert profile == {"gratitude": 1.0} and confidence == 1.0
+
+    assert scorer.score("hi")[1] == 1.0
+    assert scorer.score("I am not happy")[1] < 0.75
+    assert scorer.score("The caravan crossed the desert at dawn")[1] == 0.0
+    assert scorer.is_crisis("sometimes I want to end it all")
+
+
+def test_cascade_only_calls_model_when_needed(monkeypatch):
+    calls = []
+
+    def classifier(texts, batch_size=None):
+        calls.extend(texts)
+        return [[{"label": "sadness", "score": 0.8}, {"label": "fear", "score": 0.1}] for _ in texts]
+
+    monkeypatch.setenv("EMOTION_BATCHING", "false")
+    monkeypatch.setenv("EMOTION_MODE", "cascade")
+    monkeypatch.setattr(registry, "pipeline", lambda *args, **kwargs: classifier)
+    model = emotional_model.EmotionalModel()
+
+    thanks = model.analyze("thank you")
+    assert set(thanks) == {"dominant_emotion", "mood_score", "is_urgent", "emotion_profile"}
+    assert thanks["dominant_emotion"] == "gratitude" and not thanks["is_urgent"]
+
+    assert model.analyze("My grandmother's illness weighs on the whole family")["dominant_emotion"] == "sadness"
+    assert model.analyze("I want to kill myself")["is_urgent"]
+    assert calls == ["My grandmother's illness weighs on the whole family", "I want to kill myself"]
+
+    stats = model.stats()
+    assert stats["lexicon"] == 1 and stats["model"] == 2 and stats["crisis"] == 1
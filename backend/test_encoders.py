@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pytest
+from core.utils.encoders import _publish, cosine_agreement, mean_pool
+
+
+def test_mean_pool_ignores_padding():
+    tokens = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    np.testing.assert_allclose(mean_pool(tokens, mask), [[2.0, 3.0]])
+
+
+def test_cosine_agreement():
+    rng = np.random.default_rng(0)
+    reference = rng.normal(size=(8, 384)).astype(np.float32)
+    same = cosine_agreement(reference * 2, reference)
+    assert same["mean"] == pytest.approx(1.0, abs=1e-5)
+    assert same["min"] == pytest.approx(1.0, abs=1e-5)
+
+    noisy = cosine_agreement(reference + 0.01 * rng.normal(size=reference.shape), reference)
+    assert 0.99 < noisy["min"] <= noisy["mean"] < 1.0
+
+
+def test_publish_moves_model_last(tmp_path, monkeypatch):
+    export_dir, model_dir = tmp_path / "export", tmp_path / "model"
+    export_dir.mkdir()
+    model_dir.mkdir()
+    for name in ("model.onnx", "encoder.json", "tokenizer.json"):
+        (export_dir / name).write_text(name)
+
+    moved = []
+    real_replace = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: moved.append(os.path.basename(dst)) or real_replace(src, dst))
+    _publish(str(export_dir), str(model_dir))
+
+    assert moved[-1] == "model.onnx"
+    assert sorted(p.name for p in model_dir.iterdir()) == ["encoder.json", "model.onnx", "tokenizer.json"]
+    assert not any(export_dir.iterdir())
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import mongomock
+
+from core.knowledge.contradictions import entry_keywords
+from core.knowledge.corpus_tfidf import CorpusTfidf
+from core.knowledge.enrichment import (ENRICHMENT_VERSION, DocumentEnricher, backfill_enrichment,
+                                       load_corpus_tfidf, mark_enriched, mood_delta, theme_labels)
+
+CORPUS = [
+    "The lonely heart finds peace and hope in prayer",
+    "Forgive one another as the merciful forgive",
+    "Fear and anger bring pain to the soul",
+    "Seek knowledge and teach it to others",
+]
+
+
+def test_enriched_fields():
+    enricher = DocumentEnricher(CorpusTfidf().fit(CORPUS))
+    fields = enricher.enrich([{"content": CORPUS[0], "tags": ["mercy"]},
+                              {"content": CORPUS[2], "tags": None}])
+
+    assert fields[0]["keywords"] == ["lonely", "heart", "finds", "peace", "hope", "prayer"]
+    assert fields[0]["mood_delta"] == 0.02 and fields[1]["mood_delta"] == -0.06
+    assert set(fields[0]["themes"]) <= {"comfort", "mercy"} and "comfort" in fields[0]["themes"]
+    assert len(fields[0]["top_terms"]) == 5
+    assert fields[1]["enrichment_version"] == ENRICHMENT_VERSION
+    assert theme_labels(["pray", "forgive", "pardon"]) == ["prayer", "mercy"]
+    assert mood_delta(None) == 0.0
+
+
+def test_entry_keywords_prefers_stored_field():
+    assert entry_keywords({"content": "mercy upon mercy", "keywords": ["mercy"]}) == ["mercy"]
+    assert entry_keywords({"content": "Mercy upon you", "keywords": None}) == ["mercy", "upon"]
+
+
+def test_backfill_enriches_stale_entries_once():
+    collection = mongomock.MongoClient().db.entries
+
+    def bulk_write(operations, ordered=True):
+        # mongomock's bulk API lags behind pymongo's UpdateOne
+        modified = sum(collection.update_one(op._filter, op._doc).modified_count for op in operations)
+        return SimpleNamespace(modified_count=modified)
+
+    collection.bulk_write = bulk_write
+    collection.insert_many([{"_id": i, "content": text, "tags": []} for i, text in enumerate(CORPUS)])
+    enricher = DocumentEnricher(CorpusTfidf().fit(CORPUS))
+
+    assert backfill_enrichment(collection, enricher, batch_size=3, limit=3)["enriched"] == 3
+    assert backfill_enrichment(collection, enricher, batch_size=3)["enriched"] == 1
+    assert backfill_enrichment(collection, enricher)["scanned"] == 0
+    assert collection.find_one({"_id": 1})["themes"] == ["mercy"]
+
+    # A refit makes entries enriched under the previous fit stale again
+    refitted = CorpusTfidf().fit(CORPUS + ["Zakat purifies wealth"])
+    refitted.fit_version = "2"
+    assert backfill_enrichment(collection, DocumentEnricher(refitted))["enriched"] == len(CORPUS)
+    assert collection.find_one({"_id": 0})["tfidf_version"] == "2"
+
+
+def test_mark_enriched_keeps_model_current(tmp_path):
+    db = mongomock.MongoClient().db
+    db.entries.insert_many([{"content": text} for text in CORPUS])
+    path = str(tmp_path / "tfidf.npz")
+    tfidf = load_corpus_tfidf(db.entries, path=path)
+
+    assert mark_enriched(db, tfidf, path=path) == 1
+    assert load_corpus_tfidf(db.entries, path=path, fit_missing=False).corpus_version == "1"
@@ -0,0 +1,43 @@
+import pytest
+from core.knowledge.fusion import (get_fusion, max_score_fusion,
+                                   reciprocal_rank_fusion, weighted_fusion)
+
+
+def docs(*pairs):
+    return [{"_id": doc_id, "score": score} for doc_id, score in pairs]
+
+
+def test_weighted_fusion_matches_legacy_weights():
+    vector = docs(("a", 0.9), ("b", 0.45))
+    text = docs(("b", 4.0), ("c", 2.0))
+
+    fused = weighted_fusion(vector, text, 3)
+
+    scores = {d["_id"]: d["combined_score"] for d in fused}
+    assert scores["a"] == pytest.approx(0.6)
+    assert scores["b"] == pytest.approx(0.6 * 0.5 + 0.4)
+    assert scores["c"] == pytest.approx(0.2)
+    assert [d["_id"] for d in fused] == ["b", "a", "c"]
+
+
+def test_fusion_tolerates_empty_legs():
+    vector = docs(("a", 0.9))
+    for fuse in (weighted_fusion, reciprocal_rank_fusion, max_score_fusion):
+        assert [d["_id"] for d in fuse(vector, [], 5)] == ["a"]
+        assert fuse([], [], 5) == []
+
+
+def test_rrf_rewards_documents_found_by_both_legs():
+    vector = docs(("a", 0.9), ("b", 0.8))
+    text = docs(("c", 9.0), ("b", 1.0))
+
+    fused = reciprocal_rank_fusion(vector, text, 3)
+
+    assert fused[0]["_id"] == "b"
+
+
+def test_max_fusion_and_unknown_strategy():
+    fused = max_score_fusion(docs(("a", 0.5), ("b", 1.0)), docs(("a", 2.0)), 2)
+    assert {d["_id"]: d["combined_score"] for d in fused} == {"a": 1.0, "b": 1.0}
+    with pytest.raises(ValueError):
+        get_fusion("borda")
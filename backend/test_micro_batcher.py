@@ -0,0 +1,45 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.utils.micro_batcher import MicroBatcher
+
+
+def test_concurrent_calls_are_coalesced():
+    calls = []
+
+    def forward(items):
+        calls.append(len(items))
+        time.sleep(0.01)  # fixed cost of one forward pass
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(forward, max_batch_size=8, max_wait_ms=5)
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(batcher, range(64)))
+    batcher.close()
+
+    assert results == [i * 2 for i in range(64)]
+    stats = batcher.stats()
+    assert stats["items"] == 64 and max(calls) <= 8
+    assert stats["batches"] < 64 and stats["mean_batch_size"] > 1
+
+
+def test_failures_reach_every_caller():
+    release = threading.Event()
+
+    def forward(items):
+        release.wait(1)
+        raise RuntimeError("model unavailable")
+
+    batcher = MicroBatcher(forward, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+    release.set()
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(1)
+    batcher.close()
+    assert batcher.stats()["failures"] >= 1
+    with pytest.raises(RuntimeError):
+        batcher.submit(0).result(1)
@@ -0,0 +1,44 @@
+import threading
+import time
+
+from core.utils.model_registry import ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, name, device):
+        self.name = name
+        self.device = device
+
+
+def test_registry_loads_each_key_once_across_threads():
+    registry = ModelRegistry(default_device="cpu")
+    loads = []
+
+    def loader(name, device):
+        loads.append((name, device))
+        time.sleep(0.05)
+        return FakeModel(name, device)
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get("mini", loader)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [("mini", "cpu")]
+    assert all(model is models[0] for model in models)
+    assert registry.get("mini", loader, device="cuda") is not models[0]
+    assert set(registry.loaded()) == {"mini@cpu", "mini@cuda"}
+
+
+def test_registry_unload():
+    registry = ModelRegistry(default_device="cpu")
+    first = registry.get("mini", FakeModel)
+    assert registry.loaded()["mini@cpu"]["memory_bytes"] is None
+
+    assert registry.unload("mini") == 1
+    assert registry.loaded() == {}
+    assert registry.get("mini", FakeModel) is not first
+    assert registry.unload("other") == 0
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from core.knowledge.quantized_index import QuantizedVectorIndex
+from core.knowledge.vector_index import ExactVectorIndex
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(5)
+    vectors = rng.normal(size=(3000, 384)).astype(np.float32)
+    ids = [f"doc{i}" for i in range(len(vectors))]
+    attributes = [{"source": "quran" if i % 3 else "bible"} for i in range(len(vectors))]
+    return ids, vectors, attributes, rng
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_quantized_search_matches_exact(corpus, precision):
+    ids, vectors, attributes, rng = corpus
+    exact = ExactVectorIndex()
+    exact.build(ids, vectors, attributes=attributes)
+    index = QuantizedVectorIndex(precision=precision)
+    index.build(ids, vectors, attributes=attributes)
+    queries = rng.normal(size=(20, 384)).astype(np.float32)
+
+    assert index.recall_at_k(queries, k=10) >= 0.95
+    for q in queries[:5]:
+        expected = exact.search(q, 5, filters={"source": "bible"})
+        found = index.search(q, 5, filters={"source": "bible"})
+        assert [index.ids[r] for r, _ in found][:3] == [exact.ids[r] for r, _ in expected][:3]
+        # Re-ranked scores are full precision
+        assert found[0][1] == pytest.approx(expected[0][1], abs=1e-5)
+
+
+def test_quantized_codes_are_compact(corpus):
+    ids, vectors, _, _ = corpus
+    index = QuantizedVectorIndex(precision="int8")
+    index.build(ids, vectors)
+    usage = index.memory_usage()
+    assert index.codes.dtype == np.int8
+    assert usage["codes"] * 3 < usage["float32"]
+
+
+def test_quantized_batch_and_roundtrip(corpus, tmp_path):
+    ids, vectors, _, rng = corpus
+    index = QuantizedVectorIndex(precision="int8", rerank_factor=8)
+    index.build(ids, vectors)
+    queries = rng.normal(size=(4, 384)).astype(np.float32)
+    path = str(tmp_path / "quantized.npz")
+    index.save(path)
+    loaded = QuantizedVectorIndex.load(path)
+
+    assert loaded.precision == "int8" and loaded.rerank_factor == 8
+    assert loaded.search_batch(queries, 5) == index.search_batch(queries, 5)
+    assert index.search_batch(queries, 5)[0] == index.search(queries[0], 5)
+    assert index.report(k=10, sample_size=50)["recall@10"] >= 0.9
+
+
+def test_snapshot_codes_are_saved_and_reused(corpus, tmp_path):
+    ids, vectors, attributes, rng = corpus
+    exact = ExactVectorIndex()
+    exact.build(ids, vectors, attributes=attributes)
+    exact.write_snapshot(str(tmp_path))
+    queries = rng.normal(size=(4, 384)).astype(np.float32)
+
+    first = QuantizedVectorIndex.from_snapshot(str(tmp_path), precision="int8")
+    assert isinstance(first.matrix, np.memmap)
+    assert len(list(tmp_path.glob("codes-int8-*.npy"))) == 1
+
+    reopened = QuantizedVectorIndex.from_snapshot(str(tmp_path), precision="int8")
+    assert isinstance(reopened.codes, np.memmap)
+    assert np.array_equal(reopened.codes, first.codes)
+    assert reopened.search_batch(queries, 5, filters={"source": "bible"}) == \
+        first.search_batch(queries, 5, filters={"source": "bible"})
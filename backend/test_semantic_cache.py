@@ -0,0 +1,46 @@
+import numpy as np
+from core.knowledge.semantic_cache import SemanticCache
+
+
+def unit(rng, dim=384):
+    v = rng.normal(size=dim).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_semantic_cache_hits_near_duplicates():
+    rng = np.random.default_rng(0)
+    cache = SemanticCache(capacity=4, threshold=0.9)
+    question = unit(rng)
+    cache.add(question, {"content": "mercy"}, cost=0.5)
+
+    paraphrase = question + 0.01 * unit(rng)
+    value, similarity = cache.lookup(paraphrase)
+    assert value == {"content": "mercy"} and similarity > 0.9
+    assert cache.lookup(unit(rng)) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["latency_saved_seconds"] == 0.5
+
+
+def test_semantic_cache_evicts_lru_and_drops_old_versions():
+    rng = np.random.default_rng(1)
+    now = [0.0]
+    cache = SemanticCache(capacity=2, threshold=0.9, ttl=10, clock=lambda: now[0])
+    a, b, c = unit(rng), unit(rng), unit(rng)
+    cache.add(a, "a", version=1)
+    now[0] = 1
+    cache.add(b, "b", version=1)
+    now[0] = 2
+    cache.lookup(a, version=1)
+    cache.add(c, "c", version=1)
+
+    assert cache.lookup(b, version=1) is None
+    assert cache.lookup(a, version=1)[0] == "a"
+    assert cache.stats()["evictions"] == 1
+
+    now[0] = 20
+    assert cache.lookup(c, version=1) is None
+    cache.add(a, "a", version=1)
+    assert cache.lookup(a, version=2) is None
+    assert len(cache) == 0
@@ -0,0 +1,45 @@
+import random
+from types import SimpleNamespace
+
+import mongomock
+
+from core.learning.topics import ISLAMIC_TOPICS, TopicMatcher, backfill_topics
+
+
+def legacy_extract(text):
+    text_lower = text.lower()
+    return [theme for theme, keywords in ISLAMIC_TOPICS.items()
+            if any(keyword in text_lower for keyword in keywords)]
+
+
+def test_matcher_agrees_with_substring_scan():
+    matcher = TopicMatcher()
+    words = ["Mercy", "forgiveness", "PRAYER", "visa", "prophets", "clay", "dua", "peace", "rahma"]
+    rng = random.Random(0)
+    for _ in range(300):
+        user, adam = " ".join(rng.choices(words, k=4)), " ".join(rng.choices(words, k=3))
+        assert matcher.extract(user) == legacy_extract(user)
+        assert set(matcher.conversation(user, adam)) == set(legacy_extract(user) + legacy_extract(adam))
+    assert matcher.extract(None) == []
+
+
+def test_backfill_tags_untagged_conversations():
+    collection = mongomock.MongoClient().db.conversations
+
+    def bulk_write(operations, ordered=True):
+        # mongomock's bulk API lags behind pymongo's UpdateOne
+        modified = sum(collection.update_one(op._filter, op._doc).modified_count for op in operations)
+        return SimpleNamespace(modified_count=modified)
+
+    collection.bulk_write = bulk_write
+    collection.insert_many([
+        {"_id": "a", "user_message": "how do I pray?", "adam_response": "*shapes clay* with mercy"},
+        {"_id": "b", "user_message": "hello", "adam_response": "peace"},
+        {"_id": "c", "user_message": "forgive me", "adam_response": "", "topics": ["custom"]},
+    ])
+
+    assert backfill_topics(collection, TopicMatcher(), batch_size=1)["tagged"] == 2
+    assert collection.find_one({"_id": "a"})["topics"] == ["mercy", "prayer"]
+    assert collection.find_one({"_id": "b"})["topics"] == []
+    assert collection.find_one({"_id": "c"})["topics"] == ["custom"]
+    assert collection.count_documents({"topics": "prayer"}) == 1
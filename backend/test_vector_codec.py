@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from bson import BSON
+from bson.binary import Binary
+from core.knowledge.vector_codec import encode_for_storage, pack_vector, unpack_vector
+from core.knowledge.vector_index import load_entries
+
+
+def test_pack_roundtrip_through_bson():
+    vector = np.random.default_rng(0).normal(size=384).astype(np.float32)
+    packed = BSON.encode({"vector": pack_vector(vector)}).decode()["vector"]
+
+    assert isinstance(packed, Binary) and packed.subtype == 9
+    assert len(packed) == 2 + 384 * 4
+    np.testing.assert_array_equal(unpack_vector(packed), vector)
+    np.testing.assert_allclose(unpack_vector(vector.tolist()), vector)
+    assert isinstance(encode_for_storage(vector), list)
+
+
+def test_unpack_rejects_other_binary():
+    with pytest.raises(ValueError):
+        unpack_vector(Binary(b"\x10\x00" + bytes(384), 9))
+
+
+def test_load_entries_and_migration_mix_formats():
+    mongomock = pytest.importorskip("mongomock")
+    from core.knowledge.corpus_meta import read_vector_storage
+    from core.knowledge.migrate_vectors import migrate_vectors
+
+    collection = mongomock.MongoClient().db.entries
+
+    def bulk_write(operations, ordered=True):
+        # mongomock's bulk API lags behind pymongo's UpdateOne
+        modified = sum(collection.update_one(op._filter, op._doc).modified_count for op in operations)
+        return SimpleNamespace(modified_count=modified)
+
+    collection.bulk_write = bulk_write
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(10, 384)).astype(np.float32)
+    collection.insert_many([
+        {"_id": i, "content": f"doc {i}", "source": "quran",
+         "vector": pack_vector(v) if i % 2 else v.tolist()}
+        for i, v in enumerate(vectors)
+    ])
+
+    ids, matrix, _ = load_entries(collection)
+    np.testing.assert_allclose(matrix[np.argsort(ids)], vectors)
+
+    migrate_vectors(collection, batch_size=2, dry_run=True)
+    assert read_vector_storage(collection.database) == "array"
+    stats = migrate_vectors(collection, batch_size=2, limit=2)
+    assert read_vector_storage(collection.database) == "binary"
+    assert stats["converted"] == 2
+    stats = migrate_vectors(collection, batch_size=2)
+    assert stats["converted"] == 3
+    assert collection.count_documents({"vector": {"$type": "array"}}) == 0
+
+    ids, matrix, _ = load_entries(collection)
+    np.testing.assert_allclose(matrix[np.argsort(ids)], vectors)
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from core.knowledge.vector_index import ExactVectorIndex, normalize_rows, top_k
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(500, 384)).astype(np.float32)
+    ids = [f"doc{i}" for i in range(len(vectors))]
+    payloads = [
+        {"content": f"text {i}", "source": "quran" if i % 2 else "bible",
+         "tags": [], "metadata": {"reference": str(i)}}
+        for i in range(len(vectors))
+    ]
+    return ids, vectors, payloads
+
+
+def test_top_k_matches_full_sort():
+    scores = np.random.default_rng(1).normal(size=1000)
+    assert list(top_k(scores, 10)) == list(np.argsort(-scores)[:10])
+    assert len(top_k(scores, 5000)) == 1000
+
+
+def test_exact_search_matches_brute_force(corpus):
+    ids, vectors, payloads = corpus
+    index = ExactVectorIndex()
+    index.build(ids, vectors, payloads)
+
+    query = vectors[42] + 0.01
+    expected = np.argsort(-(normalize_rows(vectors) @ normalize_rows(query[None])[0]))[:5]
+    hits = index.search(query, 5)
+
+    assert [index.ids[row] for row, _ in hits] == [ids[i] for i in expected]
+    assert index.ids[hits[0][0]] == "doc42"
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_documents_keep_result_shape(corpus):
+    ids, vectors, payloads = corpus
+    index = ExactVectorIndex()
+    index.build(ids, vectors, payloads)
+
+    row, score = index.search(vectors[3], 1)[0]
+    doc = index.document(row, score)
+
+    assert set(doc) == {"_id", "content", "source", "tags", "metadata", "score"}
+    assert doc["_id"] == "doc3"
+    assert index.id_to_row["doc3"] == row
+
+
+def test_snapshot_is_memory_mapped(corpus, tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    from bson import ObjectId
+    from core.knowledge.vector_index import snapshot_exists, write_snapshot
+
+    ids, vectors, payloads = corpus
+    collection = mongomock.MongoClient().db.entries
+    collection.insert_many([
+        {"_id": ObjectId(), "vector": vector.tolist(), **payload}
+        for vector, payload in zip(vectors[:50], payloads)
+    ])
+    path = str(tmp_path / "snapshot")
+
+    assert not snapshot_exists(path)
+    assert write_snapshot(collection, path) == 50
+    assert snapshot_exists(path)
+
+    index = ExactVectorIndex.from_snapshot(path)
+    row, score = index.search(vectors[7], 1)[0]
+
+    assert isinstance(index.matrix, np.memmap)
+    assert not index.matrix.flags.writeable
+    assert index.document(row)["_id"] == collection.find_one({"content": "text 7"})["_id"]
+    assert score == pytest.approx(1.0, abs=1e-3)
+
+
+def test_snapshot_records_version_and_prunes_old_files(corpus, tmp_path, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    from core.knowledge import vector_index
+    from core.knowledge.vector_index import snapshot_version, write_snapshot
+
+    ids, vectors, payloads = corpus
+    collection = mongomock.MongoClient().db.entries
+    collection.insert_many([
+        {"vector": vector.tolist(), **payload}
+        for vector, payload in zip(vectors[:20], payloads)
+    ])
+    path = tmp_path / "snapshot"
+
+    monkeypatch.setattr(vector_index.os, "getpid", lambda: 101)
+    write_snapshot(collection, str(path), corpus_version="1:20:a")
+    first = sorted(p.name for p in path.iterdir())
+    monkeypatch.setattr(vector_index.os, "getpid", lambda: 102)
+    write_snapshot(collection, str(path), corpus_version="2:20:b")
+    second = sorted(p.name for p in path.iterdir())
+
+    assert snapshot_version(str(path)) == "2:20:b"
+    assert ExactVectorIndex.from_snapshot(str(path)).corpus_version == "2:20:b"
+    assert len(second) == len(first)
+    assert all(name == "manifest.json" or "-102." in name for name in second)
+
+
+def test_search_batch_matches_single_queries(corpus):
+    ids, vectors, payloads = corpus
+    index = ExactVectorIndex()
+    index.build(ids, vectors, payloads)
+    queries = vectors[:7] + 0.05
+
+    batched = index.search_batch(queries, 4, chunk_size=3)
+
+    assert len(batched) == 7
+    for query, hits in zip(queries, batched):
+        expected = index.search(query, 4)
+        assert [row for row, _ in hits] == [row for row, _ in expected]
+        assert [score for _, score in hits] == pytest.approx([score for _, score in expected], abs=1e-5)
+
+
+def test_filters_apply_before_top_k(corpus):
+    ids, vectors, payloads = corpus
+    for i, payload in enumerate(payloads):
+        payload["metadata"]["surah_number"] = i % 114 + 1
+    index = ExactVectorIndex()
+    index.build(ids, vectors, payloads)
+    query = vectors[10]
+
+    bible = index.search(query, 20, filters={"source": "bible"})
+    ranged = index.search(query, 20, filters={"source": "quran",
+                                              "metadata.surah_number": {"$gte": 2, "$lte": 10}})
+
+    assert len(bible) == 20
+    assert all(index.document(row)["source"] == "bible" for row, _ in bible)
+    assert index.document(bible[0][0])["_id"] == "doc10"
+    assert len(ranged) == 20
+    for row, _ in ranged:
+        doc = index.document(row)
+        assert doc["source"] == "quran" and 2 <= doc["metadata"]["surah_number"] <= 10
+    assert index.search(query, 5, filters={"source": "wikipedia"}) == []
+    assert index.search_batch(query[None], 5, filters={"source": "bible"})[0] == bible[:5]